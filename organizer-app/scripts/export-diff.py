@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Export Diff Tool for HackLoad 2025
+Compares two approved-teams.json snapshots and writes a changeset of added, removed and changed teams.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Set
+
+from script_loader import load_script_module
+
+
+# Per-team fields compared between snapshots
+DIFF_FIELDS = ('status', 'info', 'members', 'env')
+
+
+def content_hash(value) -> str:
+    """Stable hash of a JSON-serializable value."""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+def team_field_hashes(team: Dict) -> Dict[str, str]:
+    """Hash each compared field of a team export record.
+
+    Members and environment variables are sorted so that export ordering does
+    not count as a change, and env var timestamps are ignored: a real value or
+    metadata change shows up in the other attributes.
+    """
+    members = sorted((member.get('name', ''), member.get('email', ''))
+                     for member in team.get('members', []))
+    env = sorted(
+        (var.get('key'), var.get('value'), var.get('category'), var.get('description'),
+         var.get('isSecure'), var.get('isEditable'))
+        for var in team.get('environmentVariables', [])
+    )
+    return {
+        'status': content_hash(team.get('teamStatus')),
+        'info': content_hash([team.get('teamName'), team.get('teamLevel'), team.get('hackathon')]),
+        'members': content_hash(members),
+        'env': content_hash(env)
+    }
+
+
+def hash_export(teams_file: str) -> Dict[str, Dict[str, str]]:
+    """Stream an export and keep only per-team field hashes."""
+    team_env_module = load_script_module("team_env_api", "team-env-api.py")
+    hashes = {}
+    for team in team_env_module.iter_json_array(teams_file):
+        nickname = team.get('teamNickname')
+        if nickname:
+            hashes[nickname] = team_field_hashes(team)
+    return hashes
+
+
+def diff_exports(old_file: str, new_file: str) -> Dict:
+    """Compare two exports and build a changeset."""
+    old_hashes = hash_export(old_file)
+    new_hashes = hash_export(new_file)
+
+    changed = {}
+    for nickname in sorted(old_hashes.keys() & new_hashes.keys()):
+        fields = [field for field in DIFF_FIELDS
+                  if old_hashes[nickname][field] != new_hashes[nickname][field]]
+        if fields:
+            changed[nickname] = fields
+
+    return {
+        "meta": {
+            "generated_at": datetime.now().isoformat(),
+            "old_file": old_file,
+            "new_file": new_file,
+            "old_teams": len(old_hashes),
+            "new_teams": len(new_hashes)
+        },
+        "added": sorted(new_hashes.keys() - old_hashes.keys()),
+        "removed": sorted(old_hashes.keys() - new_hashes.keys()),
+        "changed": changed
+    }
+
+
+def read_changeset(changeset_file: str) -> Dict:
+    """Read a changeset file, or the ``meta.changes`` recorded in a team config.
+
+    Team configs regenerated with ``generate-team-env-config.py --update`` carry
+    their own changeset; for NDJSON configs only the meta line is read.
+    """
+    if changeset_file == '-':
+        print("❌ A changeset cannot be read from stdin; pass a changeset or config file")
+        sys.exit(1)
+    try:
+        with open(changeset_file, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+            f.seek(0)
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                data = json.loads(first_line)
+    except FileNotFoundError:
+        print(f"❌ Changeset file not found: {changeset_file}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid JSON in changeset file: {e}")
+        sys.exit(1)
+
+    changes = data.get('meta', {}).get('changes')
+    return changes if changes is not None else data
+
+
+def load_changeset(changeset_file: str, key: str = None) -> Set[str]:
+    """Load nicknames of teams that need processing (added or changed).
+
+    With ``key``, changed teams are kept only if their entry lists that
+    variable or ``env``; added teams are always kept.
+    """
+    changeset = read_changeset(changeset_file)
+    changed = changeset.get('changed', {})
+    if key:
+        changed = {nickname: fields for nickname, fields in changed.items()
+                   if key in fields or 'env' in fields}
+    return set(changeset.get('added', [])) | set(changed)
+
+
+def filter_changed_teams(teams: List[Dict], changeset_file: str) -> List[Dict]:
+    """Keep only teams listed as added or changed in a changeset."""
+    changed_nicknames = load_changeset(changeset_file)
+    filtered = [team for team in teams if team.get('teamNickname') in changed_nicknames]
+    print(f"🔀 Changeset {changeset_file}: processing {len(filtered)}/{len(teams)} teams")
+    print()
+    return filtered
+
+
+def print_changeset(changeset: Dict):
+    added = changeset['added']
+    removed = changeset['removed']
+    changed = changeset['changed']
+
+    print(f"📊 Export Diff:")
+    print(f"   Teams in old export: {changeset['meta']['old_teams']}")
+    print(f"   Teams in new export: {changeset['meta']['new_teams']}")
+    print(f"   ➕ Added: {len(added)}")
+    print(f"   ➖ Removed: {len(removed)}")
+    print(f"   ✏️ Changed: {len(changed)}")
+    print()
+
+    for nickname in added:
+        print(f"  ➕ {nickname}")
+    for nickname in removed:
+        print(f"  ➖ {nickname}")
+    for nickname, fields in changed.items():
+        print(f"  ✏️ {nickname}: {', '.join(fields)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare two team exports and write a changeset',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compare yesterday's export with the fresh one
+  ./export-diff.py approved-teams.old.json approved-teams.json
+
+  # Write the changeset and apply only changed teams
+  ./export-diff.py approved-teams.old.json approved-teams.json --output changeset.json
+  ./github-repo-manager.py --only-changed changeset.json
+  ./set-endpoint-urls.py --only-changed changeset.json
+
+Compared fields per team: status, info (name/level/hackathon), members, env
+        """
+    )
+    parser.add_argument('old_file', help='Previous teams export')
+    parser.add_argument('new_file', help='Current teams export')
+    parser.add_argument('--output', '-o',
+                       help='Write the changeset JSON to this file')
+
+    args = parser.parse_args()
+
+    try:
+        changeset = diff_exports(args.old_file, args.new_file)
+    except FileNotFoundError as e:
+        print(f"❌ Teams file not found: {e.filename}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid JSON in teams file: {e}")
+        sys.exit(1)
+
+    print_changeset(changeset)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(changeset, f, indent=2, ensure_ascii=False)
+        print()
+        print(f"✅ Changeset written to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
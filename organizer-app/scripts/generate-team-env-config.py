@@ -5,36 +5,55 @@ Creates a JSON file with all approved teams and their environment variables.
 """
 
 import argparse
+import contextlib
 import json
 import os
 import sys
 import secrets
 import string
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from script_loader import load_script_module
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
+# Values that must survive regeneration: rotating them breaks running team services
+SECRET_KEYS = {key for key, metadata in team_env_module.CONFIG_VARIABLE_METADATA.items()
+               if metadata['is_secure']}
 
 
 def load_teams_data(teams_file: str) -> List[Dict]:
     """Load teams data from JSON file and filter for approved teams only."""
     try:
-        with open(teams_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            teams = data.get('data', [])
-            
-            # Filter for approved teams only
-            approved_teams = [team for team in teams if team.get('teamStatus') == 'APPROVED']
-            
-            total_teams = len(teams)
-            approved_count = len(approved_teams)
-            rejected_count = total_teams - approved_count
-            
-            print(f"📊 Team Statistics:")
-            print(f"   Total teams: {total_teams}")
-            print(f"   ✅ Approved teams: {approved_count}")
-            print(f"   ❌ Rejected/Other teams: {rejected_count}")
-            print()
-            
-            return approved_teams
+        # Filter for approved teams only, building compact records as the export is read
+        counts = {}
+        approved_teams = list(team_env_module.iter_team_records(teams_file, 'APPROVED', counts))
+        
+        total_teams = counts['total']
+        approved_count = len(approved_teams)
+        rejected_count = total_teams - approved_count
+        
+        print(f"📊 Team Statistics:")
+        print(f"   Total teams: {total_teams}")
+        print(f"   ✅ Approved teams: {approved_count}")
+        print(f"   ❌ Rejected/Other teams: {rejected_count}")
+        print()
+        
+        return approved_teams
+    except FileNotFoundError:
+        print(f"❌ Teams file not found: {teams_file}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid JSON in teams file: {e}")
+        sys.exit(1)
+
+
+def iter_approved_teams(teams_file: str) -> Iterator[Dict]:
+    """Stream approved teams from the export without loading it whole."""
+    try:
+        yield from team_env_module.iter_team_records(teams_file, 'APPROVED')
     except FileNotFoundError:
         print(f"❌ Teams file not found: {teams_file}")
         sys.exit(1)
@@ -79,24 +98,24 @@ def generate_team_environment_variables(team_nickname: str, base_url: str = "htt
     }
 
 
-def generate_teams_config(teams: List[Dict], base_url: str = "https://hub.hackload.kz", 
-                         github_org: str = "hackload-kz") -> Dict:
-    """Generate complete configuration for all approved teams."""
-    config = {
-        "meta": {
-            "generated_at": datetime.now().isoformat(),
-            "total_teams": len(teams),
-            "base_url": base_url,
-            "github_org": github_org,
-            "description": "Environment variables configuration for HackLoad 2025 approved teams"
-        },
-        "teams": {}
+def generate_config_meta(base_url: str, github_org: str) -> Dict:
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "base_url": base_url,
+        "github_org": github_org,
+        "description": "Environment variables configuration for HackLoad 2025 approved teams"
     }
-    
-    print(f"🌐 Generating environment variables for {len(teams)} approved teams")
-    print(f"🏷️ Base URL: {base_url}")
-    print(f"🐙 GitHub Organization: {github_org}")
-    print()
+
+
+def iter_team_configs(teams: Iterable[Dict], base_url: str = "https://hub.hackload.kz", 
+                      github_org: str = "hackload-kz",
+                      existing_teams: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[str, Dict]]:
+    """Generate (nickname, team config) pairs one team at a time.
+
+    For teams present in ``existing_teams`` secret values and variables the
+    generator does not produce are kept from the existing config.
+    """
+    total = f"/{len(teams)}" if isinstance(teams, list) else ""
     
     for i, team in enumerate(teams, 1):
         team_name = team.get('teamName', 'Unknown')
@@ -104,7 +123,7 @@ def generate_teams_config(teams: List[Dict], base_url: str = "https://hub.hacklo
         team_status = team.get('teamStatus', 'UNKNOWN')
         member_count = team.get('memberCount', len(team.get('members', [])))
         
-        print(f"🔄 Processing team {i}/{len(teams)}: {team_nickname} ({team_name})")
+        print(f"🔄 Processing team {i}{total}: {team_nickname} ({team_name})")
         print(f"   Status: {team_status} | Members: {member_count}")
         
         # Validate team data
@@ -115,8 +134,24 @@ def generate_teams_config(teams: List[Dict], base_url: str = "https://hub.hacklo
         # Generate environment variables
         env_vars = generate_team_environment_variables(team_nickname, base_url, github_org)
         
-        # Add team info to config
-        config["teams"][team_nickname] = {
+        kept_keys = set()
+        if existing_teams and team_nickname in existing_teams:
+            existing_env = existing_teams[team_nickname].get('environment_variables', {})
+            for key, value in existing_env.items():
+                if key in SECRET_KEYS or key not in env_vars:
+                    env_vars[key] = value
+                    kept_keys.add(key)
+        
+        print(f"   ✅ Generated {len(env_vars)} environment variables")
+        for key, value in env_vars.items():
+            kept = ", kept" if key in kept_keys else ""
+            if key in SECRET_KEYS:
+                print(f"      {key}: {value[:6]}***{value[-3:]} (masked{kept})")
+            else:
+                print(f"      {key}: {value}{' (kept)' if kept else ''}")
+        print()
+        
+        yield team_nickname, {
             "team_info": {
                 "name": team_name,
                 "nickname": team_nickname,
@@ -126,18 +161,108 @@ def generate_teams_config(teams: List[Dict], base_url: str = "https://hub.hacklo
             },
             "environment_variables": env_vars
         }
-        
-        print(f"   ✅ Generated {len(env_vars)} environment variables")
-        for key, value in env_vars.items():
-            if key == "MERCHANT_PASSWORD":
-                print(f"      {key}: {value[:6]}***{value[-3:]} (masked)")
-            else:
-                print(f"      {key}: {value}")
-        print()
+
+
+def compute_config_changes(teams: Dict[str, Dict], existing_teams: Dict[str, Dict]) -> Dict:
+    """Describe how a regenerated config differs from the existing one.
+
+    Uses the export-diff changeset shape; changed entries list the variable
+    keys (and ``team_info``) that differ, so appliers can skip unaffected teams.
+    """
+    changed = {}
+    for team_nickname in sorted(teams.keys() & existing_teams.keys()):
+        new_env = teams[team_nickname]['environment_variables']
+        old_env = existing_teams[team_nickname].get('environment_variables', {})
+        fields = sorted(key for key in new_env.keys() | old_env.keys()
+                        if new_env.get(key) != old_env.get(key))
+        if teams[team_nickname]['team_info'] != existing_teams[team_nickname].get('team_info'):
+            fields.append('team_info')
+        if fields:
+            changed[team_nickname] = fields
+    
+    return {
+        "added": sorted(teams.keys() - existing_teams.keys()),
+        "removed": sorted(existing_teams.keys() - teams.keys()),
+        "changed": changed
+    }
+
+
+def generate_teams_config(teams: List[Dict], base_url: str = "https://hub.hackload.kz", 
+                         github_org: str = "hackload-kz",
+                         existing_teams: Optional[Dict[str, Dict]] = None) -> Dict:
+    """Generate complete configuration for all approved teams.
+
+    With ``existing_teams`` the result is merged with the existing config:
+    secrets of existing teams are kept, new teams get fresh ones, teams no
+    longer approved are dropped and ``meta.changes`` records the delta.
+    """
+    config = {
+        "meta": {**generate_config_meta(base_url, github_org), "total_teams": len(teams)},
+        "teams": {}
+    }
+    
+    print(f"🌐 Generating environment variables for {len(teams)} approved teams")
+    print(f"🏷️ Base URL: {base_url}")
+    print(f"🐙 GitHub Organization: {github_org}")
+    print()
+    
+    for team_nickname, team_config in iter_team_configs(teams, base_url, github_org, existing_teams):
+        config["teams"][team_nickname] = team_config
+    
+    if existing_teams is not None:
+        config["meta"]["changes"] = compute_config_changes(config["teams"], existing_teams)
     
     return config
 
 
+def write_teams_config_ndjson(teams: Iterable[Dict], out: TextIO,
+                              base_url: str = "https://hub.hackload.kz",
+                              github_org: str = "hackload-kz") -> int:
+    """Write a meta line, then one team per line as each is generated.
+
+    Lines are flushed as they are written so a consumer reading from a pipe
+    can start applying before generation finishes. Returns the team count.
+    """
+    print(f"🌐 Streaming environment variables for approved teams (NDJSON)")
+    print(f"🏷️ Base URL: {base_url}")
+    print(f"🐙 GitHub Organization: {github_org}")
+    print()
+    
+    meta = {**generate_config_meta(base_url, github_org), "format": "ndjson"}
+    out.write(json.dumps({"meta": meta}, ensure_ascii=False) + "\n")
+    count = 0
+    for team_nickname, team_config in iter_team_configs(teams, base_url, github_org):
+        out.write(json.dumps({"team": team_nickname, **team_config}, ensure_ascii=False) + "\n")
+        out.flush()
+        count += 1
+    return count
+
+
+def write_config_ndjson(config: Dict, out: TextIO):
+    """Write an in-memory config in the NDJSON layout."""
+    out.write(json.dumps({"meta": {**config["meta"], "format": "ndjson"}}, ensure_ascii=False) + "\n")
+    for team_nickname, team_config in config["teams"].items():
+        out.write(json.dumps({"team": team_nickname, **team_config}, ensure_ascii=False) + "\n")
+
+
+def load_existing_teams(config_file: str) -> Dict[str, Dict]:
+    """Load teams of an existing config (JSON or NDJSON) to merge with."""
+    meta = {}
+    try:
+        existing_teams = dict(team_env_module.iter_team_config(config_file, meta))
+    except FileNotFoundError:
+        print(f"⚠️ No existing config at {config_file}, all teams will be generated")
+        return {}
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"❌ Cannot update invalid config file {config_file}: {e}")
+        sys.exit(1)
+    
+    print(f"♻️ Updating existing config: {len(existing_teams)} teams, "
+          f"generated {meta.get('generated_at', 'Unknown')}")
+    print()
+    return existing_teams
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Generate environment variables configuration JSON for approved teams',
@@ -155,6 +280,13 @@ Examples:
   
   # Use custom teams file
   ./generate-team-env-config.py --teams-file custom-teams.json
+  
+  # Regenerate in place, keeping existing secrets, then apply only the changes
+  ./generate-team-env-config.py --update
+  ./set-merchant-password.py --only-changed
+  
+  # Stream NDJSON (one team per line) straight into a merchant script
+  ./generate-team-env-config.py --format ndjson -o - | ./set-merchant-id.py --config-file -
 
 Generated JSON structure:
 {
@@ -179,16 +311,36 @@ Generated JSON structure:
     parser.add_argument('--teams-file', default='approved-teams.json',
                        help='Path to teams JSON file (default: approved-teams.json)')
     parser.add_argument('--output', '-o', default='team-env-config.json',
-                       help='Output JSON file path (default: team-env-config.json)')
+                       help="Output file path, '-' for stdout (default: team-env-config.json)")
     parser.add_argument('--base-url', default='https://hub.hackload.kz',
                        help='Base URL for API endpoints (default: https://hub.hackload.kz)')
     parser.add_argument('--github-org', default='hackload-kz',
                        help='GitHub organization name (default: hackload-kz)')
     parser.add_argument('--pretty', action='store_true',
                        help='Format JSON output with indentation for readability')
+    parser.add_argument('--format', choices=['json', 'ndjson'],
+                       help='Output format (default: ndjson for *.ndjson output, json otherwise)')
+    parser.add_argument('--update', action='store_true',
+                       help='Merge with the existing output file, keeping secrets of existing teams')
     
     args = parser.parse_args()
     
+    if args.update and args.output == '-':
+        print("❌ --update needs an output file to merge with")
+        sys.exit(1)
+    output_format = args.format or ('ndjson' if args.output.endswith('.ndjson') else 'json')
+    
+    if args.output == '-':
+        # Keep stdout for the data, progress goes to stderr
+        data_out = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            generate(args, output_format, data_out)
+    else:
+        generate(args, output_format)
+
+
+def generate(args: argparse.Namespace, output_format: str, stdout: TextIO = None):
+    """Generate the configuration and write it to the output file or ``stdout``."""
     print("============================================================")
     print("Team Environment Configuration Generator for HackLoad 2025")
     print("============================================================")
@@ -197,32 +349,62 @@ Generated JSON structure:
     print(f"🌐 Base URL: {args.base_url}")
     print(f"🐙 GitHub org: {args.github_org}")
     print(f"🎨 Pretty format: {args.pretty}")
+    print(f"🧾 Output format: {output_format}")
+    print(f"♻️ Update mode: {args.update}")
     print()
     
-    # Load and validate approved teams
-    teams = load_teams_data(args.teams_file)
+    team_env_module.require_valid_data(teams_file=args.teams_file,
+                       config_file=args.output if args.update and os.path.exists(args.output) else None)
+    existing_teams = load_existing_teams(args.output) if args.update else None
+    changes = None
     
-    if not validate_approved_teams(teams):
-        sys.exit(1)
-    
-    # Generate configuration
-    config = generate_teams_config(teams, args.base_url, args.github_org)
-    
-    # Write configuration to file
+    # Files are written next to the target and swapped in at the end, so a
+    # failed run never leaves a truncated config (and its secrets) behind
+    tmp_file = f"{args.output}.tmp"
     try:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            if args.pretty:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+        with contextlib.ExitStack() as stack:
+            f = stdout or stack.enter_context(open(tmp_file, 'w', encoding='utf-8'))
+            
+            if output_format == 'ndjson' and existing_teams is None:
+                # Teams are streamed from the export and written as they are generated
+                team_count = write_teams_config_ndjson(iter_approved_teams(args.teams_file), f,
+                                                       args.base_url, args.github_org)
             else:
-                json.dump(config, f, ensure_ascii=False)
+                # Load and validate approved teams
+                teams = load_teams_data(args.teams_file)
+                
+                if not validate_approved_teams(teams):
+                    sys.exit(1)
+                
+                # Generate configuration
+                config = generate_teams_config(teams, args.base_url, args.github_org, existing_teams)
+                team_count = len(config['teams'])
+                changes = config['meta'].get('changes')
+                
+                if output_format == 'ndjson':
+                    write_config_ndjson(config, f)
+                elif args.pretty:
+                    json.dump(config, f, indent=2, ensure_ascii=False)
+                else:
+                    json.dump(config, f, ensure_ascii=False)
+        
+        if not stdout:
+            os.replace(tmp_file, args.output)
         
         print("=" * 60)
         print("📊 CONFIGURATION GENERATION SUMMARY")
         print("=" * 60)
-        print(f"Teams processed: {len(config['teams'])}")
-        print(f"Total environment variables: {len(config['teams']) * 6}")
+        print(f"Teams processed: {team_count}")
+        print(f"Total environment variables: {team_count * 6}")
         print(f"Output file: {args.output}")
-        print(f"File size: {os.path.getsize(args.output)} bytes")
+        if not stdout:
+            print(f"File size: {os.path.getsize(args.output)} bytes")
+        if changes is not None:
+            print(f"➕ Added teams: {len(changes['added'])}")
+            print(f"➖ Removed teams: {len(changes['removed'])}")
+            print(f"✏️ Changed teams: {len(changes['changed'])}")
+            for team_nickname, fields in changes['changed'].items():
+                print(f"   • {team_nickname}: {', '.join(fields)}")
         
         print()
         print("✅ Configuration file generated successfully!")
@@ -244,6 +426,10 @@ Generated JSON structure:
     except Exception as e:
         print(f"❌ Error writing configuration file: {e}")
         sys.exit(1)
+    finally:
+        # Also reached through sys.exit() during generation
+        if not stdout and os.path.exists(tmp_file):
+            os.remove(tmp_file)
 
 
 if __name__ == '__main__':
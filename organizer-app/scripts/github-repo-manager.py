@@ -7,18 +7,27 @@ Creates and manages GitHub repositories for HackLoad 2025 teams.
 import argparse
 import json
 import os
+import re
 import sys
+import threading
 import time
 import requests
-from typing import Dict, List, Optional, Set
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set
 from urllib.parse import urlparse
 
+from script_loader import load_script_module
+
 
 class GitHubAPI:
-    def __init__(self, token: str, org: str, dry_run: bool = False):
+    def __init__(self, token: str, org: str, dry_run: bool = False, breakers=None,
+                 timeout=None, deadline=None):
         self.token = token
         self.org = org
         self.dry_run = dry_run
+        self.breakers = breakers or team_env_module.CircuitBreakers('github')
+        self.timeout = timeout or team_env_module.DEFAULT_TIMEOUT
+        self.deadline = deadline or team_env_module.Deadline()
         self.headers = {
             'Authorization': f'token {token}',
             'Accept': 'application/vnd.github.v3+json',
@@ -26,6 +35,23 @@ class GitHubAPI:
         }
         self.base_url = 'https://api.github.com'
 
+    def request(self, family: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a GitHub request through its circuit breaker, bounded by timeout and deadline."""
+        return self.breakers.request(family, method, url,
+                                     timeout=self.deadline.timeout(self.timeout), **kwargs)
+
+    def get_all(self, family: str, url: str, params: Optional[Dict] = None) -> List[Dict]:
+        """GET every page of a list endpoint, following ``Link: rel="next"`` headers."""
+        items = []
+        params = {**(params or {}), 'per_page': 100}
+        while url:
+            response = self.request(family, 'GET', url, headers=self.headers, params=params)
+            response.raise_for_status()
+            items.extend(response.json())
+            url = response.links.get('next', {}).get('url')
+            params = None  # the next link carries the query
+        return items
+
     def create_repository(self, name: str, description: str) -> bool:
         """Create a new repository in the organization."""
         url = f"{self.base_url}/orgs/{self.org}/repos"
@@ -43,7 +69,7 @@ class GitHubAPI:
             return True
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
+            response = self.request('repos', 'POST', url, headers=self.headers, json=data)
             if response.status_code == 201:
                 print(f"✅ Created repository: {self.org}/{name}")
                 return True
@@ -57,8 +83,8 @@ class GitHubAPI:
             print(f"❌ Error creating repository {name}: {e}")
             return False
 
-    def get_collaborators(self, repo_name: str) -> Set[str]:
-        """Get current collaborators for a repository."""
+    def get_collaborators(self, repo_name: str, affiliation: str = 'all') -> Set[str]:
+        """Get current collaborators for a repository (``direct`` leaves out team grants)."""
         url = f"{self.base_url}/repos/{self.org}/{repo_name}/collaborators"
         
         if self.dry_run:
@@ -66,9 +92,7 @@ class GitHubAPI:
             return set()
         
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            collaborators = response.json()
+            collaborators = self.get_all('collaborators', url, {'affiliation': affiliation})
             return {collab['login'] for collab in collaborators}
         except requests.exceptions.RequestException as e:
             print(f"❌ Error getting collaborators for {repo_name}: {e}")
@@ -84,7 +108,7 @@ class GitHubAPI:
             return True
         
         try:
-            response = requests.put(url, headers=self.headers, json=data)
+            response = self.request('collaborators', 'PUT', url, headers=self.headers, json=data)
             if response.status_code in [201, 204]:
                 print(f"✅ Added collaborator: {username} to {repo_name}")
                 return True
@@ -103,7 +127,7 @@ class GitHubAPI:
             return True
         
         try:
-            response = requests.delete(url, headers=self.headers)
+            response = self.request('collaborators', 'DELETE', url, headers=self.headers)
             if response.status_code == 204:
                 print(f"✅ Removed collaborator: {username} from {repo_name}")
                 return True
@@ -113,60 +137,150 @@ class GitHubAPI:
             print(f"❌ Error removing collaborator {username} from {repo_name}: {e}")
             return False
 
-    def get_org_members(self) -> Set[str]:
-        """Get organization members (to avoid removing admins)."""
-        url = f"{self.base_url}/orgs/{self.org}/members"
-        
+    def ensure_team(self, name: str, description: str) -> Optional[Dict]:
+        """Create an organization team or return the existing one.
+
+        The returned dict contains the GitHub ``slug`` and a ``created`` flag.
+        """
+        url = f"{self.base_url}/orgs/{self.org}/teams"
+        slug = github_team_slug(name)
+        data = {
+            "name": name,
+            "description": description,
+            "privacy": "closed"
+        }
+
         if self.dry_run:
-            print(f"[DRY RUN] Would get org members for: {self.org}")
-            return set()
-        
+            print(f"[DRY RUN] Would ensure org team: {self.org}/{slug}")
+            return {"slug": slug, "created": False}
+
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            members = response.json()
-            return {member['login'] for member in members}
+            response = self.request('org-teams', 'POST', url, headers=self.headers, json=data)
+            if response.status_code == 201:
+                print(f"✅ Created org team: {self.org}/{response.json()['slug']}")
+                return {"slug": response.json()['slug'], "created": True}
+            elif response.status_code == 422:
+                # Team already exists, look it up by slug
+                response = self.request('org-teams', 'GET', f"{url}/{slug}", headers=self.headers)
+                response.raise_for_status()
+                return {"slug": response.json()['slug'], "created": False}
+            else:
+                response.raise_for_status()
         except requests.exceptions.RequestException as e:
-            print(f"❌ Error getting org members: {e}")
+            print(f"❌ Error ensuring org team {name}: {e}")
+            return None
+
+    def get_team_members(self, team_slug: str) -> Optional[Set[str]]:
+        """Get members of an org team, including pending invitations.
+
+        Maintainers are left out on purpose: GitHub adds the token owner as a
+        maintainer when it creates a team, and they must never be removed.
+        """
+        members_url = f"{self.base_url}/orgs/{self.org}/teams/{team_slug}/members"
+        invitations_url = f"{self.base_url}/orgs/{self.org}/teams/{team_slug}/invitations"
+
+        if self.dry_run:
+            print(f"[DRY RUN] Would get members for org team: {self.org}/{team_slug}")
             return set()
 
+        try:
+            members = {member['login']
+                       for member in self.get_all('org-teams', members_url, {'role': 'member'})}
+            members.update(invite['login'] for invite in self.get_all('org-teams', invitations_url)
+                           if invite.get('login'))
+            return members
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error getting members for org team {team_slug}: {e}")
+            return None
 
-class TeamEnvAPI:
-    def __init__(self, api_base_url: str, api_key: str, dry_run: bool = False):
-        self.api_base_url = api_base_url.rstrip('/')
-        self.api_key = api_key
-        self.dry_run = dry_run
+    def add_team_member(self, team_slug: str, username: str) -> bool:
+        """Add a user to an org team (sends an org invitation if needed)."""
+        url = f"{self.base_url}/orgs/{self.org}/teams/{team_slug}/memberships/{username}"
 
-    def set_repo_env_var(self, team_nickname: str, repo_url: str) -> bool:
-        """Set the repository URL as an environment variable."""
-        url = f"{self.api_base_url}/api/service/teams/{team_nickname}/environment/Repo"
-        
-        # Service API uses X-API-Key header
-        headers = {
-            'X-API-Key': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "value": repo_url,
-            "description": "Репозиторий для хранения кода в рамках хакатона",
-            "category": "development",
-            "isSecure": False
-        }
-        
         if self.dry_run:
-            print(f"[DRY RUN] Would set Repo env var for team {team_nickname}: {repo_url}")
+            print(f"[DRY RUN] Would add {username} to org team {self.org}/{team_slug}")
             return True
-        
+
         try:
-            response = requests.put(url, headers=headers, json=data)
+            response = self.request('org-teams', 'PUT', url, headers=self.headers, json={"role": "member"})
             response.raise_for_status()
-            print(f"✅ Set Repo URL for team {team_nickname}")
+            state = response.json().get('state', 'active')
+            print(f"✅ Added team member: {username} to {team_slug} ({state})")
             return True
         except requests.exceptions.RequestException as e:
-            print(f"❌ Error setting repo URL for team {team_nickname}: {e}")
+            print(f"❌ Error adding {username} to org team {team_slug}: {e}")
             return False
 
+    def remove_team_member(self, team_slug: str, username: str) -> bool:
+        """Remove a user from an org team (also cancels a pending invitation)."""
+        url = f"{self.base_url}/orgs/{self.org}/teams/{team_slug}/memberships/{username}"
+
+        if self.dry_run:
+            print(f"[DRY RUN] Would remove {username} from org team {self.org}/{team_slug}")
+            return True
+
+        try:
+            response = self.request('org-teams', 'DELETE', url, headers=self.headers)
+            if response.status_code == 204:
+                print(f"✅ Removed team member: {username} from {team_slug}")
+                return True
+            else:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error removing {username} from org team {team_slug}: {e}")
+            return False
+
+    def team_has_repo(self, team_slug: str, repo_name: str) -> bool:
+        """Check whether an org team already has access to a repository."""
+        url = f"{self.base_url}/orgs/{self.org}/teams/{team_slug}/repos/{self.org}/{repo_name}"
+
+        if self.dry_run:
+            print(f"[DRY RUN] Would check {self.org}/{team_slug} access to {self.org}/{repo_name}")
+            return False
+
+        try:
+            response = self.request('org-teams', 'GET', url, headers=self.headers)
+            return response.status_code in [200, 204]
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error checking team access to {repo_name}: {e}")
+            return False
+
+    def grant_team_repo(self, team_slug: str, repo_name: str, permission: str = "push") -> bool:
+        """Grant an org team a permission on a repository."""
+        url = f"{self.base_url}/orgs/{self.org}/teams/{team_slug}/repos/{self.org}/{repo_name}"
+
+        if self.dry_run:
+            print(f"[DRY RUN] Would grant {self.org}/{team_slug} {permission} on {self.org}/{repo_name}")
+            return True
+
+        try:
+            response = self.request('org-teams', 'PUT', url, headers=self.headers, json={"permission": permission})
+            if response.status_code == 204:
+                print(f"✅ Granted {permission} on {repo_name} to team {team_slug}")
+                return True
+            else:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error granting {team_slug} access to {repo_name}: {e}")
+            return False
+
+    def get_org_members(self) -> Set[str]:
+        """Get organization members (to avoid removing admins)."""
+        url = f"{self.base_url}/orgs/{self.org}/members"
+        
+        if self.dry_run:
+            print(f"[DRY RUN] Would get org members for: {self.org}")
+            return set()
+        
+        try:
+            return {member['login'] for member in self.get_all('org-members', url)}
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error getting org members: {e}")
+            return set()
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
 
 def extract_github_username(github_url: str) -> Optional[str]:
     """Extract GitHub username from various URL formats."""
@@ -192,26 +306,69 @@ def extract_github_username(github_url: str) -> Optional[str]:
     return None
 
 
+def github_team_slug(name: str) -> str:
+    """Predict the slug GitHub assigns to an org team with the given name."""
+    return re.sub(r'[^a-z0-9_]+', '-', name.lower()).strip('-')
+
+
+def get_expected_collaborators(team: Dict, email_to_github: Dict[str, str]) -> Dict[str, str]:
+    """Map GitHub usernames of team members to member names."""
+    member_github_mapping = {}
+
+    for member in team.get('members', []):
+        name = member.get('name', 'Unknown')
+        email = member.get('email', '')
+
+        if not email:
+            print(f"   ⚠️ Member {name}: No email address")
+            continue
+
+        github_url = email_to_github.get(email)
+        if github_url:
+            username = extract_github_username(github_url)
+            if username:
+                member_github_mapping[username] = name
+            else:
+                print(f"   ⚠️ Member {name}: Invalid GitHub URL format: {github_url}")
+        else:
+            print(f"   ⚠️ Member {name}: No GitHub URL found for email: {email}")
+
+    return member_github_mapping
+
+
+def get_roster_collaborators(roster_members: List[List]) -> Dict[str, str]:
+    """Map GitHub usernames to member names from prebuilt roster entries."""
+    member_github_mapping = {}
+
+    for name, email, login in roster_members:
+        if login:
+            member_github_mapping[login] = name
+        elif not email:
+            print(f"   ⚠️ Member {name}: No email address")
+        else:
+            print(f"   ⚠️ Member {name}: No GitHub login in roster for email: {email}")
+
+    return member_github_mapping
+
+
 def load_teams_data(teams_file: str) -> List[Dict]:
     """Load teams data from JSON file."""
     try:
-        with open(teams_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            teams = data.get('data', [])
-            # Filter for approved teams only
-            approved_teams = [team for team in teams if team.get('teamStatus') == 'APPROVED']
-            
-            total_teams = len(teams)
-            approved_count = len(approved_teams)
-            rejected_count = total_teams - approved_count
-            
-            print(f"📊 Team Statistics:")
-            print(f"   Total teams: {total_teams}")
-            print(f"   ✅ Approved teams: {approved_count}")
-            print(f"   ❌ Rejected/Other teams: {rejected_count}")
-            print()
-            
-            return approved_teams
+        # Filter for approved teams only, building compact records as the export is read
+        counts = {}
+        approved_teams = list(team_env_module.iter_team_records(teams_file, 'APPROVED', counts))
+        
+        total_teams = counts['total']
+        approved_count = len(approved_teams)
+        rejected_count = total_teams - approved_count
+        
+        print(f"📊 Team Statistics:")
+        print(f"   Total teams: {total_teams}")
+        print(f"   ✅ Approved teams: {approved_count}")
+        print(f"   ❌ Rejected/Other teams: {rejected_count}")
+        print()
+        
+        return approved_teams
     except FileNotFoundError:
         print(f"❌ Teams file not found: {teams_file}")
         sys.exit(1)
@@ -223,14 +380,11 @@ def load_teams_data(teams_file: str) -> List[Dict]:
 def load_members_data(members_file: str) -> Dict[str, str]:
     """Load members data and create email to GitHub URL mapping."""
     try:
-        with open(members_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            members = data.get('data', [])
-            return {
-                member['email']: member.get('githubUrl', '')
-                for member in members
-                if member.get('email') and member.get('githubUrl')
-            }
+        return {
+            member.email: member.github_url
+            for member in team_env_module.iter_member_records(members_file)
+            if member.get('email') and member.get('githubUrl')
+        }
     except FileNotFoundError:
         print(f"⚠️ Members file not found: {members_file}. GitHub collaborators won't be managed.")
         return {}
@@ -239,24 +393,251 @@ def load_members_data(members_file: str) -> Dict[str, str]:
         return {}
 
 
+class RateLimiter:
+    """Thread-safe limiter that spaces calls at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def default_throttle():
+    time.sleep(0.5)  # Rate limiting
+
+
+def sync_collaborator_access(github_api: GitHubAPI, team_nickname: str,
+                             member_github_mapping: Dict[str, str], org_members: Set[str],
+                             throttle: Callable[[], None] = default_throttle) -> Optional[bool]:
+    """Sync repository access through individual repo collaborators.
+
+    Returns True if collaborators changed, False if already in sync.
+    """
+    current_collaborators = github_api.get_collaborators(team_nickname)
+    expected_collaborators = set(member_github_mapping)
+    
+    print(f"   Expected collaborators: {len(expected_collaborators)}")
+    print(f"   Current collaborators: {len(current_collaborators)}")
+    
+    # Add missing collaborators
+    added_count = 0
+    for username in expected_collaborators:
+        if username not in current_collaborators:
+            member_name = member_github_mapping.get(username, username)
+            if github_api.add_collaborator(team_nickname, username):
+                print(f"   ✅ Added: {username} ({member_name})")
+                added_count += 1
+            throttle()
+    
+    # Remove unauthorized collaborators (but keep org members)
+    removed_count = 0
+    for username in current_collaborators:
+        if username not in expected_collaborators and username not in org_members:
+            if github_api.remove_collaborator(team_nickname, username):
+                print(f"   🗑️ Removed: {username}")
+                removed_count += 1
+            throttle()
+    
+    if added_count > 0 or removed_count > 0:
+        print(f"   📝 Collaborators updated: +{added_count}, -{removed_count}")
+        return True
+
+    print(f"   ✅ Collaborators already in sync")
+    return False
+
+
+def sync_org_team_access(github_api: GitHubAPI, team_nickname: str, team_name: str,
+                         member_github_mapping: Dict[str, str], org_members: Set[str],
+                         throttle: Callable[[], None] = default_throttle) -> Optional[bool]:
+    """Sync repository access through one GitHub org team per hackathon team.
+
+    When the team is first granted the repository, direct collaborators left
+    from collaborator mode are removed; org members who are not participants
+    of this team (organizers) keep their direct access.
+
+    Returns True if membership or repo access changed, False if already in sync
+    and None on failure.
+    """
+    description = f"HackLoad 2025 - Команда {team_name}"
+    github_team = github_api.ensure_team(team_nickname, description)
+    if not github_team:
+        return None
+
+    team_slug = github_team['slug']
+    changed = False
+
+    # Grant push on the repository once, when the team does not have it yet
+    if github_team['created'] or not github_api.team_has_repo(team_slug, team_nickname):
+        if not github_api.grant_team_repo(team_slug, team_nickname):
+            return None
+        changed = True
+
+        # Without the org member list organizers cannot be told apart, so remove nobody
+        preserved = org_members - set(member_github_mapping)
+        direct_collaborators = github_api.get_collaborators(team_nickname, affiliation='direct') \
+            if org_members else set()
+        for username in sorted(direct_collaborators):
+            if username not in preserved:
+                if github_api.remove_collaborator(team_nickname, username):
+                    print(f"   🗑️ Removed direct collaborator: {username} (access is now via {team_slug})")
+                throttle()
+
+    current_members = github_api.get_team_members(team_slug)
+    if current_members is None:
+        return None
+
+    expected_members = set(member_github_mapping)
+    to_add = expected_members - current_members
+    to_remove = current_members - expected_members
+
+    print(f"   Org team: {team_slug}")
+    print(f"   Expected members: {len(expected_members)}")
+    print(f"   Current members: {len(current_members)}")
+
+    added_count = 0
+    for username in sorted(to_add):
+        if github_api.add_team_member(team_slug, username):
+            print(f"   ✅ Added: {username} ({member_github_mapping[username]})")
+            added_count += 1
+        throttle()
+
+    removed_count = 0
+    for username in sorted(to_remove):
+        if github_api.remove_team_member(team_slug, username):
+            print(f"   🗑️ Removed: {username}")
+            removed_count += 1
+        throttle()
+
+    if added_count > 0 or removed_count > 0:
+        print(f"   📝 Team members updated: +{added_count}, -{removed_count}")
+        changed = True
+    else:
+        print(f"   ✅ Team members already in sync")
+
+    return changed
+
+
+def ensure_team_repository(github_api: GitHubAPI, team: Dict) -> bool:
+    """Pipeline stage 1: create the team repository or confirm it exists."""
+    description = f"HackLoad 2025 - Репозиторий команды {team['teamName']}"
+    return github_api.create_repository(team['teamNickname'], description)
+
+
+def sync_team_access(github_api: GitHubAPI, team: Dict, email_to_github: Dict[str, str],
+                     access_mode: str, org_members: Set[str],
+                     throttle: Callable[[], None] = default_throttle,
+                     roster: Optional[Dict[str, List]] = None) -> Optional[bool]:
+    """Pipeline stage 2: sync member access with the configured access mode."""
+    if roster is not None:
+        member_github_mapping = get_roster_collaborators(roster.get(team['teamNickname'], []))
+    else:
+        member_github_mapping = get_expected_collaborators(team, email_to_github)
+    if access_mode == 'org-team':
+        return sync_org_team_access(github_api, team['teamNickname'], team['teamName'],
+                                    member_github_mapping, org_members, throttle)
+    return sync_collaborator_access(github_api, team['teamNickname'], member_github_mapping,
+                                    org_members, throttle)
+
+
+def set_team_repo_env(team_env_api: team_env_module.TeamEnvAPI, github_org: str, team: Dict) -> bool:
+    """Pipeline stage 3: publish the repository URL to the hub."""
+    repo_url = f"https://github.com/{github_org}/{team['teamNickname']}"
+    metadata = team_env_module.CONFIG_VARIABLE_METADATA['Repo']
+    return team_env_api.set_team_env_var(team['teamNickname'], 'Repo', repo_url,
+                                         metadata['description'], metadata['category'],
+                                         metadata['is_secure'], metadata['is_editable'])
+
+
+def get_preserved_org_members(github_api: GitHubAPI, access_mode: str) -> Set[str]:
+    """Get org members to avoid removing them as collaborators.
+
+    In org-team mode they are only consulted when a repository switches from
+    collaborator access to its org team.
+    """
+    org_members = github_api.get_org_members()
+    if access_mode == 'collaborators':
+        print(f"🔐 Found {len(org_members)} organization members (will be preserved as collaborators)")
+    else:
+        print(f"👥 Access mode: one org team per hackathon team")
+        print(f"🔐 Found {len(org_members)} organization members "
+              f"(kept as direct collaborators when a repository switches to its team)")
+    print()
+    return org_members
+
+
+def print_sync_summary(success_count: int, total_count: int, repo_created_count: int,
+                       collaborators_managed_count: int, env_vars_set_count: int,
+                       access_mode: str, org_members: Set[str]) -> bool:
+    print("=" * 60)
+    print("📊 SYNCHRONIZATION SUMMARY")
+    print("=" * 60)
+    print(f"Teams processed: {success_count}/{total_count}")
+    print(f"Repositories created/verified: {repo_created_count}")
+    print(f"Teams with collaborator updates: {collaborators_managed_count}")
+    print(f"Environment variables set: {env_vars_set_count}")
+    if access_mode == 'collaborators':
+        print(f"Organization members preserved: {len(org_members)}")
+    
+    if success_count == total_count:
+        print("✅ All teams processed successfully!")
+    else:
+        print(f"⚠️ {total_count - success_count} teams had issues")
+    
+    return success_count == total_count
+
+
+def tripped_breakers(github_api: GitHubAPI, team_env_api: Optional[team_env_module.TeamEnvAPI],
+                     wait: bool = True):
+    """Return the breaker registry that should pause the run, if any.
+
+    With ``wait`` a registry whose circuit is open waits for its half-open
+    probe first; without it any open circuit counts.
+    """
+    registries = [github_api.breakers]
+    if team_env_api:
+        registries.append(team_env_api.breakers)
+    for breakers in registries:
+        if breakers.should_pause(deadline=github_api.deadline) if wait else breakers.open_breakers():
+            return breakers
+    return None
+
+
 def sync_team_repositories(teams: List[Dict], github_api: GitHubAPI, 
-                          team_env_api: Optional[TeamEnvAPI], 
-                          email_to_github: Dict[str, str]):
-    """Synchronize repositories for all teams."""
+                          team_env_api: Optional[team_env_module.TeamEnvAPI], 
+                          email_to_github: Dict[str, str],
+                          access_mode: str = 'collaborators',
+                          roster: Optional[Dict[str, List]] = None):
+    """Synchronize repositories for all teams.
+
+    Raises RunPaused / DeadlineReached (team-env-api) with the unfinished
+    teams when a circuit stays open or the deadline passes.
+    """
     success_count = 0
     total_count = len(teams)
     repo_created_count = 0
-    repo_updated_count = 0
     collaborators_managed_count = 0
     env_vars_set_count = 0
     
-    # Get org members to avoid removing them
-    org_members = github_api.get_org_members()
-    
-    print(f"🔐 Found {len(org_members)} organization members (will be preserved as collaborators)")
-    print()
+    org_members = get_preserved_org_members(github_api, access_mode)
+    failed_teams = []
     
     for i, team in enumerate(teams, 1):
+        remaining_teams = [t['teamNickname'] for t in teams[i - 1:] if t.get('teamNickname')]
+        if github_api.deadline.expired():
+            team_env_module.stop_at_deadline(github_api.deadline, failed_teams + remaining_teams)
+        breakers = tripped_breakers(github_api, team_env_api)
+        if breakers:
+            team_env_module.pause_run(breakers, failed_teams + remaining_teams)
         team_name = team['teamName']
         team_nickname = team['teamNickname']
         team_status = team.get('teamStatus', 'UNKNOWN')
@@ -271,84 +652,38 @@ def sync_team_repositories(teams: List[Dict], github_api: GitHubAPI,
             continue
         
         # 1. Create or update repository
-        description = f"HackLoad 2025 - Репозиторий команды {team_name}"
-        repo_created = github_api.create_repository(team_nickname, description)
+        repo_created = ensure_team_repository(github_api, team)
         
         if not repo_created:
             print(f"❌ Failed to create/access repository for team {team_nickname}")
+            failed_teams.append(team_nickname)
             continue
         else:
             repo_created_count += 1
         
         # 2. Manage collaborators
-        collaborators_updated = False
-        if email_to_github:
-            current_collaborators = github_api.get_collaborators(team_nickname)
-            
-            # Get expected collaborators from team members
-            expected_collaborators = set()
-            member_github_mapping = {}
-            
-            for member in team.get('members', []):
-                name = member.get('name', 'Unknown')
-                email = member.get('email', '')
-                
-                if not email:
-                    print(f"   ⚠️ Member {name}: No email address")
-                    continue
-                    
-                github_url = email_to_github.get(email)
-                if github_url:
-                    username = extract_github_username(github_url)
-                    if username:
-                        expected_collaborators.add(username)
-                        member_github_mapping[username] = name
-                    else:
-                        print(f"   ⚠️ Member {name}: Invalid GitHub URL format: {github_url}")
-                else:
-                    print(f"   ⚠️ Member {name}: No GitHub URL found for email: {email}")
-            
-            print(f"   Expected collaborators: {len(expected_collaborators)}")
-            print(f"   Current collaborators: {len(current_collaborators)}")
-            
-            # Add missing collaborators
-            added_count = 0
-            for username in expected_collaborators:
-                if username not in current_collaborators:
-                    member_name = member_github_mapping.get(username, username)
-                    if github_api.add_collaborator(team_nickname, username):
-                        print(f"   ✅ Added: {username} ({member_name})")
-                        added_count += 1
-                    time.sleep(0.5)  # Rate limiting
-            
-            # Remove unauthorized collaborators (but keep org members)
-            removed_count = 0
-            for username in current_collaborators:
-                if username not in expected_collaborators and username not in org_members:
-                    if github_api.remove_collaborator(team_nickname, username):
-                        print(f"   🗑️ Removed: {username}")
-                        removed_count += 1
-                    time.sleep(0.5)  # Rate limiting
-            
-            if added_count > 0 or removed_count > 0:
-                collaborators_updated = True
+        access_synced = True
+        if email_to_github or roster is not None:
+            result = sync_team_access(github_api, team, email_to_github, access_mode, org_members,
+                                      roster=roster)
+            if result is None:
+                access_synced = False
+                print(f"❌ Failed to sync access for team {team_nickname}")
+            elif result:
                 collaborators_managed_count += 1
-                print(f"   📝 Collaborators updated: +{added_count}, -{removed_count}")
-            else:
-                print(f"   ✅ Collaborators already in sync")
         
         # 3. Set repository URL as environment variable
         env_var_set = False
         if team_env_api:
-            repo_url = f"https://github.com/{github_api.org}/{team_nickname}"
-            if team_env_api.set_repo_env_var(team_nickname, repo_url):
+            if set_team_repo_env(team_env_api, github_api.org, team):
                 env_var_set = True
                 env_vars_set_count += 1
         
-        if repo_created and (not email_to_github or collaborators_updated or not collaborators_updated) and (not team_env_api or env_var_set):
+        if repo_created and access_synced and (not team_env_api or env_var_set):
             success_count += 1
             print(f"   ✅ Team processing completed successfully")
         else:
+            failed_teams.append(team_nickname)
             print(f"   ⚠️ Team processing completed with warnings")
         
         # Rate limiting between teams
@@ -356,21 +691,134 @@ def sync_team_repositories(teams: List[Dict], github_api: GitHubAPI,
             time.sleep(2)
         print()
     
-    print("=" * 60)
-    print("📊 SYNCHRONIZATION SUMMARY")
-    print("=" * 60)
-    print(f"Teams processed: {success_count}/{total_count}")
-    print(f"Repositories created/verified: {repo_created_count}")
-    print(f"Teams with collaborator updates: {collaborators_managed_count}")
-    print(f"Environment variables set: {env_vars_set_count}")
-    print(f"Organization members preserved: {len(org_members)}")
+    if failed_teams and github_api.deadline.expired():
+        team_env_module.stop_at_deadline(github_api.deadline, failed_teams)
     
-    if success_count == total_count:
-        print("✅ All teams processed successfully!")
-    else:
-        print(f"⚠️ {total_count - success_count} teams had issues")
-    
-    return success_count == total_count
+    return print_sync_summary(success_count, total_count, repo_created_count,
+                              collaborators_managed_count, env_vars_set_count,
+                              access_mode, org_members)
+
+
+def sync_team_repositories_pipelined(teams: List[Dict], github_api: GitHubAPI,
+                                     team_env_api: Optional[team_env_module.TeamEnvAPI],
+                                     email_to_github: Dict[str, str],
+                                     access_mode: str = 'collaborators',
+                                     stage_workers: Dict[str, int] = None,
+                                     stage_rates: Dict[str, float] = None,
+                                     roster: Optional[Dict[str, List]] = None):
+    """Synchronize repositories with a staged concurrent pipeline.
+
+    Each stage (repo ensure, access sync, hub env write) has its own worker
+    pool and rate limiter. A team enters the access and env stages as soon as
+    its repository exists, so hub writes overlap GitHub waits instead of
+    queueing behind them.
+    """
+    stage_workers = stage_workers or {'repo': 2, 'access': 4, 'env': 4}
+    stage_rates = stage_rates or {'repo': 1.0, 'access': 2.0, 'env': 5.0}
+    limiters = {stage: RateLimiter(rate) for stage, rate in stage_rates.items()}
+
+    total_count = len(teams)
+    org_members = get_preserved_org_members(github_api, access_mode)
+
+    print(f"🚀 Pipeline mode: " + ", ".join(
+        f"{stage}={stage_workers[stage]} workers @ {stage_rates[stage]}/s"
+        for stage in ('repo', 'access', 'env')))
+    print()
+
+    def run_stage(stage: str, func, *args):
+        limiters[stage].wait()
+        return func(*args)
+
+    # Per-team stage outcomes: True/False, None for a failed access sync and
+    # 'skipped' for stages that do not apply
+    outcomes = {team['teamNickname']: {} for team in teams if team.get('teamNickname')}
+    for team in teams:
+        if not team.get('teamNickname'):
+            print(f"⚠️ Skipping team {team.get('teamName', 'Unknown')}: No team nickname")
+
+    deadline = github_api.deadline
+    pools = {stage: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=stage)
+             for stage, workers in stage_workers.items()}
+    try:
+        pending = {}
+        for team in teams:
+            if team.get('teamNickname'):
+                future = pools['repo'].submit(run_stage, 'repo', ensure_team_repository,
+                                              github_api, team)
+                pending[future] = ('repo', team)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, team = pending.pop(future)
+                team_nickname = team['teamNickname']
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ [{stage}] {team_nickname}: {e}")
+                    result = None if stage == 'access' else False
+                outcomes[team_nickname][stage] = result
+                failed = result is None if stage == 'access' else not result
+                print(f"{'❌' if failed else '✅'} [{stage}] {team_nickname} {'failed' if failed else 'done'}")
+
+                if stage != 'repo' or not result or deadline.expired():
+                    continue
+
+                # Repository exists: access sync and hub env write can proceed independently
+                if email_to_github or roster is not None:
+                    access_throttle = limiters['access'].wait
+                    future = pools['access'].submit(run_stage, 'access', sync_team_access,
+                                                    github_api, team, email_to_github,
+                                                    access_mode, org_members, access_throttle,
+                                                    roster)
+                    pending[future] = ('access', team)
+                else:
+                    outcomes[team_nickname]['access'] = 'skipped'
+                if team_env_api:
+                    future = pools['env'].submit(run_stage, 'env', set_team_repo_env,
+                                                 team_env_api, github_api.org, team)
+                    pending[future] = ('env', team)
+                else:
+                    outcomes[team_nickname]['env'] = 'skipped'
+
+            if deadline.expired():
+                # Drop queued stage work; requests in flight end within the deadline
+                cancelled = [future for future in pending if future.cancel()]
+                for future in cancelled:
+                    pending.pop(future)
+                if cancelled:
+                    print(f"⌛ Deadline reached, cancelled {len(cancelled)} queued stage tasks")
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+
+    print()
+    success_count = sum(
+        1 for outcome in outcomes.values()
+        if outcome.get('repo') and outcome.get('access') is not None and outcome.get('env') is not False
+    )
+    repo_created_count = sum(1 for outcome in outcomes.values() if outcome.get('repo'))
+    collaborators_managed_count = sum(1 for outcome in outcomes.values() if outcome.get('access') is True)
+    env_vars_set_count = sum(1 for outcome in outcomes.values() if outcome.get('env') is True)
+
+    # Teams with a failed stage, or a stage cancelled at the deadline
+    unfinished_teams = [
+        nickname for nickname, outcome in outcomes.items()
+        if not outcome.get('repo') or outcome.get('access') is None
+        or outcome.get('env') in (None, False)
+    ]
+    if unfinished_teams and deadline.expired():
+        team_env_module.stop_at_deadline(deadline, unfinished_teams)
+
+    # With a circuit still open the failures above were rejected fast rather
+    # than attempted; hand them back as a changeset instead of a hard failure
+    breakers = tripped_breakers(github_api, team_env_api, wait=False)
+    if breakers:
+        team_env_module.pause_run(breakers, unfinished_teams)
+
+    return print_sync_summary(success_count, total_count, repo_created_count,
+                              collaborators_managed_count, env_vars_set_count,
+                              access_mode, org_members)
 
 
 def validate_approved_teams(teams: List[Dict]) -> bool:
@@ -395,6 +843,10 @@ def main():
                        help='Path to teams JSON file')
     parser.add_argument('--members-file', default='approved-members.json',
                        help='Path to members JSON file with GitHub URLs')
+    parser.add_argument('--only-changed', metavar='CHANGESET',
+                       help='Process only teams added or changed in an export-diff changeset')
+    parser.add_argument('--roster-file',
+                       help='Use (and incrementally rebuild) a team roster artifact instead of the raw members file')
     parser.add_argument('--github-token',
                        default=os.getenv('GITHUB_TOKEN'),
                        help='GitHub personal access token')
@@ -411,8 +863,40 @@ def main():
                        help='Show what would be done without making changes')
     parser.add_argument('--no-env-vars', action='store_true',
                        help='Skip setting repository URLs as environment variables')
+    parser.add_argument('--access-mode', choices=['collaborators', 'org-team'], default='collaborators',
+                       help='Grant access via repo collaborators or via one org team per team (default: collaborators)')
+    parser.add_argument('--breaker-failures', type=int, default=5,
+                       help='Consecutive failures that open a circuit (default: 5)')
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                       help='Seconds an open circuit waits before a half-open probe (default: 30)')
+    parser.add_argument('--pending-file', default='pending-teams.json',
+                       help='Changeset of unfinished teams written when a circuit pauses the run '
+                            'or the deadline passes (default: pending-teams.json)')
+    parser.add_argument('--github-timeout', type=team_env_module.parse_timeout,
+                       default=team_env_module.DEFAULT_TIMEOUT, metavar='CONNECT,READ',
+                       help='GitHub request timeouts in seconds (default: 10,30)')
+    parser.add_argument('--hub-timeout', type=team_env_module.parse_timeout,
+                       default=team_env_module.DEFAULT_TIMEOUT, metavar='CONNECT,READ',
+                       help='Hub request timeouts in seconds (default: 10,30)')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                       help='Stop the run after this many seconds, saving unfinished teams to --pending-file')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Run repo, access and env stages concurrently with per-stage worker pools')
+    parser.add_argument('--repo-workers', type=int, default=2,
+                       help='Pipeline workers for repository creation (default: 2)')
+    parser.add_argument('--access-workers', type=int, default=4,
+                       help='Pipeline workers for access sync (default: 4)')
+    parser.add_argument('--env-workers', type=int, default=4,
+                       help='Pipeline workers for hub env writes (default: 4)')
+    parser.add_argument('--repo-rate', type=float, default=1.0,
+                       help='Max repository calls per second in pipeline mode (default: 1)')
+    parser.add_argument('--access-rate', type=float, default=2.0,
+                       help='Max access sync calls per second in pipeline mode (default: 2)')
+    parser.add_argument('--env-rate', type=float, default=5.0,
+                       help='Max hub env writes per second in pipeline mode (default: 5)')
     
     args = parser.parse_args()
+    deadline = team_env_module.Deadline(args.deadline)
     
     if not args.github_token:
         print("❌ GitHub token is required. Set GITHUB_TOKEN environment variable or use --github-token")
@@ -423,38 +907,71 @@ def main():
     print("============================================================")
     print(f"📁 Teams file: {args.teams_file}")
     print(f"👥 Members file: {args.members_file}")
+    if args.roster_file:
+        print(f"🗂️ Roster file: {args.roster_file}")
     print(f"🏢 GitHub org: {args.github_org}")
     print(f"🌐 API base URL: {args.api_base_url}")
     print(f"🧪 Dry run: {args.dry_run}")
     print(f"🔧 Set env vars: {not args.no_env_vars}")
+    print(f"🔑 Access mode: {args.access_mode}")
+    print(f"🚀 Pipeline: {args.pipeline}")
     print()
     
-    # Load data
+    # Validate everything up front, then load data
+    team_env_module.require_valid_data(teams_file=args.teams_file, members_file=args.members_file)
     teams = load_teams_data(args.teams_file)
-    email_to_github = load_members_data(args.members_file)
-    
-    print(f"📋 Found {len(teams)} approved teams")
-    print(f"👥 Found {len(email_to_github)} members with GitHub URLs")
+    roster = None
+    email_to_github = {}
+    if args.roster_file:
+        roster_module = load_script_module("team_roster", "team-roster.py")
+        roster = roster_module.build_roster(args.teams_file, args.members_file, args.roster_file)['teams']
+        print(f"📋 Found {len(teams)} approved teams")
+        print(f"👥 Found {sum(1 for members in roster.values() for member in members if member[2])} "
+              f"roster members with GitHub logins")
+    else:
+        email_to_github = load_members_data(args.members_file)
+        print(f"📋 Found {len(teams)} approved teams")
+        print(f"👥 Found {len(email_to_github)} members with GitHub URLs")
     
     # Validate that we only have approved teams
     if not validate_approved_teams(teams):
         sys.exit(1)
     
+    if args.only_changed:
+        teams = team_env_module.filter_changed_teams(teams, args.only_changed)
+    
     if args.dry_run:
         print("🧪 DRY RUN MODE - No changes will be made")
     print()
     
     # Initialize APIs
-    github_api = GitHubAPI(args.github_token, args.github_org, args.dry_run)
+    breaker_settings = {'failure_threshold': args.breaker_failures,
+                        'reset_timeout': args.breaker_reset}
+    github_api = GitHubAPI(args.github_token, args.github_org, args.dry_run,
+                           team_env_module.CircuitBreakers('github', **breaker_settings),
+                           args.github_timeout, deadline)
     
     team_env_api = None
     if not args.no_env_vars and args.api_key:
-        team_env_api = TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run)
+        team_env_api = team_env_module.TeamEnvAPI(
+            args.api_base_url, args.api_key, args.dry_run,
+            team_env_module.CircuitBreakers('hub', **breaker_settings), args.hub_timeout, deadline)
     elif not args.no_env_vars:
         print("⚠️ No API key provided, skipping environment variable updates")
     
     # Sync repositories
-    success = sync_team_repositories(teams, github_api, team_env_api, email_to_github)
+    try:
+        if args.pipeline:
+            success = sync_team_repositories_pipelined(
+                teams, github_api, team_env_api, email_to_github, args.access_mode,
+                {'repo': args.repo_workers, 'access': args.access_workers, 'env': args.env_workers},
+                {'repo': args.repo_rate, 'access': args.access_rate, 'env': args.env_rate},
+                roster)
+        else:
+            success = sync_team_repositories(teams, github_api, team_env_api, email_to_github,
+                                             args.access_mode, roster)
+    except team_env_module.RunStopped as stopped:
+        team_env_module.exit_stopped_run(stopped, args.pending_file)
     
     if not success:
         sys.exit(1)
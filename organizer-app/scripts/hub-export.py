@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Hub Export Downloader for HackLoad 2025
+Pulls approved-teams.json / approved-members.json directly from the hub export endpoints.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from script_loader import load_script_module
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
+
+def teams_export_params(filters: Dict) -> Dict[str, str]:
+    """Query parameters of the teams environment export, taken from the file header filters."""
+    params = {
+        'format': 'json',
+        'includeValues': 'true' if filters.get('includeValues', True) else 'false'
+    }
+    if filters.get('teamIds'):
+        params['teamIds'] = ','.join(filters['teamIds'])
+    if filters.get('categories'):
+        params['categories'] = ','.join(filters['categories'])
+    return params
+
+
+def members_export_params(filters: Dict) -> Dict[str, str]:
+    """Query parameters of the participants export, taken from the file header filters."""
+    params = {
+        'format': 'json',
+        'type': filters.get('exportType', 'large-teams')
+    }
+    if filters.get('useRawQuery'):
+        params['raw'] = 'true'
+    return params
+
+
+EXPORTS = {
+    'teams': {
+        'path': '/api/dashboard/export/teams-environment',
+        'file': 'approved-teams.json',
+        'params': teams_export_params
+    },
+    'members': {
+        'path': '/api/dashboard/export/participants',
+        'file': 'approved-members.json',
+        'params': members_export_params
+    }
+}
+
+
+def read_export_header(path: str) -> Dict:
+    """Read the top-level keys preceding the data array of an existing export."""
+    header = {}
+    try:
+        next(team_env_module.iter_json_array(path, header=header), None)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return header
+
+
+def export_content_hash(path: str) -> str:
+    """Hash export content, ignoring exportDate and formatting.
+
+    Exports are regenerated on every request, so a byte-level hash would
+    always differ; records and filters are hashed in canonical form instead.
+    """
+    digest = hashlib.sha256()
+    header = {}
+    for item in team_env_module.iter_json_array(path, header=header):
+        digest.update(json.dumps(item, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    header.pop('exportDate', None)
+    digest.update(json.dumps(header, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_json_file(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_json_file(path: str, data: Dict):
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_file, path)
+
+
+class HubExporter:
+    def __init__(self, api_base_url: str, session_token: str, cookie_name: str = None):
+        self.api_base_url = api_base_url.rstrip('/')
+        if not cookie_name:
+            # NextAuth v5 prefixes the cookie with __Secure- on https
+            secure = urlparse(self.api_base_url).scheme == 'https'
+            cookie_name = f"{'__Secure-' if secure else ''}authjs.session-token"
+        self.session = requests.Session()
+        self.session.cookies.set(cookie_name, session_token)
+
+    def pull(self, kind: str, output: str) -> Optional[bool]:
+        """Download one export. Returns True if the local file was replaced,
+        False if the content was unchanged, None on failure.
+
+        The body is streamed to ``<output>.part``. An interrupted download is
+        resumed with Range/If-Range against the stored ETag; a 200 reply
+        means the data changed meanwhile and the download restarts.
+        """
+        spec = EXPORTS[kind]
+        url = f"{self.api_base_url}{spec['path']}"
+        header = read_export_header(output)
+        params = spec['params'](header.get('filters', {}))
+
+        part_file = f"{output}.part"
+        part_meta_file = f"{part_file}.json"
+        meta_file = f"{output}.meta.json"
+        part_meta = load_json_file(part_meta_file)
+        meta = load_json_file(meta_file)
+
+        headers = {'Accept-Encoding': 'gzip'}
+        etag = part_meta.get('etag')
+        offset = 0
+        if (os.path.exists(part_file) and os.path.getsize(part_file) and part_meta.get('etag')
+                and part_meta.get('params') == params):
+            offset = os.path.getsize(part_file)
+            # Byte ranges refer to the identity encoding the partial file holds
+            headers.update({
+                'Range': f"bytes={offset}-",
+                'If-Range': part_meta['etag'],
+                'Accept-Encoding': 'identity'
+            })
+            print(f"⏯️  Resuming {output} from {offset} bytes")
+        elif meta.get('etag') and meta.get('params') == params and os.path.exists(output):
+            headers['If-None-Match'] = meta['etag']
+
+        print(f"📥 GET {spec['path']} {params}")
+        try:
+            response = self.session.get(url, params=params, headers=headers, stream=True,
+                                        allow_redirects=False, timeout=(10, 120))
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Request failed: {e}")
+            return None
+
+        with response:
+            if response.status_code == 304:
+                print(f"✅ {output} is up to date (ETag match)")
+                return False
+            if response.status_code == 416:
+                print(f"📦 Partial download of {output} is already complete")
+            elif response.status_code in (301, 302, 303, 307, 308, 401):
+                print(f"❌ Not authenticated (HTTP {response.status_code}). Check the session token.")
+                return None
+            elif response.status_code == 403:
+                print("❌ Organizer access required for exports")
+                return None
+            elif response.status_code not in (200, 206):
+                print(f"❌ Export failed: HTTP {response.status_code}")
+                return None
+
+            if response.status_code != 416:
+                if response.status_code == 200 and offset:
+                    print("🔄 Export changed since the interrupted download, restarting")
+                mode = 'ab' if response.status_code == 206 else 'wb'
+                etag = response.headers.get('ETag')
+                save_json_file(part_meta_file, {'etag': etag, 'params': params})
+
+                received = 0
+                try:
+                    with open(part_file, mode) as f:
+                        # iter_content transparently decodes gzip
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                            received += len(chunk)
+                except (requests.exceptions.RequestException, KeyboardInterrupt) as e:
+                    print(f"⚠️ Download interrupted after {received} bytes ({type(e).__name__}). "
+                          f"Run again to resume.")
+                    return None
+                print(f"📦 Received {received} bytes")
+
+        try:
+            new_hash = export_content_hash(part_file)
+        except json.JSONDecodeError as e:
+            print(f"❌ Downloaded export is not valid JSON: {e}")
+            os.remove(part_file)
+            os.remove(part_meta_file)
+            return None
+
+        old_hash = None
+        if os.path.exists(output):
+            stat = os.stat(output)
+            if meta.get('size') == stat.st_size and meta.get('mtime_ns') == stat.st_mtime_ns:
+                old_hash = meta.get('content_sha256')
+            else:
+                old_hash = export_content_hash(output)
+
+        if new_hash == old_hash:
+            os.remove(part_file)
+            changed = False
+            print(f"✅ {output} content unchanged")
+        else:
+            os.replace(part_file, output)
+            changed = True
+            print(f"✅ {output} updated")
+        os.remove(part_meta_file)
+
+        stat = os.stat(output)
+        save_json_file(meta_file, {
+            'etag': etag,
+            'params': params,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_sha256': new_hash
+        })
+        return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Download team/member exports directly from the hub',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Refresh approved-teams.json and approved-members.json
+  ./hub-export.py pull
+
+  # Refresh only the teams export into a custom file
+  ./hub-export.py pull teams --output exports/teams.json
+
+Authentication uses an organizer browser session: copy the value of the
+authjs.session-token cookie (__Secure-authjs.session-token on https) into
+HUB_SESSION_TOKEN. Filters are taken from the header of the existing file.
+        """
+    )
+    parser.add_argument('--api-base-url',
+                       default=os.getenv('API_BASE_URL', 'https://hub.hackload.kz'),
+                       help='Hub base URL (default: https://hub.hackload.kz or API_BASE_URL env var)')
+    parser.add_argument('--session-token',
+                       default=os.getenv('HUB_SESSION_TOKEN'),
+                       help='Organizer session cookie value (or set HUB_SESSION_TOKEN env var)')
+    parser.add_argument('--cookie-name',
+                       help='Session cookie name (default: derived from the URL scheme)')
+
+    subparsers = parser.add_subparsers(dest='action', help='Available actions')
+
+    pull_parser = subparsers.add_parser('pull', help='Download exports')
+    pull_parser.add_argument('kind', nargs='?', choices=['teams', 'members', 'all'], default='all',
+                            help='Which export to pull (default: all)')
+    pull_parser.add_argument('--output', '-o',
+                            help='Output file (single export only, default: approved-<kind>.json)')
+
+    args = parser.parse_args()
+
+    if args.action != 'pull':
+        parser.print_help()
+        return
+
+    if not args.session_token:
+        print("❌ Session token is required. Set HUB_SESSION_TOKEN environment variable or use --session-token")
+        sys.exit(1)
+    if args.output and args.kind == 'all':
+        print("❌ --output requires a single export kind (teams or members)")
+        sys.exit(1)
+
+    exporter = HubExporter(args.api_base_url, args.session_token, args.cookie_name)
+    kinds = ['teams', 'members'] if args.kind == 'all' else [args.kind]
+
+    failed = False
+    for kind in kinds:
+        output = args.output or EXPORTS[kind]['file']
+        if exporter.pull(kind, output) is None:
+            failed = True
+        print()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
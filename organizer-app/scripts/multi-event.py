@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Multi-Event Batch Runner for HackLoad 2025
+Runs config generation, environment rollout and repository sync for several
+events (export/config pairs) in parallel, one worker process per event.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+from script_loader import load_script_module
+
+
+STEPS = ['config', 'env', 'repos']
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+generate_module = load_script_module("generate_team_env_config", "generate-team-env-config.py")
+reconcile_module = load_script_module("reconcile_daemon", "reconcile-daemon.py")
+github_module = load_script_module("github_repo_manager", "github-repo-manager.py")
+validate_module = load_script_module("validate_data", "validate-data.py")
+
+
+class RateBudgetedTeamEnvAPI(team_env_module.TeamEnvAPI):
+    """Hub client whose writes are spaced to the event's rate budget."""
+
+    def __init__(self, api_base_url: str, api_key: str, dry_run: bool = False, rate: float = 0.0):
+        super().__init__(api_base_url, api_key, dry_run)
+        self.limiter = github_module.RateLimiter(rate)
+
+    def put_team_env_var(self, *args, **kwargs):
+        self.limiter.wait()
+        return super().put_team_env_var(*args, **kwargs)
+
+    def put_team_env_vars(self, *args, **kwargs):
+        self.limiter.wait()
+        return super().put_team_env_vars(*args, **kwargs)
+
+
+def load_events(batch_file: str, cli_events: List[str], work_root: str) -> List[Dict]:
+    """Build the event list from the batch file and ``--event`` options.
+
+    Paths in the batch file are relative to the batch file. Every event gets
+    its own work directory; relative state files (reconcile state, ledgers,
+    caches) live there, so events never share state.
+    """
+    events = []
+    if batch_file:
+        with open(batch_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        base_dir = os.path.dirname(os.path.abspath(batch_file))
+        for event in data.get('events', []):
+            event = dict(event)
+            for key in ('teams_file', 'members_file', 'config_file', 'psid_file', 'work_dir'):
+                if event.get(key):
+                    event[key] = os.path.join(base_dir, event[key])
+            events.append(event)
+
+    for spec in cli_events or []:
+        parts = spec.split(':')
+        if len(parts) not in (2, 3) or not all(parts):
+            raise ValueError(f"Invalid --event '{spec}', expected NAME:TEAMS_FILE[:CONFIG_FILE]")
+        event = {'name': parts[0], 'teams_file': parts[1]}
+        if len(parts) == 3:
+            event['config_file'] = parts[2]
+        events.append(event)
+
+    names = set()
+    for event in events:
+        name = event.get('name')
+        if not name or not event.get('teams_file'):
+            raise ValueError(f"Every event needs a name and a teams_file: {event}")
+        if name in names:
+            raise ValueError(f"Duplicate event name: {name}")
+        names.add(name)
+
+        event['work_dir'] = os.path.abspath(event.get('work_dir') or os.path.join(work_root, name))
+        event['teams_file'] = os.path.abspath(event['teams_file'])
+        event['config_file'] = os.path.abspath(
+            event.get('config_file') or os.path.join(event['work_dir'], 'team-env-config.json'))
+        if event.get('members_file'):
+            event['members_file'] = os.path.abspath(event['members_file'])
+        if event.get('psid_file'):
+            event['psid_file'] = os.path.abspath(event['psid_file'])
+        unknown = set(event.get('steps', [])) - set(STEPS)
+        if unknown:
+            raise ValueError(f"Unknown steps for event {name}: {', '.join(sorted(unknown))}")
+    return events
+
+
+def generate_config(event: Dict, options: Dict, config_file: str) -> Dict:
+    """Regenerate the event's config in --update mode and return meta.changes."""
+    if config_file != event['config_file'] and os.path.exists(event['config_file']):
+        # Dry runs update a scratch copy so existing secrets still carry over
+        shutil.copyfile(event['config_file'], config_file)
+
+    output_format = 'ndjson' if config_file.endswith('.ndjson') else 'json'
+    generate_module.generate(argparse.Namespace(
+        teams_file=event['teams_file'],
+        output=config_file,
+        base_url=event.get('base_url', options['base_url']),
+        github_org=event.get('github_org', options['github_org']),
+        pretty=True,
+        update=True
+    ), output_format)
+
+    meta = {}
+    next(team_env_module.iter_team_config(config_file, meta=meta), None)
+    return meta.get('changes') or {'added': [], 'removed': [], 'changed': {}}
+
+
+def run_event(event: Dict, options: Dict) -> Dict:
+    """Process one event in the current (worker) process.
+
+    Output goes to ``<work_dir>/run.log``; the returned summary is all the
+    parent sees.
+    """
+    started = time.monotonic()
+    dry_run = options['dry_run']
+    steps = event.get('steps') or options['steps']
+    os.makedirs(event['work_dir'], exist_ok=True)
+    log_file = os.path.join(event['work_dir'], 'run.log')
+
+    summary = {
+        'event': event['name'],
+        'ok': True,
+        'teams': 0,
+        'added': 0,
+        'removed': 0,
+        'changed': 0,
+        'drift': 0,
+        'writes': 0,
+        'write_failures': 0,
+        'repos': 'skipped',
+        'errors': [],
+        'log': log_file
+    }
+
+    previous_cwd = os.getcwd()
+    with open(log_file, 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            os.chdir(event['work_dir'])
+
+            validation = validate_module.validate_files(
+                event['teams_file'], event.get('members_file'),
+                event['config_file'] if os.path.exists(event['config_file']) else None)
+            error_count = validate_module.print_problems(validation)
+            if error_count:
+                raise RuntimeError(f"data validation failed ({error_count} errors)")
+
+            config_file = event['config_file']
+            if 'config' in steps:
+                if dry_run:
+                    config_file = os.path.join(event['work_dir'], 'team-env-config.dry-run.json')
+                try:
+                    changes = generate_config(event, options, config_file)
+                except SystemExit:
+                    raise RuntimeError("config generation failed")
+                summary['added'] = len(changes['added'])
+                summary['removed'] = len(changes['removed'])
+                summary['changed'] = len(changes['changed'])
+                print()
+
+            if os.path.exists(config_file):
+                summary['teams'] = sum(1 for _ in team_env_module.iter_team_config(config_file))
+
+            github_token = os.getenv(event['github_token_env']) if event.get('github_token_env') \
+                else options['github_token']
+            if 'repos' not in steps:
+                github_token = None
+
+            api_key = os.getenv(event['api_key_env']) if event.get('api_key_env') else options['api_key']
+            if 'env' in steps and not api_key:
+                raise RuntimeError("no API key for the hub")
+
+            reconcile_args = argparse.Namespace(
+                teams_file=event['teams_file'],
+                members_file=event.get('members_file') or os.path.join(
+                    os.path.dirname(event['teams_file']), 'approved-members.json'),
+                config_file=config_file,
+                psid_file=event.get('psid_file'),
+                keys=None,
+                github_token=github_token,
+                github_org=event.get('github_org', options['github_org']),
+                access_mode=event.get('access_mode', 'collaborators'),
+                state_dir='.reconcile-state',
+                state_cache=None,
+                dry_run=dry_run
+            )
+            team_env_api = RateBudgetedTeamEnvAPI(
+                event.get('api_base_url', options['api_base_url']), api_key, dry_run,
+                event.get('rate', options['rate']))
+            metrics = reconcile_module.Metrics()
+            reconciler = reconcile_module.Reconciler(reconcile_args, team_env_api, metrics)
+
+            if 'env' in steps:
+                if not reconciler.reconcile_environment():
+                    summary['ok'] = False
+                    summary['errors'].append("environment rollout incomplete")
+            if github_token:
+                repos_ok = reconciler.reconcile_repositories()
+                summary['repos'] = 'ok' if repos_ok else 'failed'
+                if not repos_ok:
+                    summary['ok'] = False
+                    summary['errors'].append("repository sync incomplete")
+
+            values = metrics.snapshot()
+            summary['drift'] = int(values['drift_detected_total'])
+            summary['writes'] = int(values['hub_writes_total'])
+            summary['write_failures'] = int(values['hub_write_failures_total'])
+        except Exception as e:
+            print(f"❌ {e}")
+            summary['ok'] = False
+            summary['errors'].append(str(e))
+        finally:
+            os.chdir(previous_cwd)
+
+    summary['duration'] = round(time.monotonic() - started, 1)
+    return summary
+
+
+def print_summary(summaries: List[Dict], wall_time: float):
+    print("=" * 60)
+    print("📊 MULTI-EVENT SUMMARY")
+    print("=" * 60)
+    header = f"{'Event':<20} {'Teams':>5} {'+/-/~':>9} {'Drift':>5} {'Writes':>6} {'Fail':>4} {'Repos':>7} {'Time':>7}"
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        config_delta = f"{s['added']}/{s['removed']}/{s['changed']}"
+        status = '✅' if s['ok'] else '❌'
+        print(f"{s['event'][:20]:<20} {s['teams']:>5} {config_delta:>9} {s['drift']:>5} "
+              f"{s['writes']:>6} {s['write_failures']:>4} {s['repos']:>7} {s['duration']:>6}s {status}")
+    print("-" * len(header))
+
+    totals = {key: sum(s[key] for s in summaries)
+              for key in ('teams', 'drift', 'writes', 'write_failures')}
+    print(f"{'Total':<20} {totals['teams']:>5} {'':>9} {totals['drift']:>5} "
+          f"{totals['writes']:>6} {totals['write_failures']:>4} {'':>7} {wall_time:>6.1f}s")
+    print()
+
+    failed = [s for s in summaries if not s['ok']]
+    if failed:
+        print(f"❌ {len(failed)} of {len(summaries)} events failed:")
+        for s in failed:
+            print(f"   • {s['event']}: {'; '.join(s['errors'])} (see {s['log']})")
+    else:
+        print(f"✅ All {len(summaries)} events processed successfully")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run config generation, env rollout and repo sync for several events in parallel',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Process every event listed in a batch file, 4 events at a time
+  ./multi-event.py --batch-file events.json --workers 4
+
+  # Two events given on the command line (NAME:TEAMS_FILE[:CONFIG_FILE])
+  ./multi-event.py --event main:main/approved-teams.json \\
+                   --event rehearsal:rehearsal/approved-teams.json
+
+  # Only regenerate configs and preview the environment rollout
+  ./multi-event.py --batch-file events.json --steps config,env --dry-run
+
+Batch file format:
+{
+  "events": [
+    {
+      "name": "hackload-2025",
+      "teams_file": "main/approved-teams.json",
+      "members_file": "main/approved-members.json",
+      "config_file": "main/team-env-config.json",
+      "api_base_url": "https://hub.hackload.kz",
+      "api_key_env": "MAIN_SERVICE_API_KEY",
+      "rate": 5,
+      "steps": ["config", "env", "repos"]
+    }
+  ]
+}
+Only name and teams_file are required; the rest defaults to the command line options.
+        """
+    )
+    parser.add_argument('--batch-file',
+                       help='JSON file listing the events to process')
+    parser.add_argument('--event', action='append', metavar='NAME:TEAMS_FILE[:CONFIG_FILE]',
+                       help='Add an event (repeatable)')
+    parser.add_argument('--steps', default=','.join(STEPS),
+                       help=f"Comma-separated steps to run per event (default: {','.join(STEPS)})")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                       help='Events processed in parallel (default: number of CPUs)')
+    parser.add_argument('--rate', type=float, default=5.0,
+                       help='Hub writes per second per event (default: 5, 0 = unlimited)')
+    parser.add_argument('--work-root', default='.multi-event',
+                       help='Parent of the per-event work directories (default: .multi-event)')
+    parser.add_argument('--api-base-url',
+                       default=os.getenv('API_BASE_URL', 'https://hub.hackload.kz'),
+                       help='API base URL')
+    parser.add_argument('--api-key',
+                       default=os.getenv('SERVICE_API_KEY'),
+                       help='Service API key')
+    parser.add_argument('--github-token',
+                       default=os.getenv('GITHUB_TOKEN'),
+                       help='GitHub token; repository sync is skipped without it')
+    parser.add_argument('--github-org',
+                       default=os.getenv('GITHUB_ORG', 'hackload-kz'),
+                       help='GitHub organization name')
+    parser.add_argument('--base-url', default='https://hub.hackload.kz',
+                       help='Base URL for generated endpoint variables')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Generate configs into scratch files and do not write to the hub or GitHub')
+
+    args = parser.parse_args()
+
+    steps = [step for step in args.steps.split(',') if step]
+    if set(steps) - set(STEPS):
+        print(f"❌ Unknown steps: {', '.join(sorted(set(steps) - set(STEPS)))}")
+        sys.exit(1)
+
+    try:
+        events = load_events(args.batch_file, args.event, args.work_root)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not events:
+        print("❌ No events given. Use --batch-file or --event")
+        sys.exit(1)
+
+    missing = [event['teams_file'] for event in events if not os.path.exists(event['teams_file'])]
+    if missing:
+        for path in missing:
+            print(f"❌ Teams file not found: {path}")
+        sys.exit(1)
+
+    workers = max(1, min(args.workers, len(events)))
+
+    print("============================================================")
+    print("Multi-Event Batch Runner for HackLoad 2025")
+    print("============================================================")
+    print(f"📋 Events: {len(events)}")
+    print(f"🔧 Steps: {', '.join(steps)}")
+    print(f"⚙️ Worker processes: {workers}")
+    print(f"🚦 Hub write budget: {args.rate}/s per event")
+    print(f"🐙 GitHub sync: {'enabled' if args.github_token else 'disabled'}")
+    print(f"🧪 Dry run: {args.dry_run}")
+    print()
+
+    options = {
+        'steps': steps,
+        'rate': args.rate,
+        'api_base_url': args.api_base_url,
+        'api_key': args.api_key,
+        'github_token': args.github_token,
+        'github_org': args.github_org,
+        'base_url': args.base_url,
+        'dry_run': args.dry_run
+    }
+
+    started = time.monotonic()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_event, event, options): event for event in events}
+        for future in as_completed(futures):
+            event = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed); nothing was returned
+                summary = {'event': event['name'], 'ok': False, 'teams': 0, 'added': 0,
+                           'removed': 0, 'changed': 0, 'drift': 0, 'writes': 0,
+                           'write_failures': 0, 'repos': '-', 'duration': 0.0,
+                           'errors': [f"worker failed: {e}"],
+                           'log': os.path.join(event['work_dir'], 'run.log')}
+            status = '✅' if summary['ok'] else '❌'
+            print(f"{status} {summary['event']}: {summary['writes']} hub writes in {summary['duration']}s")
+            summaries.append(summary)
+    print()
+
+    summaries.sort(key=lambda s: [event['name'] for event in events].index(s['event']))
+    print_summary(summaries, time.monotonic() - started)
+
+    if not all(s['ok'] for s in summaries):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Endpoint Readiness Prober for HackLoad 2025 Teams
+Checks that every team's ENDPOINT_URL, EVENT_PROVIDER and PAYMENT_ENDPOINT
+answer before load tests start, with DNS/TCP/TLS/TTFB timings per probe.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import ssl
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from script_loader import load_script_module
+
+
+PROBE_KEYS = ['ENDPOINT_URL', 'EVENT_PROVIDER', 'PAYMENT_ENDPOINT']
+PHASES = ['dns', 'connect', 'tls', 'ttfb']
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
+
+def load_targets_from_config(config_file: str, keys: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """Return {team: {key: url or None}} from a team-env-config file."""
+    return {
+        team_nickname: {key: team_config.get('environment_variables', {}).get(key) for key in keys}
+        for team_nickname, team_config in team_env_module.iter_team_config(config_file)
+    }
+
+
+def load_targets_from_hub(api: 'team_env_module.TeamEnvAPI', teams_file: str,
+                          keys: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """Return {team: {key: url or None}} for approved teams from the live hub state."""
+    approved = {team['teamNickname'] for team in team_env_module.load_teams_data(teams_file)}
+    targets = {}
+    for team in api.iter_environment():
+        if team['teamSlug'] not in approved:
+            continue
+        values = {var['key']: var['value'] for var in team['environment'] if var['key'] in keys}
+        targets[team['teamSlug']] = {key: values.get(key) for key in keys}
+    for team_nickname in approved - targets.keys():
+        targets[team_nickname] = {key: None for key in keys}
+    return targets
+
+
+async def probe_url(url: str, timeout: float, ssl_context: ssl.SSLContext) -> Dict:
+    """Send one GET and time its phases; any HTTP status below 500 counts as answering.
+
+    ``tls`` stays None for plain HTTP. TTFB is measured from sending the
+    request to receiving the status line.
+    """
+    result = {'ok': False, 'status': None, 'error': None,
+              'dns': None, 'connect': None, 'tls': None, 'ttfb': None, 'total': None}
+    loop = asyncio.get_running_loop()
+    started = mark = time.perf_counter()
+    writer = None
+
+    def lap() -> float:
+        nonlocal mark
+        now = time.perf_counter()
+        elapsed, mark = now - mark, now
+        return round(elapsed * 1000, 1)
+
+    try:
+        # Parse inside the try: a bad port (e.g. :99999) raises ValueError
+        parts = urlsplit(url)
+        host = parts.hostname
+        secure = parts.scheme == 'https'
+        port = parts.port or (443 if secure else 80)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        if parts.scheme not in ('http', 'https') or not host:
+            raise ValueError(f"unsupported URL {url!r}")
+        addresses = await asyncio.wait_for(
+            loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout)
+        result['dns'] = lap()
+        address = addresses[0][4][0]
+
+        if secure and not hasattr(asyncio.StreamWriter, 'start_tls'):
+            # Python < 3.11 cannot upgrade a stream, so TLS is part of connect
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                address, port, ssl=ssl_context, server_hostname=host), timeout)
+            result['connect'] = lap()
+        else:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+            result['connect'] = lap()
+            if secure:
+                await asyncio.wait_for(writer.start_tls(ssl_context, server_hostname=host), timeout)
+                result['tls'] = lap()
+
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                     f"User-Agent: hackload-probe/1.0\r\nAccept: */*\r\n"
+                     f"Connection: close\r\n\r\n".encode('ascii'))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        result['ttfb'] = lap()
+
+        fields = status_line.decode('latin-1').split()
+        if len(fields) < 2 or not fields[0].startswith('HTTP/') or not fields[1].isdigit():
+            raise ValueError(f"not an HTTP response: {status_line[:40]!r}")
+        result['status'] = int(fields[1])
+        result['ok'] = result['status'] < 500
+        if not result['ok']:
+            result['error'] = f"HTTP {result['status']}"
+    except asyncio.TimeoutError:
+        result['error'] = f"timeout after {timeout}s"
+    except (OSError, ssl.SSLError, ValueError) as e:
+        result['error'] = str(e) or type(e).__name__
+    finally:
+        result['total'] = round((time.perf_counter() - started) * 1000, 1)
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+    return result
+
+
+async def probe_all(targets: Dict[str, Dict[str, Optional[str]]], rounds: int, interval: float,
+                    timeout: float, concurrency: int, insecure: bool) -> Dict[str, Dict[str, List[Dict]]]:
+    """Probe every URL once per round, all URLs concurrently; returns probes per team and key."""
+    ssl_context = ssl.create_default_context()
+    if insecure:
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(url: str) -> Dict:
+        async with semaphore:
+            return await probe_url(url, timeout, ssl_context)
+
+    results = {team: {key: [] for key in urls} for team, urls in targets.items()}
+    pairs = [(team, key, url) for team, urls in targets.items() for key, url in urls.items() if url]
+    for round_number in range(1, rounds + 1):
+        round_started = time.monotonic()
+        probes = await asyncio.gather(*(limited(url) for _, _, url in pairs), return_exceptions=True)
+        probes = [probe if isinstance(probe, dict) else
+                  {'ok': False, 'status': None, 'error': str(probe) or type(probe).__name__,
+                   **{phase: None for phase in PHASES}, 'total': None}
+                  for probe in probes]
+        for (team, key, _), probe in zip(pairs, probes):
+            results[team][key].append(probe)
+        failures = sum(1 for probe in probes if not probe['ok'])
+        print(f"🔎 Round {round_number}/{rounds}: {len(probes)} probes, {failures} failed "
+              f"({time.monotonic() - round_started:.1f}s)")
+        if round_number < rounds:
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - round_started)))
+    return results
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarize(targets: Dict[str, Dict[str, Optional[str]]], results: Dict[str, Dict[str, List[Dict]]],
+              min_success: float) -> Dict[str, Dict]:
+    """Per-team readiness: every endpoint must be set and answer at least ``min_success`` of probes."""
+    report = {}
+    for team, urls in sorted(targets.items()):
+        endpoints = {}
+        for key, url in urls.items():
+            probes = results[team][key]
+            successes = [probe for probe in probes if probe['ok']]
+            errors = sorted({probe['error'] for probe in probes if probe['error']})
+            endpoints[key] = {
+                'url': url,
+                'ok': len(successes),
+                'probes': len(probes),
+                'ready': bool(url) and bool(probes) and len(successes) / len(probes) >= min_success,
+                'error': 'not set' if not url else '; '.join(errors) or None,
+                'p50_ms': percentile([probe['total'] for probe in successes], 50),
+                'p95_ms': percentile([probe['total'] for probe in successes], 95),
+                **{f"{phase}_ms": percentile([probe[phase] for probe in successes], 50)
+                   for phase in PHASES}
+            }
+        report[team] = {
+            'ready': all(endpoint['ready'] for endpoint in endpoints.values()),
+            'endpoints': endpoints
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict], keys: List[str]):
+    print()
+    print("=" * 60)
+    print("📊 ENDPOINT READINESS")
+    print("=" * 60)
+    header = f"{'Team':<24}" + ''.join(f" {key[:16]:>16}" for key in keys) + "  Ready"
+    print(header)
+    print("-" * len(header))
+    for team, entry in report.items():
+        cells = []
+        for key in keys:
+            endpoint = entry['endpoints'][key]
+            if not endpoint['url']:
+                cells.append('not set')
+            elif endpoint['p50_ms'] is None:
+                cells.append(f"{endpoint['ok']}/{endpoint['probes']} down")
+            else:
+                cells.append(f"{endpoint['ok']}/{endpoint['probes']} {endpoint['p50_ms']:.0f}ms")
+        print(f"{team[:24]:<24}" + ''.join(f" {cell:>16}" for cell in cells)
+              + f"  {'✅' if entry['ready'] else '❌'}")
+    print("-" * len(header))
+
+    print()
+    print(f"⏱️ Median phase latency of successful probes (ms), p95 total:")
+    for key in keys:
+        endpoints = [entry['endpoints'][key] for entry in report.values()]
+        phases = {phase: percentile([endpoint[f"{phase}_ms"] for endpoint in endpoints], 50)
+                  for phase in PHASES}
+        p95 = percentile([endpoint['p95_ms'] for endpoint in endpoints], 95)
+        print(f"   {key:<18} " + '  '.join(
+            f"{phase.upper()} {'-' if value is None else f'{value:.1f}'}" for phase, value in phases.items())
+              + f"  p95 {'-' if p95 is None else f'{p95:.0f}'}")
+
+    broken = [team for team, entry in report.items() if not entry['ready']]
+    print()
+    if broken:
+        print(f"❌ {len(broken)} of {len(report)} teams have broken endpoints:")
+        for team in broken:
+            problems = [f"{key}: {endpoint['error']}" for key, endpoint in report[team]['endpoints'].items()
+                        if not endpoint['ready']]
+            print(f"   • {team}: {'; '.join(problems)}")
+    else:
+        print(f"✅ All {len(report)} teams are ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Probe every team endpoint concurrently and report readiness for load tests',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Probe the URLs from the generated config, 3 rounds 10s apart
+  ./probe-endpoints.py --config-file team-env-config.json
+
+  # Probe what is actually set on the hub and save the teams that may get load-test slots
+  ./probe-endpoints.py --live --ready-file ready-teams.json
+
+  # Only team endpoints, longer window
+  ./probe-endpoints.py --keys ENDPOINT_URL --rounds 10 --interval 30
+
+The ready file is an export-diff changeset listing the ready teams, usable with
+--only-changed in the other scripts.
+        """
+    )
+    parser.add_argument('--config-file', default='team-env-config.json',
+                       help='Read URLs from this team-env-config file (default: team-env-config.json)')
+    parser.add_argument('--live', action='store_true',
+                       help='Read URLs from the live hub environment instead of the config file')
+    parser.add_argument('--teams-file', default='approved-teams.json',
+                       help='Approved teams to probe with --live (default: approved-teams.json)')
+    parser.add_argument('--api-base-url',
+                       default=os.getenv('API_BASE_URL', 'https://hub.hackload.kz'),
+                       help='API base URL')
+    parser.add_argument('--api-key',
+                       default=os.getenv('SERVICE_API_KEY'),
+                       help='Service API key (needed with --live)')
+    parser.add_argument('--keys', default=','.join(PROBE_KEYS),
+                       help=f"Comma-separated URL variables to probe (default: {','.join(PROBE_KEYS)})")
+    parser.add_argument('--rounds', type=int, default=3,
+                       help='Probe rounds (default: 3)')
+    parser.add_argument('--interval', type=float, default=10.0,
+                       help='Seconds between round starts (default: 10)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                       help='Timeout per probe phase in seconds (default: 5)')
+    parser.add_argument('--concurrency', type=int, default=100,
+                       help='Probes in flight at once (default: 100)')
+    parser.add_argument('--min-success', type=float, default=0.8,
+                       help='Fraction of probes an endpoint must answer to be ready (default: 0.8)')
+    parser.add_argument('--insecure', action='store_true',
+                       help='Do not verify TLS certificates')
+    parser.add_argument('--report', default='probe-report.json',
+                       help='Write the full per-team report here (default: probe-report.json)')
+    parser.add_argument('--ready-file',
+                       help='Write the ready teams as an export-diff changeset')
+
+    args = parser.parse_args()
+    keys = [key.strip() for key in args.keys.split(',') if key.strip()]
+
+    print("=" * 60)
+    print("Endpoint Readiness Prober for HackLoad 2025 Teams")
+    print("=" * 60)
+
+    try:
+        if args.live:
+            if not args.api_key:
+                print("❌ API key is required with --live. Set SERVICE_API_KEY environment variable or use --api-key")
+                sys.exit(1)
+            api = team_env_module.TeamEnvAPI(args.api_base_url, args.api_key)
+            targets = load_targets_from_hub(api, args.teams_file, keys)
+            print(f"🌐 Source: live hub state at {args.api_base_url}")
+        else:
+            targets = load_targets_from_config(args.config_file, keys)
+            print(f"📄 Source: {args.config_file}")
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e.filename}")
+        sys.exit(1)
+    except (team_env_module.requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ Could not load endpoint URLs: {e}")
+        sys.exit(1)
+
+    url_count = sum(1 for urls in targets.values() for url in urls.values() if url)
+    print(f"🎯 {len(targets)} teams, {url_count} URLs, {args.rounds} rounds every {args.interval}s")
+    print()
+
+    results = asyncio.run(probe_all(targets, args.rounds, args.interval, args.timeout,
+                                    args.concurrency, args.insecure))
+    report = summarize(targets, results, args.min_success)
+    print_report(report, keys)
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({'keys': keys, 'rounds': args.rounds, 'min_success': args.min_success,
+                   'teams': report}, f, indent=2, ensure_ascii=False)
+    print(f"📝 Report saved to {args.report}")
+
+    ready = [team for team, entry in report.items() if entry['ready']]
+    if args.ready_file:
+        team_env_module.write_pending_changeset(args.ready_file, ready, "endpoint probe: ready teams")
+        print(f"🎟️ {len(ready)} ready teams saved to {args.ready_file}")
+
+    if len(ready) < len(report):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
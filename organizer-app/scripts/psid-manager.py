@@ -9,40 +9,40 @@ import json
 import os
 import sys
 import csv
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import requests
+
+from script_loader import load_script_module
+
+
+PSID_PLACEHOLDER = "Заполни меня"
 
 
 class PSIDManager:
-    def __init__(self, teams_file: str, api_base_url: str, api_key: str, dry_run: bool = False):
+    def __init__(self, teams_file: str, api_base_url: str, api_key: str, dry_run: bool = False,
+                 live: bool = False, live_cache_file: str = None, live_cache_ttl: float = 60):
         self.teams_file = teams_file
         self.api_base_url = api_base_url
         self.api_key = api_key
         self.dry_run = dry_run
-        
-        # Import the team env API we created earlier
-        from subprocess import run, PIPE
-        import sys
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        sys.path.append(script_dir)
+        self.live = live
+        self.live_cache_file = live_cache_file
+        self.live_cache_ttl = live_cache_ttl
         
         # We'll use the TeamEnvAPI from team-env-api.py
-        # Import it dynamically to avoid import issues
-        import importlib.util
-        spec = importlib.util.spec_from_file_location("team_env_api", 
-                                                     os.path.join(script_dir, "team-env-api.py"))
-        team_env_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(team_env_module)
+        team_env_module = load_script_module("team_env_api", "team-env-api.py")
         
+        self.team_env_module = team_env_module
         self.team_env_api = team_env_module.TeamEnvAPI(api_base_url, api_key, dry_run)
 
     def load_teams_data(self) -> List[Dict]:
         """Load teams data from JSON file."""
         try:
-            with open(self.teams_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                teams = data.get('data', [])
-                # Filter for approved teams only
-                return [team for team in teams if team.get('teamStatus') == 'APPROVED']
+            # Filter for approved teams only
+            return list(self.team_env_module.iter_team_records(self.teams_file, 'APPROVED'))
         except FileNotFoundError:
             print(f"❌ Teams file not found: {self.teams_file}")
             sys.exit(1)
@@ -50,7 +50,12 @@ class PSIDManager:
             print(f"❌ Invalid JSON in teams file: {e}")
             sys.exit(1)
 
-    def load_psid_mapping(self, psid_file: str) -> Dict[str, str]:
+    def filter_changed_teams(self, teams: List[Dict], changeset_file: str) -> List[Dict]:
+        """Keep only teams added or changed in an export-diff changeset."""
+        return self.team_env_module.filter_changed_teams(teams, changeset_file)
+
+    @staticmethod
+    def load_psid_mapping(psid_file: str) -> Dict[str, str]:
         """Load PSID mapping from CSV file."""
         psid_map = {}
         
@@ -92,8 +97,232 @@ class PSIDManager:
         
         return psid_map
 
+    def iter_psid_rows(self, psid_file: str) -> Iterator[Tuple[int, str, str]]:
+        """Stream (row number, team, PSID) rows from a CSV or JSON file.
+
+        JSON arrays are decoded one item at a time; a JSON object mapping
+        teams to PSIDs has to be read whole. Empty fields are yielded as ''.
+        """
+        with open(psid_file, 'r', encoding='utf-8') as f:
+            first_line = f.readline().strip()
+            f.seek(0)
+            
+            if first_line.startswith('['):
+                for row_number, item in enumerate(self.team_env_module.iter_json_array(f), 1):
+                    team_key = item.get('team') or item.get('teamNickname') or item.get('nickname')
+                    psid_value = item.get('psid') or item.get('PSID') or item.get('id')
+                    yield row_number, str(team_key or '').strip(), str(psid_value or '').strip()
+            elif first_line.startswith('{'):
+                for row_number, (team_key, psid_value) in enumerate(json.load(f).items(), 1):
+                    yield row_number, team_key.strip(), str(psid_value or '').strip()
+            else:
+                # Row numbers count the header line, matching what a spreadsheet shows
+                for row_number, row in enumerate(csv.DictReader(f), 2):
+                    team_key = (row.get('team') or row.get('teamNickname') or 
+                               row.get('nickname') or row.get('Team'))
+                    psid_value = (row.get('psid') or row.get('PSID') or 
+                                 row.get('id') or row.get('ID'))
+                    yield row_number, (team_key or '').strip(), (psid_value or '').strip()
+
+    def iter_valid_psid_rows(self, rows: Iterator[Tuple[int, str, str]], known_teams: Set[str],
+                             problems: List[str]) -> Iterator[Tuple[str, str]]:
+        """Validate rows as they stream by and yield (team, PSID) for valid ones.
+
+        Rejected rows are reported immediately and appended to ``problems``.
+        For duplicates the first occurrence wins, since it may already be applied.
+        """
+        seen_teams = {}
+        seen_psids = {}
+        
+        for row_number, team_key, psid_value in rows:
+            if not team_key or not psid_value:
+                problem = "missing team or PSID"
+            elif psid_value == PSID_PLACEHOLDER:
+                problem = f"placeholder PSID for {team_key}"
+            elif team_key not in known_teams:
+                problem = f"unknown or not selected team {team_key}"
+            elif team_key in seen_teams:
+                problem = f"duplicate team {team_key} (first on row {seen_teams[team_key]})"
+            elif psid_value in seen_psids:
+                other_team, other_row = seen_psids[psid_value]
+                problem = f"PSID {psid_value} of {team_key} already used by {other_team} on row {other_row}"
+            else:
+                seen_teams[team_key] = row_number
+                seen_psids[psid_value] = (team_key, row_number)
+                yield team_key, psid_value
+                continue
+            
+            print(f"⚠️ Row {row_number}: {problem}")
+            problems.append(f"row {row_number}: {problem}")
+
+    def get_live_psid_values(self) -> Optional[Dict[str, str]]:
+        """Read current PSID values of all teams from the service API.
+
+        One all-teams GET is made; its result is cached in ``live_cache_file``
+        for ``live_cache_ttl`` seconds so consecutive commands reuse it.
+        """
+        if self.live_cache_file:
+            try:
+                with open(self.live_cache_file, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                age = time.time() - cache.get('fetched_at', 0)
+                if (cache.get('api_base_url') == self.api_base_url and 0 <= age < self.live_cache_ttl
+                        and isinstance(cache['psids'], dict)):
+                    print(f"🗄️ Using live PSIDs cached {age:.0f}s ago")
+                    return cache['psids']
+            except (OSError, ValueError, KeyError, AttributeError, TypeError):
+                # Missing, unreadable or malformed cache: read live instead
+                pass
+        
+        try:
+            psids = {
+                team['teamSlug']: var.get('value', '')
+                for team in self.team_env_api.iter_environment()
+                for var in team.get('environment', [])
+                if var.get('key') == 'PSID'
+            }
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"❌ Error getting env vars: {e}")
+            return None
+        
+        if self.live_cache_file:
+            # Write aside and rename, so a concurrent reader never sees a partial cache
+            tmp_file = f"{self.live_cache_file}.tmp"
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({'fetched_at': time.time(), 'api_base_url': self.api_base_url,
+                               'psids': psids}, f, ensure_ascii=False)
+                os.replace(tmp_file, self.live_cache_file)
+            except OSError as e:
+                print(f"⚠️ Could not cache live PSIDs in {self.live_cache_file}: {e}")
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+        return psids
+
+    def invalidate_live_cache(self):
+        """Drop cached live PSIDs after writes, so the next read sees them."""
+        if self.live_cache_file and not self.dry_run and os.path.exists(self.live_cache_file):
+            os.remove(self.live_cache_file)
+
+    def apply_psid_chunk(self, chunk: List[Tuple[str, str, str]]) -> List[Tuple[str, str]]:
+        """Apply one chunk of (team, old PSID, new PSID) updates. Returns failures."""
+        failures = []
+        for team_nickname, _, new_psid in chunk:
+            try:
+                self.team_env_api.put_team_env_var(
+                    team_nickname,
+                    "PSID",
+                    new_psid,
+                    "ID Платежного аккаунта PS.KZ",
+                    "cloud",
+                    False,  # not secure
+                    True    # editable
+                )
+            except requests.exceptions.RequestException as e:
+                failures.append((team_nickname, str(e)))
+        return failures
+
+    def import_psid_values(self, psid_file: str, teams: List[Dict], chunk_size: int = 50,
+                           workers: int = 4, check_only: bool = False) -> bool:
+        """Stream a PSID file, validate rows on the fly and apply updates in concurrent chunks.
+
+        Current values are read from the service API once, so the comparison
+        is not made against a possibly stale export. At most ``workers``
+        chunks are in flight; each finished chunk prints its own report.
+        """
+        if not os.path.exists(psid_file):
+            print(f"❌ PSID file not found: {psid_file}")
+            return False
+        
+        current_psids = self.get_live_psid_values()
+        if current_psids is None:
+            print("⚠️ Could not read live PSIDs, comparing against the teams export")
+            current_psids = self.get_current_psid_values(teams)
+        
+        known_teams = {team['teamNickname'] for team in teams}
+        problems = []
+        stats = {'valid': 0, 'up_to_date': 0, 'updated': 0, 'failed': 0}
+        
+        def report(future):
+            chunk_number, chunk = in_flight.pop(future)
+            failures = future.result()
+            stats['updated'] += len(chunk) - len(failures)
+            stats['failed'] += len(failures)
+            status_icon = "✅" if not failures else "⚠️"
+            action = "would update" if self.dry_run else "updated"
+            print(f"{status_icon} Chunk {chunk_number}: {len(chunk) - len(failures)}/{len(chunk)} {action}")
+            if self.dry_run:
+                for team_nickname, old_psid, new_psid in chunk:
+                    print(f"   🔄 {team_nickname}: {old_psid or '-'} -> {new_psid}")
+            for team_nickname, error in failures:
+                print(f"   ❌ {team_nickname}: {error}")
+        
+        in_flight = {}
+        chunk = []
+        chunk_number = 0
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            def submit(chunk):
+                nonlocal chunk_number
+                while len(in_flight) >= workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(future)
+                chunk_number += 1
+                in_flight[executor.submit(self.apply_psid_chunk, chunk)] = (chunk_number, chunk)
+            
+            try:
+                rows = self.iter_psid_rows(psid_file)
+                for team_nickname, new_psid in self.iter_valid_psid_rows(rows, known_teams, problems):
+                    stats['valid'] += 1
+                    current_psid = current_psids.get(team_nickname, '')
+                    if current_psid == new_psid:
+                        stats['up_to_date'] += 1
+                        continue
+                    if check_only:
+                        continue
+                    chunk.append((team_nickname, current_psid, new_psid))
+                    if len(chunk) >= chunk_size:
+                        submit(chunk)
+                        chunk = []
+                if chunk:
+                    submit(chunk)
+            except (json.JSONDecodeError, csv.Error, UnicodeDecodeError) as e:
+                print(f"❌ Error reading PSID file {psid_file}: {e}")
+                problems.append(f"read error: {e}")
+            finally:
+                for future in list(in_flight):
+                    future.result()
+                    report(future)
+        
+        print()
+        print(f"📊 Import summary for {psid_file}:")
+        print(f"   Valid rows: {stats['valid']}")
+        print(f"   ℹ️ Already up to date: {stats['up_to_date']}")
+        if check_only:
+            print(f"   🔄 Would update: {stats['valid'] - stats['up_to_date']}")
+        else:
+            print(f"   ✅ {'Would update' if self.dry_run else 'Updated'}: {stats['updated']}")
+            print(f"   ❌ Failed: {stats['failed']}")
+        print(f"   ⚠️ Rejected rows: {len(problems)}")
+        
+        if stats['updated']:
+            self.invalidate_live_cache()
+        return not problems and stats['failed'] == 0
+
     def get_current_psid_values(self, teams: List[Dict]) -> Dict[str, str]:
-        """Get current PSID values from team environment variables."""
+        """Get current PSID values from team environment variables.
+
+        In live mode values come from the hub instead of the teams export.
+        """
+        if self.live:
+            live_psids = self.get_live_psid_values()
+            if live_psids is None:
+                print("❌ Could not read live PSIDs from the hub")
+                sys.exit(1)
+            nicknames = {team['teamNickname'] for team in teams}
+            return {nickname: psid for nickname, psid in live_psids.items() if nickname in nicknames}
+        
         current_psids = {}
         
         for team in teams:
@@ -112,6 +341,7 @@ class PSIDManager:
         success_count = 0
         total_count = 0
         
+        updated_count = 0
         current_psids = self.get_current_psid_values(teams)
         
         for team in teams:
@@ -146,8 +376,11 @@ class PSIDManager:
             
             if success:
                 success_count += 1
+                updated_count += 1
         
         print(f"\n📊 Summary: {success_count}/{total_count} PSID updates processed successfully")
+        if updated_count:
+            self.invalidate_live_cache()
         return success_count == total_count
 
     def export_current_psids(self, output_file: str, teams: List[Dict]) -> bool:
@@ -200,6 +433,14 @@ def main():
                        help='Service API key')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be done without making changes')
+    parser.add_argument('--only-changed', metavar='CHANGESET',
+                       help='Process only teams added or changed in an export-diff changeset')
+    parser.add_argument('--live', action='store_true',
+                       help='Read current PSIDs from the hub instead of the teams export')
+    parser.add_argument('--live-cache', default='.psid-live-cache.json',
+                       help='Cache file for live PSIDs (default: .psid-live-cache.json)')
+    parser.add_argument('--live-cache-ttl', type=float, default=60,
+                       help='Seconds a cached live read stays valid (default: 60, 0 disables)')
     
     # Action subcommands
     subparsers = parser.add_subparsers(dest='action', help='Available actions')
@@ -208,6 +449,16 @@ def main():
     update_parser = subparsers.add_parser('update', help='Update PSID values from file')
     update_parser.add_argument('psid_file', help='CSV or JSON file with PSID mappings')
     
+    # Streaming import
+    import_parser = subparsers.add_parser('import', help='Validate and apply a large PSID file in concurrent chunks')
+    import_parser.add_argument('psid_file', help='CSV or JSON file with PSID mappings')
+    import_parser.add_argument('--chunk-size', type=int, default=50,
+                              help='Updates per chunk (default: 50)')
+    import_parser.add_argument('--workers', type=int, default=4,
+                              help='Chunks applied concurrently (default: 4)')
+    import_parser.add_argument('--check', action='store_true',
+                              help='Only validate the file and count pending updates')
+    
     # List PSIDs
     list_parser = subparsers.add_parser('list', help='List current PSID values')
     
@@ -232,14 +483,20 @@ def main():
     print(f"📁 Teams file: {args.teams_file}")
     print(f"🌐 API base URL: {args.api_base_url}")
     print(f"🧪 Dry run: {args.dry_run}")
+    print(f"📡 Live PSIDs: {args.live}")
     print()
     
-    manager = PSIDManager(args.teams_file, args.api_base_url, args.api_key, args.dry_run)
+    manager = PSIDManager(args.teams_file, args.api_base_url, args.api_key, args.dry_run,
+                          args.live, args.live_cache, args.live_cache_ttl)
+    manager.team_env_module.require_valid_data(teams_file=args.teams_file)
     teams = manager.load_teams_data()
     
     print(f"📋 Found {len(teams)} approved teams")
     print()
     
+    if args.only_changed:
+        teams = manager.filter_changed_teams(teams, args.only_changed)
+    
     if args.action == 'list':
         manager.list_teams_with_psids(teams)
     
@@ -263,6 +520,16 @@ def main():
         if not success:
             sys.exit(1)
     
+    elif args.action == 'import':
+        if args.dry_run:
+            print("🧪 DRY RUN MODE - No changes will be made")
+            print()
+        
+        success = manager.import_psid_values(args.psid_file, teams, args.chunk_size,
+                                             args.workers, args.check)
+        if not success:
+            sys.exit(1)
+    
     elif args.action == 'set':
         success = manager.team_env_api.set_team_env_var(
             args.team,
@@ -275,6 +542,7 @@ def main():
         )
         if not success:
             sys.exit(1)
+        manager.invalidate_live_cache()
     
     else:
         parser.print_help()
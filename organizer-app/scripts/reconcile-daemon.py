@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Team Environment Reconcile Daemon for HackLoad 2025
+Periodically compares desired team state (team-env-config.json, PSID mapping, teams export)
+with the hub and GitHub, and applies only the operations needed to converge.
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from script_loader import load_script_module
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
+
+def file_sha256(path: str) -> Optional[str]:
+    """Hash a file, or return None when it does not exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Metrics:
+    """Thread-safe counters and gauges rendered in Prometheus text format."""
+
+    def __init__(self, prefix: str = 'hackload_reconcile'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._values = {
+            'cycles_total': 0,
+            'cycle_failures_total': 0,
+            'drift_detected_total': 0,
+            'hub_writes_total': 0,
+            'hub_write_failures_total': 0,
+            'github_teams_synced_total': 0,
+            'hub_reads_total': 0,
+            'hub_read_hedges_total': 0,
+            'hub_read_hedge_wins_total': 0,
+            'last_cycle_duration_seconds': 0.0,
+            'last_success_timestamp_seconds': 0.0,
+            'consecutive_failures': 0
+        }
+
+    def inc(self, name: str, amount: float = 1):
+        with self._lock:
+            self._values[name] += amount
+
+    def set(self, name: str, value: float):
+        with self._lock:
+            self._values[name] = value
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for name, value in self._values.items():
+                metric_type = 'counter' if name.endswith('_total') else 'gauge'
+                lines.append(f"# TYPE {self.prefix}_{name} {metric_type}")
+                lines.append(f"{self.prefix}_{name} {value}")
+            return '\n'.join(lines) + '\n'
+
+
+def start_metrics_server(metrics: Metrics, port: int) -> ThreadingHTTPServer:
+    """Serve metrics on http://0.0.0.0:<port>/metrics in a background thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics available at http://0.0.0.0:{port}/metrics")
+    return server
+
+
+class Reconciler:
+    """Detects drift between desired and actual state and applies the delta."""
+
+    def __init__(self, args, team_env_api, metrics: Metrics):
+        self.args = args
+        self.team_env_api = team_env_api
+        self.metrics = metrics
+        self.keys = set(args.keys.split(',')) if args.keys else None
+
+        self._desired_state = {}
+        self._desired_fingerprint = None
+        self._warned_keys = set()
+        self.validate_data = load_script_module("validate_data", "validate-data.py")
+
+        self.github_api = None
+        if args.github_token:
+            self.github_module = load_script_module("github_repo_manager", "github-repo-manager.py")
+            self.export_diff = load_script_module("export_diff", "export-diff.py")
+            self.github_api = self.github_module.GitHubAPI(args.github_token, args.github_org, args.dry_run)
+            os.makedirs(args.state_dir, exist_ok=True)
+            self.teams_snapshot = os.path.join(args.state_dir, 'last-synced-teams.json')
+
+    def load_desired_state(self) -> Dict[str, Dict[str, str]]:
+        """Build {team: {key: value}} from the config file and PSID mapping.
+
+        Files are only re-parsed when their content hash changed.
+        """
+        fingerprint = (file_sha256(self.args.config_file),
+                       file_sha256(self.args.psid_file) if self.args.psid_file else None)
+        if fingerprint == self._desired_fingerprint:
+            return self._desired_state
+
+        desired = {}
+        if fingerprint[0]:
+            # A broken config must not be half-applied; keep retrying until it is fixed
+            errors = self.validate_data.validate_config_file(self.args.config_file)[0]
+            if errors:
+                for error in errors:
+                    print(f"❌ {self.args.config_file}: {error}")
+                raise ValueError(f"invalid config file ({len(errors)} errors), hub left unchanged")
+            for team_nickname, team_config in team_env_module.iter_team_config(self.args.config_file):
+                desired[team_nickname] = dict(team_config.get('environment_variables', {}))
+        else:
+            print(f"⚠️ Config file not found: {self.args.config_file}")
+
+        if self.args.psid_file:
+            psid_module = load_script_module("psid_manager", "psid-manager.py")
+            psid_mapping = psid_module.PSIDManager.load_psid_mapping(self.args.psid_file)
+            for team_nickname, psid in psid_mapping.items():
+                desired.setdefault(team_nickname, {})['PSID'] = psid
+
+        for team_vars in desired.values():
+            for key in list(team_vars):
+                if self.keys is not None and key not in self.keys:
+                    del team_vars[key]
+                elif key not in team_env_module.CONFIG_VARIABLE_METADATA:
+                    if key not in self._warned_keys:
+                        print(f"⚠️ No metadata for variable {key}, it will not be reconciled")
+                        self._warned_keys.add(key)
+                    del team_vars[key]
+
+        self._desired_state = desired
+        self._desired_fingerprint = fingerprint
+        print(f"📥 Desired state loaded: {len(desired)} teams, "
+              f"{sum(len(team_vars) for team_vars in desired.values())} variables")
+        return desired
+
+    def compute_env_operations(self, desired: Dict[str, Dict[str, str]],
+                               hub_teams: Iterable[Dict]) -> List[Tuple[str, str, str]]:
+        """Return (team, key, value) writes needed to converge the hub.
+
+        ``hub_teams`` may be a stream; only the variables of desired keys
+        are kept from it.
+        """
+        current = {
+            team['teamSlug']: {var['key']: var for var in team['environment']
+                               if var['key'] in desired.get(team['teamSlug'], ())}
+            for team in hub_teams
+        }
+
+        operations = []
+        for team_nickname, team_vars in sorted(desired.items()):
+            if team_nickname not in current:
+                print(f"⚠️ Team {team_nickname} not found on the hub, skipping")
+                continue
+            for key, value in sorted(team_vars.items()):
+                metadata = team_env_module.CONFIG_VARIABLE_METADATA[key]
+                if team_env_module.env_var_needs_update(current[team_nickname].get(key), value, metadata):
+                    operations.append((team_nickname, key, value))
+        return operations
+
+    def reconcile_environment(self) -> bool:
+        desired = self.load_desired_state()
+        if not desired:
+            return True
+
+        if self.args.state_cache:
+            hub_data = self.team_env_api.sync_environment_state(self.args.state_cache)
+            if hub_data is None:
+                return False
+            hub_teams = hub_data['teams']
+        else:
+            hub_teams = self.team_env_api.iter_environment()
+
+        try:
+            operations = self.compute_env_operations(desired, hub_teams)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"❌ Error reading hub environment: {e}")
+            return False
+        if not operations:
+            return True
+
+        self.metrics.inc('drift_detected_total', len(operations))
+        print(f"🔧 Drift: {len(operations)} variables in {len({op[0] for op in operations})} teams")
+
+        # All changed keys of a team go out as one bulk upsert
+        team_variables = {}
+        for team_nickname, key, value in operations:
+            metadata = team_env_module.CONFIG_VARIABLE_METADATA[key]
+            team_variables.setdefault(team_nickname, []).append(
+                team_env_module.env_var_payload(key, value, metadata))
+
+        success = True
+        for team_nickname, variables in team_variables.items():
+            failed_keys = self.team_env_api.set_team_env_vars(team_nickname, variables)
+            self.metrics.inc('hub_writes_total', len(variables))
+            if failed_keys:
+                self.metrics.inc('hub_write_failures_total', len(failed_keys))
+                success = False
+        return success
+
+    def reconcile_repositories(self) -> bool:
+        """Sync GitHub repositories for teams that changed since the last synced export."""
+        if not self.github_api:
+            return True
+
+        if (os.path.exists(self.teams_snapshot)
+                and file_sha256(self.teams_snapshot) == file_sha256(self.args.teams_file)):
+            return True
+
+        teams = self.github_module.load_teams_data(self.args.teams_file)
+        if os.path.exists(self.teams_snapshot):
+            changeset = self.export_diff.diff_exports(self.teams_snapshot, self.args.teams_file)
+            changed = set(changeset['added']) | set(changeset['changed'])
+            teams = [team for team in teams if team['teamNickname'] in changed]
+            print(f"🐙 Teams export changed: syncing repositories for {len(teams)} teams")
+        else:
+            print(f"🐙 No synced export snapshot yet: syncing repositories for all {len(teams)} teams")
+
+        success = True
+        if teams:
+            email_to_github = self.github_module.load_members_data(self.args.members_file)
+            # The Repo variable is reconciled from the config file, so no hub client here
+            try:
+                success = self.github_module.sync_team_repositories(
+                    teams, self.github_api, None, email_to_github, self.args.access_mode)
+            except team_env_module.RunStopped as stopped:
+                # The snapshot is left behind, so the next cycle retries these teams
+                print(f"{stopped.icon} Repository sync stopped: {stopped}")
+                return False
+            self.metrics.inc('github_teams_synced_total', len(teams))
+
+        if success and not self.args.dry_run:
+            shutil.copyfile(self.args.teams_file, self.teams_snapshot)
+        return success
+
+    def run_cycle(self) -> bool:
+        started = time.monotonic()
+        self.metrics.inc('cycles_total')
+        try:
+            env_ok = self.reconcile_environment()
+            repos_ok = self.reconcile_repositories()
+            ok = env_ok and repos_ok
+        except Exception as e:
+            print(f"❌ Reconcile cycle failed: {e}")
+            ok = False
+
+        duration = time.monotonic() - started
+        self.metrics.set('last_cycle_duration_seconds', round(duration, 3))
+        hedge = self.team_env_api.hedge
+        if hedge:
+            self.metrics.set('hub_reads_total', hedge.reads)
+            self.metrics.set('hub_read_hedges_total', hedge.hedges)
+            self.metrics.set('hub_read_hedge_wins_total', hedge.hedge_wins)
+        if ok:
+            self.metrics.set('last_success_timestamp_seconds', time.time())
+        else:
+            self.metrics.inc('cycle_failures_total')
+        return ok
+
+
+def next_delay(interval: float, jitter: float, failures: int, max_backoff: float) -> float:
+    """Jittered interval, doubled for every consecutive failed cycle."""
+    base = min(max_backoff, interval * (2 ** min(failures, 16)))
+    return base * random.uniform(1 - jitter, 1 + jitter)
+
+
+def run_daemon(reconciler: Reconciler, metrics: Metrics, interval: float, jitter: float,
+               max_backoff: float, once: bool = False):
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        print(f"🛑 Received signal {signum}, stopping after the current cycle")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    failures = 0
+    cycle = 0
+    while not stop_event.is_set():
+        cycle += 1
+        ok = reconciler.run_cycle()
+        failures = 0 if ok else failures + 1
+        metrics.set('consecutive_failures', failures)
+
+        status = "✅ converged" if ok else f"⚠️ failed ({failures} in a row)"
+        print(f"🔁 [{datetime.now().strftime('%H:%M:%S')}] Cycle {cycle}: {status}")
+
+        if once:
+            return ok
+        stop_event.wait(next_delay(interval, jitter, failures, max_backoff))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Continuously reconcile team environments and repositories',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Reconcile environment variables from team-env-config.json every 30s
+  ./reconcile-daemon.py --interval 30
+
+  # Also enforce PSIDs and sync GitHub repositories of changed teams
+  ./reconcile-daemon.py --psid-file team-psids.csv --github-token "$GITHUB_TOKEN"
+
+  # Run a single reconcile cycle and exit (e.g. from cron)
+  ./reconcile-daemon.py --once --dry-run
+
+  # Expose Prometheus metrics
+  ./reconcile-daemon.py --metrics-port 9108
+        """
+    )
+    parser.add_argument('--teams-file', default='approved-teams.json',
+                       help='Path to teams JSON file (default: approved-teams.json)')
+    parser.add_argument('--members-file', default='approved-members.json',
+                       help='Path to members JSON file with GitHub URLs (default: approved-members.json)')
+    parser.add_argument('--config-file', default='team-env-config.json',
+                       help='Desired environment variables per team (default: team-env-config.json)')
+    parser.add_argument('--psid-file',
+                       help='Optional CSV or JSON PSID mapping to enforce')
+    parser.add_argument('--keys',
+                       help='Comma-separated variable keys to reconcile (default: all known keys in the config)')
+    parser.add_argument('--api-base-url',
+                       default=os.getenv('API_BASE_URL', 'https://hub.hackload.kz'),
+                       help='API base URL')
+    parser.add_argument('--api-key',
+                       default=os.getenv('SERVICE_API_KEY'),
+                       help='Service API key')
+    parser.add_argument('--github-token',
+                       default=os.getenv('GITHUB_TOKEN'),
+                       help='GitHub token; enables repository sync for changed teams')
+    parser.add_argument('--github-org',
+                       default=os.getenv('GITHUB_ORG', 'hackload-kz'),
+                       help='GitHub organization name')
+    parser.add_argument('--access-mode', choices=['collaborators', 'org-team'], default='collaborators',
+                       help='GitHub access mode (default: collaborators)')
+    parser.add_argument('--state-dir', default='.reconcile-state',
+                       help='Directory for daemon state (default: .reconcile-state)')
+    parser.add_argument('--state-cache',
+                       help='Fetch hub state incrementally (updatedAt watermark) into this cache file')
+    parser.add_argument('--interval', type=float, default=60.0,
+                       help='Seconds between cycles (default: 60)')
+    parser.add_argument('--jitter', type=float, default=0.2,
+                       help='Random +/- fraction applied to every delay (default: 0.2)')
+    parser.add_argument('--max-backoff', type=float, default=600.0,
+                       help='Upper bound for the delay after failed cycles (default: 600)')
+    parser.add_argument('--metrics-port', type=int,
+                       help='Serve Prometheus metrics on this port')
+    parser.add_argument('--hedge-percentile', type=float, metavar='P',
+                       help='Hedge hub reads slower than this latency percentile, e.g. 95')
+    parser.add_argument('--hedge-max-rate', type=float, default=0.1,
+                       help='Maximum fraction of hub reads that may be hedged (default: 0.1)')
+    parser.add_argument('--page-size', type=int,
+                       help='Read the hub environment in pages of this many teams')
+    parser.add_argument('--once', action='store_true',
+                       help='Run a single cycle and exit')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Detect drift but do not write anything')
+
+    args = parser.parse_args()
+
+    if not args.api_key:
+        print("❌ API key is required. Set SERVICE_API_KEY environment variable or use --api-key")
+        sys.exit(1)
+
+    print("============================================================")
+    print("Reconcile Daemon for HackLoad 2025 Teams")
+    print("============================================================")
+    print(f"📄 Config file: {args.config_file}")
+    print(f"📁 Teams file: {args.teams_file}")
+    print(f"🌐 API base URL: {args.api_base_url}")
+    print(f"🐙 GitHub sync: {'enabled' if args.github_token else 'disabled'}")
+    print(f"⏱️ Interval: {args.interval}s (±{int(args.jitter * 100)}%, backoff up to {args.max_backoff}s)")
+    print(f"🧪 Dry run: {args.dry_run}")
+    print()
+
+    metrics = Metrics()
+    if args.metrics_port:
+        start_metrics_server(metrics, args.metrics_port)
+
+    hedge = None
+    if args.hedge_percentile:
+        hedge = team_env_module.HedgePolicy(args.hedge_percentile, args.hedge_max_rate)
+    team_env_api = team_env_module.TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run,
+                                              hedge=hedge, page_size=args.page_size)
+    reconciler = Reconciler(args, team_env_api, metrics)
+
+    ok = run_daemon(reconciler, metrics, args.interval, args.jitter, args.max_backoff, args.once)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
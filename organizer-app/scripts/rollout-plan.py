@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Rollout Planner for HackLoad 2025
+Computes the exact hub and GitHub write set from real reads, estimates its cost,
+and applies a saved plan as-is.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import requests
+
+from script_loader import load_script_module
+
+
+PLAN_VERSION = 1
+
+# Endpoint families, also the keys of the per-endpoint request counts
+HUB_READ = 'GET /api/service/teams/environment'
+HUB_WRITE = 'PUT /api/service/teams/{team}/environment/{key}'
+GITHUB_REPO_READ = 'GET /repos/{org}/{repo}'
+GITHUB_COLLABORATORS_READ = 'GET /repos/{org}/{repo}/collaborators'
+GITHUB_ORG_MEMBERS_READ = 'GET /orgs/{org}/members'
+GITHUB_REPO_CREATE = 'POST /orgs/{org}/repos'
+GITHUB_COLLABORATOR_ADD = 'PUT /repos/{org}/{repo}/collaborators/{user}'
+GITHUB_COLLABORATOR_REMOVE = 'DELETE /repos/{org}/{repo}/collaborators/{user}'
+
+# Plan operations: [op, team, *args]
+OP_ENDPOINTS = {
+    'env': HUB_WRITE,
+    'repo': GITHUB_REPO_CREATE,
+    'collab+': GITHUB_COLLABORATOR_ADD,
+    'collab-': GITHUB_COLLABORATOR_REMOVE
+}
+HUB_OPS = {'env'}
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+github_module = load_script_module("github_repo_manager", "github-repo-manager.py")
+reconcile_module = load_script_module("reconcile_daemon", "reconcile-daemon.py")
+
+
+class LatencyRecorder:
+    """Collects request latencies per endpoint family."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, family: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(family, []).append(seconds)
+
+    def median(self, family: str) -> Optional[float]:
+        samples = self.samples.get(family)
+        return statistics.median(samples) if samples else None
+
+    def counts(self) -> Dict[str, int]:
+        return {family: len(samples) for family, samples in self.samples.items()}
+
+
+class GitHubReader:
+    """Timed, error-raising GitHub reads.
+
+    Unlike GitHubAPI, which maps read errors to empty results, a failed read
+    here aborts the plan: a plan built on a partial view would be wrong.
+    """
+
+    def __init__(self, token: str, org: str, api_url: str, latencies: LatencyRecorder):
+        self.org = org
+        self.api_url = api_url.rstrip('/')
+        self.latencies = latencies
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'token {token}',
+            'Accept': 'application/vnd.github.v3+json'
+        })
+        self.rate_limit: Dict[str, int] = {}
+
+    def get(self, family: str, url: str, params: Dict = None) -> requests.Response:
+        started = time.monotonic()
+        response = self.session.get(url, params=params, timeout=(10, 30))
+        self.latencies.record(family, time.monotonic() - started)
+        if 'X-RateLimit-Remaining' in response.headers:
+            self.rate_limit = {
+                'limit': int(response.headers.get('X-RateLimit-Limit', 0)),
+                'remaining': int(response.headers['X-RateLimit-Remaining']),
+                'reset': int(response.headers.get('X-RateLimit-Reset', 0))
+            }
+        return response
+
+    def get_all(self, family: str, url: str) -> List[Dict]:
+        items = []
+        params = {'per_page': 100}
+        while url:
+            response = self.get(family, url, params)
+            response.raise_for_status()
+            items.extend(response.json())
+            url = response.links.get('next', {}).get('url')
+            params = None  # the next link carries the query
+        return items
+
+    def repo_exists(self, repo: str) -> bool:
+        response = self.get(GITHUB_REPO_READ, f"{self.api_url}/repos/{self.org}/{repo}")
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def get_collaborators(self, repo: str) -> Set[str]:
+        url = f"{self.api_url}/repos/{self.org}/{repo}/collaborators"
+        return {collaborator['login'] for collaborator in self.get_all(GITHUB_COLLABORATORS_READ, url)}
+
+    def get_org_members(self) -> Set[str]:
+        url = f"{self.api_url}/orgs/{self.org}/members"
+        return {member['login'] for member in self.get_all(GITHUB_ORG_MEMBERS_READ, url)}
+
+
+def file_sha256(path: Optional[str]) -> Optional[str]:
+    return reconcile_module.file_sha256(path) if path else None
+
+
+def plan_env_operations(args: argparse.Namespace, latencies: LatencyRecorder) -> List[List]:
+    """Read the hub once and return the env writes needed to match the config."""
+    reconcile_args = argparse.Namespace(
+        config_file=args.config_file, psid_file=args.psid_file, keys=args.keys,
+        github_token=None, dry_run=True)
+    reconciler = reconcile_module.Reconciler(reconcile_args, None, reconcile_module.Metrics())
+    desired = reconciler.load_desired_state()
+
+    api = team_env_module.TeamEnvAPI(args.api_base_url, args.api_key, page_size=args.page_size,
+                                     page_workers=args.read_workers)
+    started = time.monotonic()
+    operations = reconciler.compute_env_operations(desired, api.iter_environment())
+    latencies.record(HUB_READ, time.monotonic() - started)
+
+    return [['env', team, key, value] for team, key, value in operations]
+
+
+def plan_github_operations(args: argparse.Namespace, teams: List, reader: GitHubReader) -> List[List]:
+    """Read repositories and collaborators and return the GitHub writes needed."""
+    email_to_github = github_module.load_members_data(args.members_file)
+    org_members = reader.get_org_members()
+
+    def plan_team(team) -> List[List]:
+        nickname = team['teamNickname']
+        expected = set(github_module.get_expected_collaborators(team, email_to_github))
+        if not reader.repo_exists(nickname):
+            description = f"HackLoad 2025 - Репозиторий команды {team['teamName']}"
+            return ([['repo', nickname, description]]
+                    + [['collab+', nickname, user] for user in sorted(expected)])
+        current = reader.get_collaborators(nickname)
+        return ([['collab+', nickname, user] for user in sorted(expected - current)]
+                + [['collab-', nickname, user] for user in sorted(current - expected - org_members)])
+
+    with ThreadPoolExecutor(max_workers=args.read_workers) as executor:
+        per_team = list(executor.map(plan_team, teams))
+    return [op for ops in per_team for op in ops]
+
+
+def count_requests(operations: List[List]) -> Dict[str, int]:
+    counts = {}
+    for op in operations:
+        endpoint = OP_ENDPOINTS[op[0]]
+        counts[endpoint] = counts.get(endpoint, 0) + 1
+    return counts
+
+
+def estimate(operations: List[List], latencies: LatencyRecorder, rates: Dict[str, float],
+             github_rate_limit: Dict) -> Dict:
+    """Request counts per endpoint, GitHub quota use and expected wall time.
+
+    Write latencies are not measurable without writing, so the median read
+    latency of the same service stands in for them. Hub and GitHub operations
+    are applied concurrently, each sequentially at its own rate, so the
+    expected wall time is the slower of the two.
+    """
+    hub_latency = latencies.median(HUB_READ) or 0.0
+    github_reads = [latencies.median(family) for family in
+                    (GITHUB_REPO_READ, GITHUB_COLLABORATORS_READ, GITHUB_ORG_MEMBERS_READ)]
+    github_latency = statistics.median([l for l in github_reads if l is not None] or [0.0])
+
+    def per_request(latency: float, rate: float) -> float:
+        return max(latency, 1.0 / rate) if rate > 0 else latency
+
+    hub_writes = sum(1 for op in operations if op[0] in HUB_OPS)
+    github_writes = len(operations) - hub_writes
+    hub_seconds = hub_writes * per_request(hub_latency, rates['hub'])
+    github_seconds = github_writes * per_request(github_latency, rates['github'])
+
+    result = {
+        'requests': count_requests(operations),
+        'reads': latencies.counts(),
+        'latency_ms': {family: round(latencies.median(family) * 1000, 1)
+                       for family in latencies.samples},
+        'seconds': {
+            'hub': round(hub_seconds, 1),
+            'github': round(github_seconds, 1),
+            'total': round(max(hub_seconds, github_seconds), 1)
+        }
+    }
+    if github_rate_limit:
+        result['github_quota'] = dict(github_rate_limit, planned=github_writes,
+                                      sufficient=github_writes <= github_rate_limit['remaining'])
+    return result
+
+
+def write_plan(plan_file: str, plan: Dict):
+    """Write the plan compactly and readable by the owner only (it holds secret values)."""
+    tmp_file = f"{plan_file}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_file, plan_file)
+
+
+def print_estimate(plan: Dict):
+    meta = plan['meta']
+    print("=" * 60)
+    print("📋 ROLLOUT PLAN")
+    print("=" * 60)
+    print(f"Operations: {len(plan['ops'])} "
+          f"({len({op[1] for op in plan['ops']})} teams)")
+    print()
+    print("Requests per endpoint:")
+    for endpoint, count in sorted(meta['estimate']['reads'].items()):
+        print(f"   {count:>5}  {endpoint}  (read while planning)")
+    for endpoint, count in sorted(meta['estimate']['requests'].items()):
+        print(f"   {count:>5}  {endpoint}")
+    print()
+    print("Measured median latency:")
+    for family, latency in sorted(meta['estimate']['latency_ms'].items()):
+        print(f"   {latency:>7} ms  {family}")
+    quota = meta['estimate'].get('github_quota')
+    if quota:
+        reset = datetime.fromtimestamp(quota['reset'], timezone.utc).strftime('%H:%M:%S UTC')
+        status = '✅' if quota['sufficient'] else '❌ not enough'
+        print()
+        print(f"🐙 GitHub quota: {quota['planned']} planned of {quota['remaining']}/{quota['limit']} "
+              f"remaining (resets {reset}) {status}")
+    seconds = meta['estimate']['seconds']
+    print()
+    print(f"⏱️ Expected wall time: {seconds['total']}s "
+          f"(hub {seconds['hub']}s at {meta['rates']['hub']}/s, "
+          f"GitHub {seconds['github']}s at {meta['rates']['github']}/s)")
+
+
+def run_plan(args: argparse.Namespace):
+    team_env_module.require_valid_data(
+        teams_file=args.teams_file if args.github_token else None,
+        members_file=args.members_file if args.github_token else None,
+        config_file=args.config_file)
+
+    latencies = LatencyRecorder()
+    started = time.monotonic()
+    try:
+        operations = plan_env_operations(args, latencies)
+        github_rate_limit = {}
+        if args.github_token:
+            teams = github_module.load_teams_data(args.teams_file)
+            reader = GitHubReader(args.github_token, args.github_org, args.github_api_url, latencies)
+            operations += plan_github_operations(args, teams, reader)
+            github_rate_limit = reader.rate_limit
+        else:
+            print("ℹ️ No GitHub token: planning hub environment writes only")
+    except (requests.exceptions.RequestException, RuntimeError, ValueError) as e:
+        print(f"❌ Planning failed: {e}")
+        sys.exit(1)
+    print(f"🔍 Reads finished in {time.monotonic() - started:.1f}s")
+    print()
+
+    rates = {'hub': args.hub_rate, 'github': args.github_rate}
+    plan = {
+        'meta': {
+            'version': PLAN_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'api_base_url': args.api_base_url,
+            'github_org': args.github_org,
+            'github_api_url': args.github_api_url,
+            'inputs': {
+                'config_file': os.path.abspath(args.config_file),
+                'config_sha256': file_sha256(args.config_file),
+                'psid_file': os.path.abspath(args.psid_file) if args.psid_file else None,
+                'psid_sha256': file_sha256(args.psid_file),
+                'teams_file': os.path.abspath(args.teams_file) if args.github_token else None,
+                'teams_sha256': file_sha256(args.teams_file) if args.github_token else None
+            },
+            'rates': rates,
+            'estimate': estimate(operations, latencies, rates, github_rate_limit)
+        },
+        'ops': operations
+    }
+
+    write_plan(args.plan_file, plan)
+    print_estimate(plan)
+    print()
+    print(f"💾 Plan written to {args.plan_file} ({os.path.getsize(args.plan_file)} bytes)")
+    if operations:
+        print(f"   Apply it with: ./rollout-plan.py apply --plan-file {args.plan_file}")
+    else:
+        print("✅ Nothing to do, everything is in sync")
+
+
+def load_plan(plan_file: str) -> Dict:
+    try:
+        with open(plan_file, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ Plan file not found: {plan_file}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid JSON in plan file: {e}")
+        sys.exit(1)
+    if plan.get('meta', {}).get('version') != PLAN_VERSION:
+        print(f"❌ Unsupported plan version: {plan.get('meta', {}).get('version')}")
+        sys.exit(1)
+    unknown = {op[0] for op in plan['ops']} - OP_ENDPOINTS.keys()
+    if unknown:
+        print(f"❌ Unknown operations in plan: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    return plan
+
+
+def check_plan_inputs(plan: Dict) -> bool:
+    """Warn if the input files changed since planning; returns True when unchanged."""
+    inputs = plan['meta']['inputs']
+    unchanged = True
+    for name in ('config', 'psid', 'teams'):
+        path = inputs.get(f"{name}_file")
+        if path and file_sha256(path) != inputs.get(f"{name}_sha256"):
+            print(f"⚠️ {path} changed since the plan was made")
+            unchanged = False
+    return unchanged
+
+
+def apply_operations(operations: List[List], execute, rate: float) -> Tuple[Dict[str, int], List[List]]:
+    """Run operations sequentially at ``rate``; returns (done per endpoint, failed ops)."""
+    limiter = github_module.RateLimiter(rate)
+    done, failed = {}, []
+    for op in operations:
+        limiter.wait()
+        if execute(op):
+            endpoint = OP_ENDPOINTS[op[0]]
+            done[endpoint] = done.get(endpoint, 0) + 1
+        else:
+            failed.append(op)
+    return done, failed
+
+
+def run_apply(args: argparse.Namespace):
+    plan = load_plan(args.plan_file)
+    meta = plan['meta']
+    operations = plan['ops']
+
+    print(f"📋 Plan from {meta['created_at']}: {len(operations)} operations, "
+          f"expected {meta['estimate']['seconds']['total']}s")
+    if not check_plan_inputs(plan) and not args.force:
+        print("❌ Plan is stale. Re-run plan, or use --force to apply it anyway.")
+        sys.exit(1)
+    if not operations:
+        print("✅ Nothing to do")
+        return
+
+    hub_ops = [op for op in operations if op[0] in HUB_OPS]
+    github_ops = [op for op in operations if op[0] not in HUB_OPS]
+    if hub_ops and not args.api_key:
+        print("❌ API key is required. Set SERVICE_API_KEY environment variable or use --api-key")
+        sys.exit(1)
+    if github_ops and not args.github_token:
+        print("❌ GitHub token is required for this plan. Set GITHUB_TOKEN or use --github-token")
+        sys.exit(1)
+
+    team_env_api = team_env_module.TeamEnvAPI(meta['api_base_url'], args.api_key)
+    github_api = github_module.GitHubAPI(args.github_token, meta['github_org'])
+    github_api.base_url = meta['github_api_url'].rstrip('/')
+
+    def execute_hub(op: List) -> bool:
+        _, team, key, value = op
+        metadata = team_env_module.CONFIG_VARIABLE_METADATA[key]
+        try:
+            team_env_api.put_team_env_var(team, key, value, metadata['description'],
+                                          metadata['category'], metadata['is_secure'],
+                                          metadata['is_editable'])
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"❌ {team}: {key}: {e}")
+            return False
+
+    def execute_github(op: List) -> bool:
+        if op[0] == 'repo':
+            return github_api.create_repository(op[1], op[2])
+        if op[0] == 'collab+':
+            return github_api.add_collaborator(op[1], op[2])
+        return github_api.remove_collaborator(op[1], op[2])
+
+    # The hub and GitHub are independent services, so both queues run at once
+    rates = {'hub': args.hub_rate or meta['rates']['hub'],
+             'github': args.github_rate or meta['rates']['github']}
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hub_future = executor.submit(apply_operations, hub_ops, execute_hub, rates['hub'])
+        github_future = executor.submit(apply_operations, github_ops, execute_github, rates['github'])
+        hub_done, hub_failed = hub_future.result()
+        github_done, github_failed = github_future.result()
+    duration = time.monotonic() - started
+
+    failed = hub_failed + github_failed
+    print()
+    print("=" * 60)
+    print("📊 APPLY SUMMARY")
+    print("=" * 60)
+    for endpoint, planned in sorted(count_requests(operations).items()):
+        done = hub_done.get(endpoint, 0) + github_done.get(endpoint, 0)
+        print(f"   {done:>5}/{planned:<5} {endpoint}")
+    print(f"⏱️ Wall time: {duration:.1f}s (expected {meta['estimate']['seconds']['total']}s)")
+
+    if failed:
+        retry_file = f"{os.path.splitext(args.plan_file)[0]}.retry.json"
+        retry_plan = {'meta': dict(meta, estimate=dict(meta['estimate'], requests=count_requests(failed))),
+                      'ops': failed}
+        write_plan(retry_file, retry_plan)
+        print(f"❌ {len(failed)} operations failed; they were saved to {retry_file}")
+        print(f"   Retry with: ./rollout-plan.py apply --plan-file {retry_file}")
+        sys.exit(1)
+    print("✅ Plan applied")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Plan a rollout from real reads, estimate its cost, and apply the plan as-is',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Read the hub (and GitHub with a token) and write rollout-plan.json
+  ./rollout-plan.py plan
+
+  # Only plan endpoint variables
+  ./rollout-plan.py plan --keys ENDPOINT_URL,EVENT_PROVIDER,PAYMENT_ENDPOINT
+
+  # Execute exactly the planned operations
+  ./rollout-plan.py apply
+
+Plans contain variable values, including secrets, and are written with mode 0600.
+apply refuses a plan whose input files changed since planning (use --force to override).
+        """
+    )
+    parser.add_argument('--api-key',
+                       default=os.getenv('SERVICE_API_KEY'),
+                       help='Service API key')
+    parser.add_argument('--github-token',
+                       default=os.getenv('GITHUB_TOKEN'),
+                       help='GitHub token; enables repository and collaborator planning')
+    parser.add_argument('--plan-file', default='rollout-plan.json',
+                       help='Plan file (default: rollout-plan.json)')
+    parser.add_argument('--hub-rate', type=float,
+                       help='Hub writes per second (plan default: 5)')
+    parser.add_argument('--github-rate', type=float,
+                       help='GitHub writes per second (plan default: 2)')
+
+    subparsers = parser.add_subparsers(dest='action', help='Available actions')
+
+    plan_parser = subparsers.add_parser('plan', help='Compute the write set and its cost')
+    plan_parser.add_argument('--config-file', default='team-env-config.json',
+                            help='Desired environment variables per team (default: team-env-config.json)')
+    plan_parser.add_argument('--psid-file',
+                            help='Optional CSV or JSON PSID mapping to include')
+    plan_parser.add_argument('--keys',
+                            help='Comma-separated variable keys to plan (default: all known keys)')
+    plan_parser.add_argument('--teams-file', default='approved-teams.json',
+                            help='Path to teams JSON file (default: approved-teams.json)')
+    plan_parser.add_argument('--members-file', default='approved-members.json',
+                            help='Path to members JSON file with GitHub URLs (default: approved-members.json)')
+    plan_parser.add_argument('--api-base-url',
+                            default=os.getenv('API_BASE_URL', 'https://hub.hackload.kz'),
+                            help='API base URL')
+    plan_parser.add_argument('--github-org',
+                            default=os.getenv('GITHUB_ORG', 'hackload-kz'),
+                            help='GitHub organization name')
+    plan_parser.add_argument('--github-api-url',
+                            default=os.getenv('GITHUB_API_URL', 'https://api.github.com'),
+                            help='GitHub API URL (default: https://api.github.com)')
+    plan_parser.add_argument('--read-workers', type=int, default=4,
+                            help='Concurrent GitHub reads while planning (default: 4)')
+    plan_parser.add_argument('--page-size', type=int,
+                            help='Read the hub environment in pages of this many teams, '
+                                 'fetched with --read-workers')
+
+    apply_parser = subparsers.add_parser('apply', help='Execute a saved plan')
+    apply_parser.add_argument('--force', action='store_true',
+                             help='Apply even if the input files changed since planning')
+
+    args = parser.parse_args()
+
+    if args.action not in ('plan', 'apply'):
+        parser.print_help()
+        return
+
+    print("============================================================")
+    print("Rollout Planner for HackLoad 2025")
+    print("============================================================")
+    print(f"📄 Plan file: {args.plan_file}")
+    print()
+
+    if args.action == 'plan':
+        if not args.api_key:
+            print("❌ API key is required. Set SERVICE_API_KEY environment variable or use --api-key")
+            sys.exit(1)
+        args.hub_rate = args.hub_rate or 5.0
+        args.github_rate = args.github_rate or 2.0
+        run_plan(args)
+    else:
+        run_apply(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""
+Shared loader for the hyphenated scripts in this directory.
+
+Script names such as ``team-env-api.py`` cannot be imported with ``import``;
+every script that uses a sibling loads it through load_script_module().
+"""
+
+import importlib.util
+import os
+import sys
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script_module(module_name: str, file_name: str):
+    """Load a sibling script (hyphenated file name) as a module, once per process."""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -8,48 +8,12 @@ import argparse
 import json
 import os
 import sys
-import requests
 from typing import Dict, List
 
+from script_loader import load_script_module
 
-class TeamEnvAPI:
-    def __init__(self, api_base_url: str, api_key: str, dry_run: bool = False):
-        self.api_base_url = api_base_url.rstrip('/')
-        self.api_key = api_key
-        self.dry_run = dry_run
 
-    def set_team_env_var(self, team_nickname: str, key: str, value: str, 
-                        description: str = "", category: str = "general", 
-                        is_secure: bool = False, is_editable: bool = True) -> bool:
-        """Set or update an environment variable for a team."""
-        url = f"{self.api_base_url}/api/service/teams/{team_nickname}/environment/{key}"
-        
-        headers = {
-            'X-API-Key': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "value": value,
-            "description": description,
-            "category": category,
-            "isSecure": is_secure,
-            "isEditable": is_editable
-        }
-        
-        if self.dry_run:
-            print(f"[DRY RUN] Would PUT to {url}")
-            print(f"[DRY RUN] Data: {json.dumps(data, indent=2, ensure_ascii=False)}")
-            return True
-        
-        try:
-            response = requests.put(url, headers=headers, json=data)
-            response.raise_for_status()
-            print(f"✅ Set {key}={value} for team {team_nickname}")
-            return True
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error setting {key} for team {team_nickname}: {e}")
-            return False
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
 
 
 def load_teams_data(teams_file: str) -> List[Dict]:
@@ -102,7 +66,7 @@ def generate_endpoint_url(team_nickname: str, base_domain: str = "hub.hackload.k
     return f"https://{team_nickname}.{base_domain}"
 
 
-def set_endpoint_urls(teams: List[Dict], api: TeamEnvAPI, base_domain: str = "hub.hackload.kz"):
+def set_endpoint_urls(teams: List[Dict], api: 'team_env_module.TeamEnvAPI', base_domain: str = "hub.hackload.kz"):
     """Set ENDPOINT_URL environment variables for all approved teams."""
     success_count = 0
     total_count = len(teams)
@@ -116,7 +80,15 @@ def set_endpoint_urls(teams: List[Dict], api: TeamEnvAPI, base_domain: str = "hu
     print(f"🌍 Base domain: {base_domain}")
     print()
     
+    failed_teams = []
     for i, team in enumerate(teams, 1):
+        if api.deadline.expired() or api.breakers.should_pause(deadline=api.deadline):
+            pending_teams = failed_teams + [
+                t['teamNickname'] for t in teams[i - 1:] if t.get('teamNickname')]
+            if api.deadline.expired():
+                team_env_module.stop_at_deadline(api.deadline, pending_teams)
+            team_env_module.pause_run(api.breakers, pending_teams)
+        
         team_name = team.get('teamName', 'Unknown')
         team_nickname = team['teamNickname']
         team_status = team.get('teamStatus', 'UNKNOWN')
@@ -148,10 +120,14 @@ def set_endpoint_urls(teams: List[Dict], api: TeamEnvAPI, base_domain: str = "hu
             success_count += 1
             print(f"   ✅ Success")
         else:
+            failed_teams.append(team_nickname)
             print(f"   ❌ Failed")
         
         print()
     
+    if failed_teams and api.deadline.expired():
+        team_env_module.stop_at_deadline(api.deadline, failed_teams)
+    
     print("=" * 60)
     print("📊 ENDPOINT URL SETUP SUMMARY")
     print("=" * 60)
@@ -207,6 +183,19 @@ Example: https://rorobotics.hub.hackload.kz
                        help='Base domain for endpoint URLs (default: hub.hackload.kz)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be done without making changes')
+    parser.add_argument('--only-changed', metavar='CHANGESET',
+                       help='Process only teams added or changed in an export-diff changeset')
+    parser.add_argument('--breaker-failures', type=int, default=5,
+                       help='Consecutive failures that open a circuit (default: 5)')
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                       help='Seconds an open circuit waits before a probe (default: 30)')
+    parser.add_argument('--pending-file', default='pending-teams.json',
+                       help='Where a paused or timed-out run saves its pending teams (default: pending-teams.json)')
+    parser.add_argument('--timeout', type=team_env_module.parse_timeout,
+                       default=team_env_module.DEFAULT_TIMEOUT, metavar='CONNECT,READ',
+                       help='Hub request timeouts in seconds (default: 10,30)')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                       help='Stop after this many seconds and save pending teams')
     
     args = parser.parse_args()
     
@@ -224,20 +213,31 @@ Example: https://rorobotics.hub.hackload.kz
     print()
     
     # Load and validate approved teams
+    load_script_module("validate_data", "validate-data.py").require_valid_data(teams_file=args.teams_file)
     teams = load_teams_data(args.teams_file)
     
     if not validate_approved_teams(teams):
         sys.exit(1)
     
+    if args.only_changed:
+        teams = load_script_module("export_diff", "export-diff.py").filter_changed_teams(
+            teams, args.only_changed)
+    
     if args.dry_run:
         print("🧪 DRY RUN MODE - No changes will be made")
         print()
     
     # Initialize API
-    api = TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run)
+    breakers = team_env_module.CircuitBreakers('hub', failure_threshold=args.breaker_failures,
+                                               reset_timeout=args.breaker_reset)
+    api = team_env_module.TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run, breakers,
+                                     args.timeout, team_env_module.Deadline(args.deadline))
     
     # Set endpoint URLs
-    success = set_endpoint_urls(teams, api, args.base_domain)
+    try:
+        success = set_endpoint_urls(teams, api, args.base_domain)
+    except team_env_module.RunStopped as stopped:
+        team_env_module.exit_stopped_run(stopped, args.pending_file)
     
     if not success:
         sys.exit(1)
@@ -5,70 +5,29 @@ Sets MERCHANT_ID=<team-nickname> for all approved teams from team-env-config.jso
 """
 
 import argparse
+import itertools
 import json
 import os
 import sys
-import requests
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
 
+from script_loader import load_script_module
 
-class TeamEnvAPI:
-    def __init__(self, api_base_url: str, api_key: str, dry_run: bool = False):
-        self.api_base_url = api_base_url.rstrip('/')
-        self.api_key = api_key
-        self.dry_run = dry_run
 
-    def set_team_env_var(self, team_nickname: str, key: str, value: str, 
-                        description: str = "", category: str = "general", 
-                        is_secure: bool = False, is_editable: bool = True) -> bool:
-        """Set or update an environment variable for a team."""
-        url = f"{self.api_base_url}/api/service/teams/{team_nickname}/environment/{key}"
-        
-        headers = {
-            'X-API-Key': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "value": value,
-            "description": description,
-            "category": category,
-            "isSecure": is_secure,
-            "isEditable": is_editable
-        }
-        
-        if self.dry_run:
-            print(f"[DRY RUN] Would PUT to {url}")
-            print(f"[DRY RUN] Data: {json.dumps(data, indent=2, ensure_ascii=False)}")
-            return True
-        
-        try:
-            response = requests.put(url, headers=headers, json=data)
-            response.raise_for_status()
-            print(f"✅ Set {key}={value} for team {team_nickname}")
-            return True
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error setting {key} for team {team_nickname}: {e}")
-            return False
-
-
-def load_team_config(config_file: str) -> Dict:
-    """Load team configuration from JSON file."""
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
+
+def load_team_config(config_file: str) -> Union[Dict, Iterator[Tuple[str, Dict]]]:
+    """Load team configuration from a JSON or NDJSON file ('-' for stdin).
+
+    JSON configs are returned as the usual ``teams`` dict. NDJSON configs are
+    returned as a lazy iterator of (nickname, team config) pairs, read line by
+    line while the variables are applied.
+    """
+    meta = {}
     try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-            if 'teams' not in data:
-                print(f"❌ Invalid config file: missing 'teams' section")
-                sys.exit(1)
-            
-            teams_data = data['teams']
-            print(f"📊 Configuration Statistics:")
-            print(f"   Total teams in config: {len(teams_data)}")
-            print(f"   Configuration generated: {data.get('meta', {}).get('generated_at', 'Unknown')}")
-            print()
-            
-            return data
+        teams = team_env_module.iter_team_config(config_file, meta)
+        first = next(teams, None)
     except FileNotFoundError:
         print(f"❌ Configuration file not found: {config_file}")
         print("💡 Generate it first using: ./generate-team-env-config.py")
@@ -76,36 +35,93 @@ def load_team_config(config_file: str) -> Dict:
     except json.JSONDecodeError as e:
         print(f"❌ Invalid JSON in configuration file: {e}")
         sys.exit(1)
+    except ValueError:
+        print(f"❌ Invalid config file: missing 'teams' section")
+        sys.exit(1)
+    
+    streaming = meta.get('format') == 'ndjson'
+    
+    print(f"📊 Configuration Statistics:")
+    if streaming:
+        print(f"   Format: NDJSON (streamed)")
+    print(f"   Configuration generated: {meta.get('generated_at', 'Unknown')}")
+    
+    if streaming:
+        print()
+        
+        def stream():
+            try:
+                yield from itertools.chain([first] if first else [], teams)
+            except json.JSONDecodeError as e:
+                print(f"❌ Invalid JSON in configuration stream: {e}")
+                sys.exit(1)
+        
+        return stream()
+    
+    teams_data = dict(itertools.chain([first] if first else [], teams))
+    print(f"   Total teams in config: {len(teams_data)}")
+    print()
+    return teams_data
 
 
-def extract_merchant_ids(teams_data: Dict) -> List[Dict]:
-    """Extract MERCHANT_ID values for all teams from configuration."""
-    merchant_data = []
-    
-    for team_nickname, team_config in teams_data.items():
+def iter_merchant_ids(teams: Iterable[Tuple[str, Dict]]) -> Iterator[Dict]:
+    """Yield MERCHANT_ID values of teams one at a time."""
+    for team_nickname, team_config in teams:
         team_info = team_config.get('team_info', {})
         env_vars = team_config.get('environment_variables', {})
         
         if 'MERCHANT_ID' in env_vars:
-            merchant_data.append({
+            yield {
                 'team_nickname': team_nickname,
                 'team_name': team_info.get('name', 'Unknown'),
                 'merchant_id': env_vars['MERCHANT_ID'],
                 'status': team_info.get('status', 'UNKNOWN'),
                 'member_count': team_info.get('member_count', 0)
-            })
+            }
         else:
             print(f"⚠️ Missing MERCHANT_ID for team {team_nickname}")
-    
-    return merchant_data
 
 
-def set_merchant_ids(merchant_data: List[Dict], api: TeamEnvAPI):
-    """Set MERCHANT_ID environment variables for all teams."""
+def extract_merchant_ids(teams_data: Union[Dict, Iterable[Tuple[str, Dict]]]) -> Union[List[Dict], Iterator[Dict]]:
+    """Extract MERCHANT_ID values for all teams from configuration.
+
+    A ``teams`` dict gives a list; streamed NDJSON pairs give a lazy iterator.
+    """
+    if isinstance(teams_data, dict):
+        return list(iter_merchant_ids(teams_data.items()))
+    return iter_merchant_ids(teams_data)
+
+
+def filter_changed_merchants(merchant_data: Union[List[Dict], Iterator[Dict]],
+                             changeset_file: str, key: str = None) -> Union[List[Dict], Iterator[Dict]]:
+    """Keep only teams added or changed in an export-diff changeset.
+
+    ``key`` narrows changed teams to those whose entry lists the variable.
+    """
+    changed_nicknames = load_script_module("export_diff", "export-diff.py").load_changeset(changeset_file, key)
+    if not isinstance(merchant_data, list):
+        print(f"🔀 Changeset {changeset_file}: processing only {len(changed_nicknames)} changed teams")
+        print()
+        return (item for item in merchant_data if item['team_nickname'] in changed_nicknames)
+    filtered = [item for item in merchant_data if item['team_nickname'] in changed_nicknames]
+    print(f"🔀 Changeset {changeset_file}: processing {len(filtered)}/{len(merchant_data)} teams")
+    print()
+    return filtered
+
+
+def set_merchant_ids(merchant_data: Union[List[Dict], Iterator[Dict]], api: 'team_env_module.TeamEnvAPI'):
+    """Set MERCHANT_ID environment variables for all teams.
+
+    Streamed input is applied as it is read; totals are known only at the end.
+    """
     success_count = 0
-    total_count = len(merchant_data)
+    streaming = not isinstance(merchant_data, list)
+    total_label = "" if streaming else f"/{len(merchant_data)}"
     
-    print(f"🌐 Setting MERCHANT_ID for {total_count} teams")
+    if streaming:
+        print(f"🌐 Setting MERCHANT_ID for teams as they are read from the config stream")
+    else:
+        print(f"🌐 Setting MERCHANT_ID for {len(merchant_data)} teams")
     print(f"📋 Variable: MERCHANT_ID")
     print(f"🏷️ Category: payment")
     print(f"📝 Description: Необходим для обращения к Платежном шлюзу")
@@ -113,14 +129,25 @@ def set_merchant_ids(merchant_data: List[Dict], api: TeamEnvAPI):
     print(f"✏️ Editable: No (Read-only)")
     print()
     
-    for i, team_data in enumerate(merchant_data, 1):
+    failed_teams = []
+    total_count = 0
+    remaining = iter(merchant_data)
+    for i, team_data in enumerate(remaining, 1):
+        total_count = i
         team_nickname = team_data['team_nickname']
+        if api.deadline.expired() or api.breakers.should_pause(deadline=api.deadline):
+            # Draining the stream only reads the config, nothing is written
+            pending_teams = failed_teams + [team_nickname] + [
+                item['team_nickname'] for item in remaining]
+            if api.deadline.expired():
+                team_env_module.stop_at_deadline(api.deadline, pending_teams)
+            team_env_module.pause_run(api.breakers, pending_teams)
         team_name = team_data['team_name']
         merchant_id = team_data['merchant_id']
         status = team_data['status']
         member_count = team_data['member_count']
         
-        print(f"🔄 Processing team {i}/{total_count}: {team_nickname} ({team_name})")
+        print(f"🔄 Processing team {i}{total_label}: {team_nickname} ({team_name})")
         print(f"   Status: {status} | Members: {member_count}")
         print(f"   Merchant ID: {merchant_id}")
         
@@ -138,10 +165,19 @@ def set_merchant_ids(merchant_data: List[Dict], api: TeamEnvAPI):
             success_count += 1
             print(f"   ✅ Success")
         else:
+            failed_teams.append(team_nickname)
             print(f"   ❌ Failed")
         
         print()
     
+    if failed_teams and api.deadline.expired():
+        team_env_module.stop_at_deadline(api.deadline, failed_teams)
+    
+    if streaming and total_count == 0:
+        # Nothing selected, e.g. a changeset without changes for this variable
+        print("⚠️ No teams with MERCHANT_ID to process in configuration stream")
+        return True
+    
     print("=" * 60)
     print("📊 MERCHANT_ID SETUP SUMMARY")
     print("=" * 60)
@@ -150,10 +186,12 @@ def set_merchant_ids(merchant_data: List[Dict], api: TeamEnvAPI):
     
     if success_count == total_count:
         print("✅ All teams processed successfully!")
-        print()
-        print("💳 Teams can now use their MERCHANT_ID for payment gateway access:")
-        for team_data in merchant_data:
-            print(f"   • {team_data['team_nickname']}: {team_data['merchant_id']}")
+        # The recap needs every team in memory, which streamed input avoids
+        if not streaming:
+            print()
+            print("💳 Teams can now use their MERCHANT_ID for payment gateway access:")
+            for team_data in merchant_data:
+                print(f"   • {team_data['team_nickname']}: {team_data['merchant_id']}")
     else:
         print(f"⚠️ {total_count - success_count} teams had errors")
     
@@ -193,6 +231,20 @@ as read-only environment variables for each team in the payment category.
                        help='Service API key (or set SERVICE_API_KEY env var)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be done without making changes')
+    parser.add_argument('--only-changed', metavar='CHANGESET', nargs='?', const='',
+                       help='Process only teams added or changed in an export-diff changeset; '
+                            'without a value, use the changes recorded by generate --update')
+    parser.add_argument('--breaker-failures', type=int, default=5,
+                       help='Consecutive failures that open a circuit (default: 5)')
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                       help='Seconds an open circuit waits before a probe (default: 30)')
+    parser.add_argument('--pending-file', default='pending-teams.json',
+                       help='Where a paused or timed-out run saves its pending teams (default: pending-teams.json)')
+    parser.add_argument('--timeout', type=team_env_module.parse_timeout,
+                       default=team_env_module.DEFAULT_TIMEOUT, metavar='CONNECT,READ',
+                       help='Hub request timeouts in seconds (default: 10,30)')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                       help='Stop after this many seconds and save pending teams')
     
     args = parser.parse_args()
     
@@ -200,6 +252,11 @@ as read-only environment variables for each team in the payment category.
         print("❌ API key is required. Set SERVICE_API_KEY environment variable or use --api-key")
         sys.exit(1)
     
+    if args.only_changed == '' and args.config_file == '-':
+        print("❌ A bare --only-changed reads the changes recorded in the config file, "
+              "which is not possible with --config-file -; pass the changeset file instead")
+        sys.exit(1)
+    
     print("============================================================")
     print("MERCHANT_ID Environment Variable Setup for HackLoad 2025")
     print("============================================================")
@@ -208,25 +265,37 @@ as read-only environment variables for each team in the payment category.
     print(f"🧪 Dry run: {args.dry_run}")
     print()
     
-    # Load team configuration
+    # Load team configuration (NDJSON is streamed)
+    load_script_module("validate_data", "validate-data.py").require_valid_data(config_file=args.config_file)
     config_data = load_team_config(args.config_file)
     
     # Extract MERCHANT_ID data
-    merchant_data = extract_merchant_ids(config_data['teams'])
+    merchant_data = extract_merchant_ids(config_data)
     
-    if not merchant_data:
+    if isinstance(merchant_data, list) and not merchant_data:
         print("❌ No teams with MERCHANT_ID found in configuration file")
         sys.exit(1)
     
+    if args.only_changed:
+        merchant_data = filter_changed_merchants(merchant_data, args.only_changed)
+    elif args.only_changed == '':
+        merchant_data = filter_changed_merchants(merchant_data, args.config_file, 'MERCHANT_ID')
+    
     if args.dry_run:
         print("🧪 DRY RUN MODE - No changes will be made")
         print()
     
     # Initialize API
-    api = TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run)
+    breakers = team_env_module.CircuitBreakers('hub', failure_threshold=args.breaker_failures,
+                                               reset_timeout=args.breaker_reset)
+    api = team_env_module.TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run, breakers,
+                                     args.timeout, team_env_module.Deadline(args.deadline))
     
     # Set MERCHANT_ID environment variables
-    success = set_merchant_ids(merchant_data, api)
+    try:
+        success = set_merchant_ids(merchant_data, api)
+    except team_env_module.RunStopped as stopped:
+        team_env_module.exit_stopped_run(stopped, args.pending_file)
     
     if not success:
         sys.exit(1)
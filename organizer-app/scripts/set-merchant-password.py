@@ -5,70 +5,78 @@ Sets MERCHANT_PASSWORD from team-env-config.json for all approved teams as secur
 """
 
 import argparse
+import hashlib
+import hmac
+import itertools
 import json
 import os
 import sys
-import requests
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
 
+from script_loader import load_script_module
 
-class TeamEnvAPI:
-    def __init__(self, api_base_url: str, api_key: str, dry_run: bool = False):
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
+
+class FingerprintLedger:
+    """Keyed fingerprints of secret values last applied successfully per team.
+
+    Secure values are masked on reads, so the hub cannot tell whether it
+    already holds a secret. The ledger stores HMAC-SHA256 fingerprints (never
+    the secrets) over hub URL, team, key and value; a matching fingerprint
+    means the same value was already applied to the same hub. Without the
+    HMAC key the fingerprints cannot be used to guess values.
+    """
+
+    def __init__(self, ledger_file: str, hmac_key: str, api_base_url: str):
+        self.ledger_file = ledger_file
+        self.hmac_key = hmac_key.encode('utf-8')
         self.api_base_url = api_base_url.rstrip('/')
-        self.api_key = api_key
-        self.dry_run = dry_run
-
-    def set_team_env_var(self, team_nickname: str, key: str, value: str, 
-                        description: str = "", category: str = "general", 
-                        is_secure: bool = False, is_editable: bool = True) -> bool:
-        """Set or update an environment variable for a team."""
-        url = f"{self.api_base_url}/api/service/teams/{team_nickname}/environment/{key}"
-        
-        headers = {
-            'X-API-Key': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "value": value,
-            "description": description,
-            "category": category,
-            "isSecure": is_secure,
-            "isEditable": is_editable
-        }
-        
-        if self.dry_run:
-            print(f"[DRY RUN] Would PUT to {url}")
-            print(f"[DRY RUN] Data: {json.dumps(data, indent=2, ensure_ascii=False)}")
-            return True
-        
+        self.fingerprints = {}
+        self.dirty = False
         try:
-            response = requests.put(url, headers=headers, json=data)
-            response.raise_for_status()
-            print(f"✅ Set {key}=***MASKED*** for team {team_nickname}")
-            return True
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error setting {key} for team {team_nickname}: {e}")
-            return False
+            with open(ledger_file, 'r', encoding='utf-8') as f:
+                self.fingerprints = json.load(f).get('fingerprints', {})
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Ignoring invalid ledger file {ledger_file}: {e}")
+
+    def fingerprint(self, team_nickname: str, key: str, value: str) -> str:
+        message = '\0'.join([self.api_base_url, team_nickname, key, value]).encode('utf-8')
+        return hmac.new(self.hmac_key, message, hashlib.sha256).hexdigest()
+
+    def matches(self, team_nickname: str, key: str, value: str) -> bool:
+        stored = self.fingerprints.get(f"{team_nickname}/{key}")
+        return stored is not None and hmac.compare_digest(
+            stored, self.fingerprint(team_nickname, key, value))
+
+    def record(self, team_nickname: str, key: str, value: str):
+        self.fingerprints[f"{team_nickname}/{key}"] = self.fingerprint(team_nickname, key, value)
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_file = f"{self.ledger_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprints': self.fingerprints}, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.ledger_file)
+        self.dirty = False
+
 
+def load_team_config(config_file: str) -> Union[Dict, Iterator[Tuple[str, Dict]]]:
+    """Load team configuration from a JSON or NDJSON file ('-' for stdin).
 
-def load_team_config(config_file: str) -> Dict:
-    """Load team configuration from JSON file."""
+    JSON configs are returned as the usual ``teams`` dict. NDJSON configs are
+    returned as a lazy iterator of (nickname, team config) pairs, read line by
+    line while the variables are applied.
+    """
+    meta = {}
     try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-            if 'teams' not in data:
-                print(f"❌ Invalid config file: missing 'teams' section")
-                sys.exit(1)
-            
-            teams_data = data['teams']
-            print(f"📊 Configuration Statistics:")
-            print(f"   Total teams in config: {len(teams_data)}")
-            print(f"   Configuration generated: {data.get('meta', {}).get('generated_at', 'Unknown')}")
-            print()
-            
-            return data
+        teams = team_env_module.iter_team_config(config_file, meta)
+        first = next(teams, None)
     except FileNotFoundError:
         print(f"❌ Configuration file not found: {config_file}")
         print("💡 Generate it first using: ./generate-team-env-config.py")
@@ -76,38 +84,99 @@ def load_team_config(config_file: str) -> Dict:
     except json.JSONDecodeError as e:
         print(f"❌ Invalid JSON in configuration file: {e}")
         sys.exit(1)
+    except ValueError:
+        print(f"❌ Invalid config file: missing 'teams' section")
+        sys.exit(1)
+    
+    streaming = meta.get('format') == 'ndjson'
+    
+    print(f"📊 Configuration Statistics:")
+    if streaming:
+        print(f"   Format: NDJSON (streamed)")
+    print(f"   Configuration generated: {meta.get('generated_at', 'Unknown')}")
+    
+    if streaming:
+        print()
+        
+        def stream():
+            try:
+                yield from itertools.chain([first] if first else [], teams)
+            except json.JSONDecodeError as e:
+                print(f"❌ Invalid JSON in configuration stream: {e}")
+                sys.exit(1)
+        
+        return stream()
+    
+    teams_data = dict(itertools.chain([first] if first else [], teams))
+    print(f"   Total teams in config: {len(teams_data)}")
+    print()
+    return teams_data
 
 
-def extract_merchant_passwords(teams_data: Dict) -> List[Dict]:
-    """Extract MERCHANT_PASSWORD values for all teams from configuration."""
-    merchant_data = []
-    
-    for team_nickname, team_config in teams_data.items():
+def iter_merchant_passwords(teams: Iterable[Tuple[str, Dict]]) -> Iterator[Dict]:
+    """Yield MERCHANT_PASSWORD values of teams one at a time."""
+    for team_nickname, team_config in teams:
         team_info = team_config.get('team_info', {})
         env_vars = team_config.get('environment_variables', {})
         
         if 'MERCHANT_PASSWORD' in env_vars:
             password = env_vars['MERCHANT_PASSWORD']
-            merchant_data.append({
+            yield {
                 'team_nickname': team_nickname,
                 'team_name': team_info.get('name', 'Unknown'),
                 'merchant_password': password,
                 'password_masked': f"{password[:3]}***{password[-3:]}",
                 'status': team_info.get('status', 'UNKNOWN'),
                 'member_count': team_info.get('member_count', 0)
-            })
+            }
         else:
             print(f"⚠️ Missing MERCHANT_PASSWORD for team {team_nickname}")
-    
-    return merchant_data
 
 
-def set_merchant_passwords(merchant_data: List[Dict], api: TeamEnvAPI):
-    """Set MERCHANT_PASSWORD environment variables for all teams."""
+def extract_merchant_passwords(teams_data: Union[Dict, Iterable[Tuple[str, Dict]]]) -> Union[List[Dict], Iterator[Dict]]:
+    """Extract MERCHANT_PASSWORD values for all teams from configuration.
+
+    A ``teams`` dict gives a list; streamed NDJSON pairs give a lazy iterator.
+    """
+    if isinstance(teams_data, dict):
+        return list(iter_merchant_passwords(teams_data.items()))
+    return iter_merchant_passwords(teams_data)
+
+
+def filter_changed_merchants(merchant_data: Union[List[Dict], Iterator[Dict]],
+                             changeset_file: str, key: str = None) -> Union[List[Dict], Iterator[Dict]]:
+    """Keep only teams added or changed in an export-diff changeset.
+
+    ``key`` narrows changed teams to those whose entry lists the variable.
+    """
+    changed_nicknames = load_script_module("export_diff", "export-diff.py").load_changeset(changeset_file, key)
+    if not isinstance(merchant_data, list):
+        print(f"🔀 Changeset {changeset_file}: processing only {len(changed_nicknames)} changed teams")
+        print()
+        return (item for item in merchant_data if item['team_nickname'] in changed_nicknames)
+    filtered = [item for item in merchant_data if item['team_nickname'] in changed_nicknames]
+    print(f"🔀 Changeset {changeset_file}: processing {len(filtered)}/{len(merchant_data)} teams")
+    print()
+    return filtered
+
+
+def set_merchant_passwords(merchant_data: Union[List[Dict], Iterator[Dict]], api: 'team_env_module.TeamEnvAPI',
+                           ledger: FingerprintLedger = None, force: bool = False):
+    """Set MERCHANT_PASSWORD environment variables for all teams.
+
+    Streamed input is applied as it is read; totals are known only at the end.
+    Teams whose password fingerprint matches the ledger are skipped unless
+    ``force`` is set; the ledger is updated only after successful real writes.
+    """
     success_count = 0
-    total_count = len(merchant_data)
+    skipped_count = 0
+    streaming = not isinstance(merchant_data, list)
+    total_label = "" if streaming else f"/{len(merchant_data)}"
     
-    print(f"🔐 Setting MERCHANT_PASSWORD for {total_count} teams")
+    if streaming:
+        print(f"🔐 Setting MERCHANT_PASSWORD for teams as they are read from the config stream")
+    else:
+        print(f"🔐 Setting MERCHANT_PASSWORD for {len(merchant_data)} teams")
     print(f"📋 Variable: MERCHANT_PASSWORD")
     print(f"🏷️ Category: payment")
     print(f"📝 Description: Используется для создания токена при обращении к Платежному шлюзу")
@@ -115,18 +184,36 @@ def set_merchant_passwords(merchant_data: List[Dict], api: TeamEnvAPI):
     print(f"✏️ Editable: No (Read-only)")
     print()
     
-    for i, team_data in enumerate(merchant_data, 1):
+    failed_teams = []
+    total_count = 0
+    remaining = iter(merchant_data)
+    for i, team_data in enumerate(remaining, 1):
+        total_count = i
         team_nickname = team_data['team_nickname']
+        if api.deadline.expired() or api.breakers.should_pause(deadline=api.deadline):
+            # Draining the stream only reads the config, nothing is written
+            pending_teams = failed_teams + [team_nickname] + [
+                item['team_nickname'] for item in remaining]
+            if api.deadline.expired():
+                team_env_module.stop_at_deadline(api.deadline, pending_teams)
+            team_env_module.pause_run(api.breakers, pending_teams)
         team_name = team_data['team_name']
         merchant_password = team_data['merchant_password']
         password_masked = team_data['password_masked']
         status = team_data['status']
         member_count = team_data['member_count']
         
-        print(f"🔄 Processing team {i}/{total_count}: {team_nickname} ({team_name})")
+        print(f"🔄 Processing team {i}{total_label}: {team_nickname} ({team_name})")
         print(f"   Status: {status} | Members: {member_count}")
         print(f"   Merchant Password: {password_masked} (26 chars)")
         
+        if ledger and not force and ledger.matches(team_nickname, "MERCHANT_PASSWORD", merchant_password):
+            success_count += 1
+            skipped_count += 1
+            print(f"   ⏭️ Unchanged since last apply (fingerprint match)")
+            print()
+            continue
+        
         success = api.set_team_env_var(
             team_nickname,
             "MERCHANT_PASSWORD",
@@ -139,30 +226,45 @@ def set_merchant_passwords(merchant_data: List[Dict], api: TeamEnvAPI):
         
         if success:
             success_count += 1
+            if ledger and not api.dry_run:
+                ledger.record(team_nickname, "MERCHANT_PASSWORD", merchant_password)
             print(f"   ✅ Success")
         else:
+            failed_teams.append(team_nickname)
             print(f"   ❌ Failed")
         
         print()
     
+    if failed_teams and api.deadline.expired():
+        team_env_module.stop_at_deadline(api.deadline, failed_teams)
+    
+    if streaming and total_count == 0:
+        # Nothing selected, e.g. a changeset without changes for this variable
+        print("⚠️ No teams with MERCHANT_PASSWORD to process in configuration stream")
+        return True
+    
     print("=" * 60)
     print("📊 MERCHANT_PASSWORD SETUP SUMMARY")
     print("=" * 60)
     print(f"Teams processed: {success_count}/{total_count}")
-    print(f"Environment variables set: {success_count}")
+    print(f"Environment variables set: {success_count - skipped_count}")
+    if ledger:
+        print(f"Skipped (fingerprint match): {skipped_count}")
     
     if success_count == total_count:
         print("✅ All teams processed successfully!")
-        print()
-        print("🔐 Teams now have secure MERCHANT_PASSWORD variables for payment gateway access:")
-        for team_data in merchant_data:
-            print(f"   • {team_data['team_nickname']}: {team_data['password_masked']} (encrypted & read-only)")
-        print()
-        print("🔑 Security Features:")
-        print("   • Values are encrypted in the database")
-        print("   • Variables are read-only (cannot be modified by teams)")
-        print("   • 26-character passwords with high entropy")
-        print("   • Categorized under 'payment' for organization")
+        # The recap needs every team in memory, which streamed input avoids
+        if not streaming:
+            print()
+            print("🔐 Teams now have secure MERCHANT_PASSWORD variables for payment gateway access:")
+            for team_data in merchant_data:
+                print(f"   • {team_data['team_nickname']}: {team_data['password_masked']} (encrypted & read-only)")
+            print()
+            print("🔑 Security Features:")
+            print("   • Values are encrypted in the database")
+            print("   • Variables are read-only (cannot be modified by teams)")
+            print("   • 26-character passwords with high entropy")
+            print("   • Categorized under 'payment' for organization")
     else:
         print(f"⚠️ {total_count - success_count} teams had errors")
     
@@ -186,6 +288,9 @@ Examples:
   
   # Use custom API settings
   ./set-merchant-password.py --api-base-url "https://custom.api.com"
+  
+  # Re-apply every password even if the ledger says it is unchanged
+  ./set-merchant-password.py --force
 
 This script reads MERCHANT_PASSWORD values from team-env-config.json and sets them
 as secure, read-only environment variables for each team in the payment category.
@@ -195,6 +300,7 @@ Security Features:
 - Variables are read-only (teams cannot modify them)
 - Passwords are masked in logs for security
 - 26-character passwords with high entropy (0-9a-zA-Z#-@)
+- Applied passwords are remembered as HMAC fingerprints (never in plain text)
         """
     )
     
@@ -208,6 +314,29 @@ Security Features:
                        help='Service API key (or set SERVICE_API_KEY env var)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be done without making changes')
+    parser.add_argument('--only-changed', metavar='CHANGESET', nargs='?', const='',
+                       help='Process only teams added or changed in an export-diff changeset; '
+                            'without a value, use the changes recorded by generate --update')
+    parser.add_argument('--ledger-file', default='.merchant-password-ledger.json',
+                       help='Fingerprint ledger of applied passwords (default: .merchant-password-ledger.json)')
+    parser.add_argument('--ledger-key',
+                       default=os.getenv('LEDGER_HMAC_KEY'),
+                       help='HMAC key for fingerprints (or set LEDGER_HMAC_KEY env var, default: the API key)')
+    parser.add_argument('--no-ledger', action='store_true',
+                       help='Do not read or update the fingerprint ledger')
+    parser.add_argument('--force', action='store_true',
+                       help='Apply passwords even if their fingerprint matches the ledger')
+    parser.add_argument('--breaker-failures', type=int, default=5,
+                       help='Consecutive failures that open a circuit (default: 5)')
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                       help='Seconds an open circuit waits before a probe (default: 30)')
+    parser.add_argument('--pending-file', default='pending-teams.json',
+                       help='Where a paused or timed-out run saves its pending teams (default: pending-teams.json)')
+    parser.add_argument('--timeout', type=team_env_module.parse_timeout,
+                       default=team_env_module.DEFAULT_TIMEOUT, metavar='CONNECT,READ',
+                       help='Hub request timeouts in seconds (default: 10,30)')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                       help='Stop after this many seconds and save pending teams')
     
     args = parser.parse_args()
     
@@ -215,33 +344,59 @@ Security Features:
         print("❌ API key is required. Set SERVICE_API_KEY environment variable or use --api-key")
         sys.exit(1)
     
+    if args.only_changed == '' and args.config_file == '-':
+        print("❌ A bare --only-changed reads the changes recorded in the config file, "
+              "which is not possible with --config-file -; pass the changeset file instead")
+        sys.exit(1)
+    
     print("============================================================")
     print("MERCHANT_PASSWORD Environment Variable Setup for HackLoad 2025")
     print("============================================================")
     print(f"📁 Config file: {args.config_file}")
     print(f"🌐 API base URL: {args.api_base_url}")
     print(f"🧪 Dry run: {args.dry_run}")
+    print(f"🧾 Ledger: {'disabled' if args.no_ledger else args.ledger_file}{' (forced)' if args.force else ''}")
     print()
     
-    # Load team configuration
+    # Load team configuration (NDJSON is streamed)
+    load_script_module("validate_data", "validate-data.py").require_valid_data(config_file=args.config_file)
     config_data = load_team_config(args.config_file)
     
     # Extract MERCHANT_PASSWORD data
-    merchant_data = extract_merchant_passwords(config_data['teams'])
+    merchant_data = extract_merchant_passwords(config_data)
     
-    if not merchant_data:
+    if isinstance(merchant_data, list) and not merchant_data:
         print("❌ No teams with MERCHANT_PASSWORD found in configuration file")
         sys.exit(1)
     
+    if args.only_changed:
+        merchant_data = filter_changed_merchants(merchant_data, args.only_changed)
+    elif args.only_changed == '':
+        merchant_data = filter_changed_merchants(merchant_data, args.config_file, 'MERCHANT_PASSWORD')
+    
     if args.dry_run:
         print("🧪 DRY RUN MODE - No changes will be made")
         print()
     
     # Initialize API
-    api = TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run)
+    breakers = team_env_module.CircuitBreakers('hub', failure_threshold=args.breaker_failures,
+                                               reset_timeout=args.breaker_reset)
+    api = team_env_module.TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run, breakers,
+                                     args.timeout, team_env_module.Deadline(args.deadline))
+    
+    ledger = None
+    if not args.no_ledger:
+        ledger = FingerprintLedger(args.ledger_file, args.ledger_key or args.api_key, args.api_base_url)
     
     # Set MERCHANT_PASSWORD environment variables
-    success = set_merchant_passwords(merchant_data, api)
+    try:
+        success = set_merchant_passwords(merchant_data, api, ledger, args.force)
+    except team_env_module.RunStopped as stopped:
+        team_env_module.exit_stopped_run(stopped, args.pending_file)
+    finally:
+        # Keep fingerprints of passwords applied before an interruption
+        if ledger:
+            ledger.save()
     
     if not success:
         sys.exit(1)
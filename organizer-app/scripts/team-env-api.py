@@ -5,21 +5,597 @@ Manages environment variables for HackLoad 2025 teams via API.
 """
 
 import argparse
+import codecs
+import csv
+import fnmatch
+import gzip
+import hashlib
 import json
 import os
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
 import requests
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
+
+from script_loader import load_script_module
+
+
+# Metadata of the variables managed by the set-*.py scripts, psid-manager.py and
+# github-repo-manager.py, keyed by variable name
+CONFIG_VARIABLE_METADATA = {
+    "ENDPOINT_URL": {
+        "description": "Доменное имя, которое будет использоваться при обращение к Billeter API команды",
+        "category": "api", "is_secure": False, "is_editable": False
+    },
+    "EVENT_PROVIDER": {
+        "description": "EndPoint Провайдер билетов (Event Provider)",
+        "category": "api", "is_secure": False, "is_editable": False
+    },
+    "PAYMENT_ENDPOINT": {
+        "description": "API Платежного шлюза",
+        "category": "api", "is_secure": False, "is_editable": False
+    },
+    "Repo": {
+        "description": "Репозиторий для хранения кода в рамках хакатона",
+        "category": "development", "is_secure": False, "is_editable": True
+    },
+    "MERCHANT_ID": {
+        "description": "Необходим для обращения к Платежном шлюзу",
+        "category": "payment", "is_secure": False, "is_editable": False
+    },
+    "MERCHANT_PASSWORD": {
+        "description": "Используется для создания токена при обращении к Платежному шлюзу",
+        "category": "payment", "is_secure": True, "is_editable": False
+    },
+    "PSID": {
+        "description": "ID Платежного аккаунта PS.KZ",
+        "category": "cloud", "is_secure": False, "is_editable": True
+    }
+}
+
+
+def mask_secure_value(value: str) -> str:
+    """Mask a secure value the same way the service API does on reads."""
+    if len(value) <= 8:
+        return '***'
+    return value[:4] + '***' + value[-4:]
+
+
+def env_var_needs_update(current: Optional[Dict], value: str, metadata: Dict) -> bool:
+    """Check whether a variable read from the service API differs from the desired state.
+
+    Secure values are masked on reads, so they are compared in masked form.
+    """
+    if current is None:
+        return True
+    expected_value = mask_secure_value(value) if metadata['is_secure'] else value
+    return (current.get('value') != expected_value
+            or current.get('isSecure') != metadata['is_secure']
+            or current.get('isEditable', True) != metadata['is_editable']
+            or (current.get('category') or 'general') != metadata['category']
+            or (current.get('description') or '') != metadata['description'])
+
+
+# Exit status of a bulk run paused by an open circuit (EX_TEMPFAIL: retry later)
+EXIT_PAUSED = 75
+
+# Exit status of a bulk run stopped by --deadline (as timeout(1) uses)
+EXIT_DEADLINE = 124
+
+# Default (connect, read) timeout in seconds of hub and GitHub requests
+DEFAULT_TIMEOUT = (10, 30)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while a circuit breaker is open."""
+
+    def __init__(self, breaker: 'CircuitBreaker'):
+        self.breaker = breaker
+        super().__init__(f"circuit {breaker.name} is open (retry in {breaker.retry_in():.0f}s)")
+
+
+def is_overloaded(response: requests.Response) -> bool:
+    """Whether a response means the service is failing or throttling rather than answering."""
+    if response.status_code >= 500 or response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers)
+
+
+class CircuitBreaker:
+    """Fails fast on an endpoint family that keeps failing.
+
+    The circuit opens after ``failure_threshold`` consecutive failures, or
+    when at least ``error_rate`` of the last ``window`` calls failed. While
+    open, requests raise CircuitOpenError without touching the network.
+    After ``reset_timeout`` seconds one probe request is let through
+    (half-open): success closes the circuit, failure opens it again.
+    Connection errors, timeouts, 5xx, 429 and rate-limited 403s (how
+    GitHub reports primary and secondary rate limits) count as failures;
+    other responses mean the service is up.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, error_rate: float = 0.5,
+                 window: int = 20, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failed_probes = 0
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'open' and self.retry_in() == 0:
+                self.state = 'half-open'
+            if self.state == 'open' or (self.state == 'half-open' and self._probe_in_flight):
+                raise CircuitOpenError(self)
+            if self.state == 'half-open':
+                self._probe_in_flight = True
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._outcomes.append(ok)
+            if self.state == 'half-open':
+                self._probe_in_flight = False
+                if ok:
+                    print(f"🟢 Circuit {self.name} closed again")
+                    self.state = 'closed'
+                    self.failed_probes = 0
+                    self._consecutive_failures = 0
+                    self._outcomes.clear()
+                else:
+                    self.failed_probes += 1
+                    self._open()
+                return
+
+            self._consecutive_failures = 0 if ok else self._consecutive_failures + 1
+            failures = self._outcomes.count(False)
+            if self.state == 'closed' and (
+                    self._consecutive_failures >= self.failure_threshold
+                    or (len(self._outcomes) == self._outcomes.maxlen
+                        and failures / len(self._outcomes) >= self.error_rate)):
+                self._open()
+
+    def _open(self):
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        print(f"🔴 Circuit {self.name} open: failing fast for {self.reset_timeout:.0f}s")
+
+    def send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the breaker; the caller handles the response status."""
+        self.before_call()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.record(False)
+            raise
+        self.record(not is_overloaded(response))
+        return response
+
+
+class CircuitBreakers:
+    """Circuit breakers of one client, one per endpoint family."""
+
+    def __init__(self, client: str, **settings):
+        self.client = client
+        self.settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, family: str) -> CircuitBreaker:
+        with self._lock:
+            if family not in self._breakers:
+                self._breakers[family] = CircuitBreaker(f"{self.client}/{family}", **self.settings)
+            return self._breakers[family]
+
+    def request(self, family: str, method: str, url: str, **kwargs) -> requests.Response:
+        return self.get(family).send(method, url, **kwargs)
+
+    def open_breakers(self) -> List[CircuitBreaker]:
+        with self._lock:
+            return [breaker for breaker in self._breakers.values() if breaker.state != 'closed']
+
+    def should_pause(self, max_failed_probes: int = 1, deadline: 'Deadline' = None) -> bool:
+        """Decide, between two teams of a bulk run, whether to stop.
+
+        While a circuit is open the run waits for its half-open probe; once
+        ``max_failed_probes`` probes failed the service is considered down
+        and the run should pause instead of burning through the remaining
+        teams. The wait never outlasts ``deadline``.
+        """
+        for breaker in self.open_breakers():
+            if breaker.failed_probes >= max_failed_probes:
+                return True
+            if breaker.state == 'open':
+                print(f"⏳ Circuit {breaker.name} open, probing in {breaker.retry_in():.0f}s")
+                wait = breaker.retry_in()
+                if deadline and deadline.remaining() is not None:
+                    wait = min(wait, deadline.remaining())
+                time.sleep(wait)
+        return False
+
+
+def write_pending_changeset(pending_file: str, pending_teams: Iterable[str], reason: str):
+    """Save teams a paused run did not finish as an export-diff changeset.
+
+    Every script's ``--only-changed`` accepts it, so the run resumes with
+    just these teams.
+    """
+    changeset = {
+        "meta": {
+            "generated_at": datetime.now().isoformat(),
+            "reason": reason
+        },
+        "added": sorted(set(pending_teams)),
+        "removed": [],
+        "changed": {}
+    }
+    tmp_file = f"{pending_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(changeset, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, pending_file)
+
+
+class RunStopped(Exception):
+    """A bulk run stopped before finishing; carries the teams still pending.
+
+    Library code raises it so callers decide what a stop means: the CLI
+    saves a pending changeset and exits (exit_stopped_run()), long-running
+    callers count a failed cycle and carry on.
+    """
+
+    icon = '⏹️'
+    exit_code = 1
+
+    def __init__(self, message: str, reason: str, pending_teams: Iterable[str]):
+        self.reason = reason
+        self.pending_teams = sorted(set(pending_teams))
+        super().__init__(f"{message}, {len(self.pending_teams)} teams pending")
+
+
+class RunPaused(RunStopped):
+    """Raised by pause_run() when a circuit stayed open."""
+
+    icon = '⏸️'
+    exit_code = EXIT_PAUSED
+
+
+class DeadlineReached(RunStopped):
+    """Raised by stop_at_deadline() when the run deadline passed."""
+
+    icon = '⌛'
+    exit_code = EXIT_DEADLINE
+
+
+def pause_run(breakers: 'CircuitBreakers', pending_teams: List[str]):
+    """Stop a bulk run because a circuit stayed open."""
+    circuits = ', '.join(breaker.name for breaker in breakers.open_breakers())
+    raise RunPaused(f"Paused: circuit {circuits} open", f"circuit open: {circuits}", pending_teams)
+
+
+def exit_stopped_run(stopped: RunStopped, pending_file: str):
+    """Save the pending teams of a stopped run and exit with its status."""
+    write_pending_changeset(pending_file, stopped.pending_teams, stopped.reason)
+    print()
+    print(f"{stopped.icon} {stopped}")
+    print(f"   Pending teams saved to {pending_file}")
+    print(f"   Resume with: --only-changed {pending_file}")
+    sys.exit(stopped.exit_code)
+
+
+class DeadlineExceeded(requests.exceptions.RequestException):
+    """Raised instead of sending a request once the run deadline has passed."""
+
+
+class Deadline:
+    """Wall-clock budget of a whole run, shared by all its clients.
+
+    Bulk loops check ``expired()`` between teams; requests clamp their
+    timeouts to the time left, so work in flight at the deadline ends
+    within the budget instead of running to its own timeout.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def timeout(self, timeout: Tuple[float, float]) -> Tuple[float, float]:
+        """Clamp a (connect, read) timeout to the time left."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining == 0.0:
+            raise DeadlineExceeded(f"run deadline of {self.seconds:.0f}s exceeded")
+        return tuple(min(value, remaining) for value in timeout)
+
+
+def parse_timeout(value: str) -> Tuple[float, float]:
+    """Parse a ``CONNECT,READ`` timeout option; a single number sets both."""
+    try:
+        parts = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid timeout: {value}")
+    if len(parts) == 1:
+        parts *= 2
+    if len(parts) != 2 or min(parts) <= 0:
+        raise argparse.ArgumentTypeError(f"timeout must be CONNECT,READ seconds: {value}")
+    return tuple(parts)
+
+
+def stop_at_deadline(deadline: Deadline, pending_teams: List[str]):
+    """Stop a bulk run because its deadline passed."""
+    raise DeadlineReached(f"Deadline of {deadline.seconds:.0f}s reached",
+                          f"deadline of {deadline.seconds:.0f}s exceeded", pending_teams)
+
+
+class HedgePolicy:
+    """When to send a duplicate of a slow idempotent read.
+
+    A read still running after the ``percentile`` of recent read latencies
+    (``initial_delay`` until ``min_samples`` reads completed) is hedged
+    with a second identical request, unless hedges would exceed
+    ``max_rate`` of all reads.
+    """
+
+    def __init__(self, percentile: float = 95.0, max_rate: float = 0.1,
+                 initial_delay: float = 1.0, min_samples: int = 20, window: int = 200):
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def start_read(self) -> float:
+        """Count a read and return how long to wait before hedging it."""
+        with self._lock:
+            self.reads += 1
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            latencies = sorted(self._latencies)
+            index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+            return latencies[index]
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.max_rate * self.reads:
+                return False
+            self.hedges += 1
+            return True
+
+    def record(self, latency: float, hedge_won: bool = False):
+        with self._lock:
+            self._latencies.append(latency)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            return f"{self.hedges}/{self.reads} reads hedged, {self.hedge_wins} won by the hedge"
+
+
+class BulkWriteUnsupported(requests.exceptions.RequestException):
+    """Raised when the hub has no team-level bulk environment endpoint."""
+
+
+def env_var_payload(key: str, value: str, metadata: Dict) -> Dict:
+    """Build a bulk upsert entry from a value and CONFIG_VARIABLE_METADATA-style metadata."""
+    return {
+        "key": key,
+        "value": value,
+        "description": metadata['description'],
+        "category": metadata['category'],
+        "isSecure": metadata['is_secure'],
+        "isEditable": metadata['is_editable']
+    }
+
+
+def _is_team_not_found(response: requests.Response) -> bool:
+    try:
+        return response.json().get('error') == 'Team not found'
+    except ValueError:
+        return False
+
+
+def _close_abandoned_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result()[0].close()
 
 
 class TeamEnvAPI:
-    def __init__(self, api_base_url: str, api_key: str, dry_run: bool = False):
+    def __init__(self, api_base_url: str, api_key: str, dry_run: bool = False,
+                 breakers: CircuitBreakers = None,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT, deadline: Deadline = None,
+                 hedge: HedgePolicy = None, page_size: int = None, page_workers: int = 4,
+                 page_retries: int = 2):
         self.api_base_url = api_base_url.rstrip('/')
         self.api_key = api_key
         self.dry_run = dry_run
+        self.breakers = breakers or CircuitBreakers('hub')
+        self.timeout = timeout
+        self.deadline = deadline or Deadline()
+        self.hedge = hedge
+        self.page_size = page_size
+        self.page_workers = page_workers
+        self.page_retries = page_retries
+        # Whether the hub accepts bulk upserts; None until the first attempt
+        self.bulk_writes = None
+        # Paged reads call read() from page_workers threads, each needing room for
+        # a hedge; a smaller pool would queue attempts past the hedge delay
+        self._read_pool = ThreadPoolExecutor(max_workers=max(4, 2 * page_workers),
+                                             thread_name_prefix='hedge') if hedge else None
 
-    def get_team_env_vars(self, team_nickname: str = None) -> Optional[Dict]:
-        """Get environment variables for a team or all teams."""
+    def request(self, family: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a hub request through its circuit breaker, bounded by timeout and deadline."""
+        return self.breakers.request(family, method, url,
+                                     timeout=self.deadline.timeout(self.timeout), **kwargs)
+
+    def read(self, family: str, url: str, **kwargs) -> requests.Response:
+        """GET an idempotent resource, hedging slow requests when a HedgePolicy is set.
+
+        The first request to complete wins. The other one is cancelled if it
+        has not started yet; otherwise it is abandoned, ends on its own
+        timeout and its response is closed. An error is only raised once
+        both requests have failed.
+        """
+        if not self.hedge:
+            return self.request(family, 'GET', url, **kwargs)
+
+        def attempt():
+            started = time.monotonic()
+            response = self.request(family, 'GET', url, **kwargs)
+            return response, time.monotonic() - started
+
+        attempts = [self._read_pool.submit(attempt)]
+        done, _ = wait(attempts, timeout=self.hedge.start_read())
+        if not done and self.hedge.try_hedge():
+            attempts.append(self._read_pool.submit(attempt))
+
+        error = None
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response, latency = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+                    continue
+                for other in pending:
+                    if not other.cancel():
+                        other.add_done_callback(_close_abandoned_response)
+                self.hedge.record(latency, hedge_won=future is not attempts[0])
+                return response
+        raise error
+
+    def iter_environment(self, updated_since: str = None,
+                         header: Optional[Dict] = None) -> Iterator[Dict]:
+        """Stream the all-teams environment, yielding one team record at a time.
+
+        The response is requested compressed (gzip, or br when a brotli
+        decoder is installed), decompressed chunk by chunk and parsed with
+        iter_json_array, so memory stays bounded by the largest team rather
+        than the whole payload. Top-level keys such as ``updatedSince`` are
+        collected into ``header`` when a dict is passed. Request and decode
+        errors are raised to the caller, possibly after some teams were
+        yielded. With ``page_size`` set the state is read in pages instead.
+        """
+        params = {'updatedSince': updated_since} if updated_since else {}
+        if self.page_size:
+            yield from self._iter_environment_pages(params, header)
+            return
+
+        url = f"{self.api_base_url}/api/service/teams/environment"
+        headers = {
+            'X-API-Key': self.api_key,
+            'Accept-Encoding': requests.utils.DEFAULT_ACCEPT_ENCODING
+        }
+        response = self.read('env.read', url, headers=headers, params=params, stream=True)
+        with response:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            chunks = (decoder.decode(chunk) for chunk in response.iter_content(65536))
+            yield from iter_json_array(chunks, key='teams', header=header)
+
+    def fetch_environment_page(self, params: Dict, page: int) -> Dict:
+        """Fetch one page of the all-teams environment."""
+        url = f"{self.api_base_url}/api/service/teams/environment"
+        headers = {
+            'X-API-Key': self.api_key,
+            'Accept-Encoding': requests.utils.DEFAULT_ACCEPT_ENCODING
+        }
+        response = self.read('env.read', url, headers=headers,
+                             params={**params, 'page': page, 'pageSize': self.page_size})
+        response.raise_for_status()
+        return response.json()
+
+    def _iter_environment_pages(self, params: Dict, header: Optional[Dict]) -> Iterator[Dict]:
+        """Yield teams of a paged read, fetching pages concurrently but in order.
+
+        Page 1 tells the page count; a response without ``pagination`` comes
+        from a server that ignores paging and already holds every team. At
+        most ``2 * page_workers`` pages are fetched ahead of the consumer. A
+        failed page, page 1 included, is retried ``page_retries`` times before
+        the read fails.
+        Pages are cut by team nickname, so a team created during the read
+        can shift a team onto a page that was already read.
+        """
+        first = self._page(params, 1)
+        if header is not None:
+            header.update((key, value) for key, value in first.items() if key != 'teams')
+        yield from first['teams']
+        if 'pagination' not in first:
+            return
+
+        total_pages = first['pagination']['totalPages']
+        window = 2 * self.page_workers
+        with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix='page') as pool:
+            futures = {}
+            next_page = 2
+            for page in range(2, total_pages + 1):
+                while next_page <= total_pages and next_page < page + window:
+                    futures[next_page] = pool.submit(self.fetch_environment_page, params, next_page)
+                    next_page += 1
+                yield from self._page(params, page, futures.pop(page))['teams']
+
+    def _page(self, params: Dict, page: int, future=None) -> Dict:
+        """Return a page, refetching it if it failed; without ``future`` it is fetched here."""
+        try:
+            return future.result() if future else self.fetch_environment_page(params, page)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            error = e
+        for attempt in range(1, self.page_retries + 1):
+            print(f"⚠️ Page {page} failed ({error}), retry {attempt}/{self.page_retries}",
+                  file=sys.stderr)
+            time.sleep(attempt)
+            try:
+                return self.fetch_environment_page(params, page)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error = e
+        raise error
+
+    def fetch_environment(self, team_nickname: str = None,
+                          updated_since: str = None) -> Optional[Dict]:
+        """Fetch raw environment data for a team or all teams without printing it.
+
+        Reads are performed in dry-run mode too, since they change nothing.
+        With ``updated_since`` servers that support it return only variables
+        updated at or after that timestamp and echo it back as ``updatedSince``.
+        All-teams reads are paged when ``page_size`` is set.
+        """
+        if self.page_size and not team_nickname:
+            header = {}
+            try:
+                teams = list(self.iter_environment(updated_since, header))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"❌ Error getting env vars: {e}")
+                return None
+            return {**header, 'teams': teams}
+        
         url = f"{self.api_base_url}/api/service/teams/environment"
         
         headers = {
@@ -30,101 +606,265 @@ class TeamEnvAPI:
         params = {}
         if team_nickname:
             params['team'] = team_nickname
+        if updated_since:
+            params['updatedSince'] = updated_since
+        
+        try:
+            response = self.read('env.read', url, headers=headers, params=params)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error getting env vars: {e}")
+            return None
+
+    def sync_environment_state(self, state_file: str, full: bool = False,
+                               full_refresh_after: float = 3600) -> Optional[Dict]:
+        """Refresh a local cache of all teams' environment using updatedAt watermarks.
+
+        Only variables changed since the stored watermark are requested and merged
+        into the cache. If the server ignores ``updatedSince`` it returns the full
+        state, which replaces the cache and is filtered locally to count changes.
+        Deletions are only visible on full fetches, so a full fetch is forced when
+        the last one is older than ``full_refresh_after`` seconds.
+
+        Returns the cached state in the all-teams response shape plus a
+        ``changed`` count and an ``incremental`` flag.
+        """
+        state = None if full else load_env_state(state_file)
+        if state and time.time() - state.get('full_fetched_at', 0) > full_refresh_after:
+            state = None
+        watermark = state.get('watermark') if state else None
+
+        data = self.fetch_environment(updated_since=watermark)
+        if data is None:
+            return None
+
+        incremental = bool(watermark) and 'updatedSince' in data
+        if incremental:
+            teams = state['teams']
+            changed = 0
+            for team in data['teams']:
+                entry = teams.setdefault(team['teamSlug'], {'teamName': team['teamName'], 'environment': {}})
+                entry['teamName'] = team['teamName']
+                for var in team['environment']:
+                    # The watermark is inclusive, so the newest cached variable comes back unchanged
+                    if entry['environment'].get(var['key']) != var:
+                        changed += 1
+                    entry['environment'][var['key']] = var
+        else:
+            teams = {
+                team['teamSlug']: {
+                    'teamName': team['teamName'],
+                    'environment': {var['key']: var for var in team['environment']}
+                }
+                for team in data['teams']
+            }
+            changed = sum(
+                1 for team in teams.values() for var in team['environment'].values()
+                if not watermark or (var.get('updatedAt') or '') > watermark
+            )
+
+        timestamps = [var.get('updatedAt') or '' for team in teams.values()
+                      for var in team['environment'].values()]
+        new_state = {
+            'watermark': max(timestamps + [watermark or '']) or None,
+            'full_fetched_at': state['full_fetched_at'] if incremental else time.time(),
+            'teams': teams
+        }
+
+        tmp_file = f"{state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(new_state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, state_file)
+
+        return {
+            'teams': [
+                {'teamSlug': slug, 'teamName': team['teamName'],
+                 'environment': list(team['environment'].values())}
+                for slug, team in sorted(teams.items())
+            ],
+            'changed': changed,
+            'incremental': incremental
+        }
+
+    def get_team_env_vars(self, team_nickname: str = None) -> Optional[Dict]:
+        """Get environment variables for a team or all teams."""
+        url = f"{self.api_base_url}/api/service/teams/environment"
         
         if self.dry_run:
             print(f"[DRY RUN] Would GET from {url}")
-            if params:
-                print(f"[DRY RUN] Query params: {params}")
+            if team_nickname:
+                print(f"[DRY RUN] Query params: {{'team': '{team_nickname}'}}")
             return {"dry_run": True}
         
-        try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if team_nickname:
-                print(f"✅ Retrieved environment variables for team {team_nickname}")
-                if 'team' in data:
-                    team_data = data['team']
-                    print(f"📋 Found {len(team_data['environment'])} variables:")
-                    variables = []
-                    for var in team_data['environment']:
-                        secure_indicator = "🔒" if var['isSecure'] else "🔓"
-                        var_info = {
-                            'key': var['key'],
-                            'value': var['value'],
-                            'category': var.get('category', 'general'),
-                            'isSecure': var['isSecure'],
-                            'description': var.get('description', '')
-                        }
-                        variables.append(var_info)
-                        print(f"  {secure_indicator} {var['key']}={var['value']} ({var.get('category', 'general')})")
-                        if var.get('description'):
-                            print(f"    📝 {var['description']}")
-                    
-                    print(f"\n📄 Variable values list:")
-                    for var in variables:
-                        print(f"  {var['key']}: {var['value']}")
-            else:
-                print(f"✅ Retrieved environment variables for all teams")
-                print(f"📋 Found {len(data['teams'])} teams:")
-                all_variables = {}
-                for team in data['teams']:
-                    team_vars = []
-                    for var in team['environment']:
-                        var_info = {
-                            'key': var['key'],
-                            'value': var['value'],
-                            'category': var.get('category', 'general'),
-                            'isSecure': var['isSecure'],
-                            'description': var.get('description', '')
-                        }
-                        team_vars.append(var_info)
-                    all_variables[team['teamSlug']] = team_vars
-                    print(f"  • {team['teamSlug']} ({team['teamName']}) - {len(team['environment'])} variables")
-                
-                print(f"\n📄 All teams variable values:")
-                for team_slug, variables in all_variables.items():
-                    if variables:
-                        print(f"  {team_slug}:")
-                        for var in variables:
-                            print(f"    {var['key']}: {var['value']}")
-                    else:
-                        print(f"  {team_slug}: (no variables)")
+        if not team_nickname:
+            return self.print_all_team_env_vars()
+        
+        data = self.fetch_environment(team_nickname)
+        if data is None:
+            return None
+        
+        print(f"✅ Retrieved environment variables for team {team_nickname}")
+        if 'team' in data:
+            team_data = data['team']
+            print(f"📋 Found {len(team_data['environment'])} variables:")
+            variables = []
+            for var in team_data['environment']:
+                secure_indicator = "🔒" if var['isSecure'] else "🔓"
+                var_info = {
+                    'key': var['key'],
+                    'value': var['value'],
+                    'category': var.get('category', 'general'),
+                    'isSecure': var['isSecure'],
+                    'description': var.get('description', '')
+                }
+                variables.append(var_info)
+                print(f"  {secure_indicator} {var['key']}={var['value']} ({var.get('category', 'general')})")
+                if var.get('description'):
+                    print(f"    📝 {var['description']}")
             
-            return data
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error getting env vars: {e}")
+            print(f"\n📄 Variable values list:")
+            for var in variables:
+                print(f"  {var['key']}: {var['value']}")
+        return data
+
+    def print_all_team_env_vars(self, ndjson: bool = False) -> Optional[Dict]:
+        """Print every team's variables as the response streams in.
+
+        With ``ndjson`` each team record is written as one JSON line, a dump
+        of the whole hub environment in constant memory.
+        """
+        team_count = 0
+        variable_count = 0
+        if not ndjson:
+            print(f"🌐 Environment variables of all teams:")
+        try:
+            for team in self.iter_environment():
+                team_count += 1
+                variable_count += len(team['environment'])
+                if ndjson:
+                    print(json.dumps(team, ensure_ascii=False))
+                    continue
+                print(f"  • {team['teamSlug']} ({team['teamName']}) - {len(team['environment'])} variables")
+                for var in team['environment']:
+                    print(f"    {var['key']}: {var['value']}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"❌ Error getting env vars after {team_count} teams: {e}", file=sys.stderr if ndjson else sys.stdout)
             return None
+        
+        if not ndjson:
+            print(f"✅ Retrieved {variable_count} variables of {team_count} teams")
+        return {"teamCount": team_count, "variableCount": variable_count}
 
-    def set_team_env_var(self, team_nickname: str, key: str, value: str, 
-                        description: str = "", category: str = "general", 
-                        is_secure: bool = False, is_editable: bool = True) -> bool:
-        """Set or update an environment variable for a team."""
-        url = f"{self.api_base_url}/api/service/teams/{team_nickname}/environment/{key}"
+    def put_team_env_var(self, team_nickname: str, key: str, value: str,
+                         description: str = "", category: str = "general",
+                         is_secure: bool = False, is_editable: bool = True):
+        """Set a variable without printing; raises RequestException on failure.
+
+        Meant for concurrent callers that report results themselves. Does
+        nothing in dry-run mode.
+        """
+        if self.dry_run:
+            return
         
-        # Service API uses X-API-Key header instead of Bearer
+        url = f"{self.api_base_url}/api/service/teams/{team_nickname}/environment/{key}"
         headers = {
             'X-API-Key': self.api_key,
             'Content-Type': 'application/json'
         }
-        
         data = {
             "value": value,
             "description": description,
             "category": category,
-            "isSecure": is_secure
+            "isSecure": is_secure,
+            "isEditable": is_editable
         }
+        response = self.request('env.write', 'PUT', url, headers=headers, json=data)
+        response.raise_for_status()
+
+    def put_team_env_vars(self, team_nickname: str, variables: List[Dict]) -> Dict[str, str]:
+        """Upsert several variables of a team in one bulk request, without printing.
+
+        ``variables`` are env_var_payload() entries. Returns ``{key: error}``
+        for variables the hub rejected. Raises BulkWriteUnsupported when
+        the hub lacks the bulk endpoint and RequestException on other
+        failures. Does nothing in dry-run mode.
+        """
+        if self.dry_run:
+            return {}
         
+        url = f"{self.api_base_url}/api/service/teams/environment"
+        headers = {
+            'X-API-Key': self.api_key,
+            'Content-Type': 'application/json'
+        }
+        data = {"teamSlug": team_nickname, "updates": variables}
+        response = self.request('env.write', 'PUT', url, headers=headers, json=data)
+        # The endpoint itself answers 404 only for unknown teams
+        if response.status_code in (405, 501) or (
+                response.status_code == 404 and not _is_team_not_found(response)):
+            raise BulkWriteUnsupported(f"bulk environment writes unsupported (HTTP {response.status_code})")
+        response.raise_for_status()
+        return {error['key']: error['error'] for error in response.json().get('errors', [])}
+
+    def set_team_env_vars(self, team_nickname: str, variables: List[Dict]) -> List[str]:
+        """Set several variables of a team, coalesced into one request where possible.
+
+        Uses the team-level bulk upsert and falls back to one PUT per key,
+        for the rest of the run, once the hub turns out not to support it.
+        Returns the keys that could not be set.
+        """
+        keys = [var['key'] for var in variables]
         if self.dry_run:
+            url = f"{self.api_base_url}/api/service/teams/environment"
+            print(f"[DRY RUN] Would PUT {len(variables)} variables to {url} for team {team_nickname}: "
+                  f"{', '.join(keys)}")
+            return []
+        
+        if len(variables) > 1 and self.bulk_writes is not False:
+            try:
+                errors = self.put_team_env_vars(team_nickname, variables)
+                self.bulk_writes = True
+            except BulkWriteUnsupported:
+                self.bulk_writes = False
+                print("ℹ️ Hub has no bulk environment endpoint, writing variables one by one")
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Error setting {', '.join(keys)} for team {team_nickname}: {e}")
+                return keys
+            else:
+                for key, error in errors.items():
+                    print(f"❌ Error setting {key} for team {team_nickname}: {error}")
+                written = [key for key in keys if key not in errors]
+                if written:
+                    print(f"✅ Set {', '.join(written)} for team {team_nickname} in one request")
+                return list(errors)
+        
+        return [var['key'] for var in variables
+                if not self.set_team_env_var(team_nickname, var['key'], var['value'],
+                                             var['description'], var['category'],
+                                             var['isSecure'], var['isEditable'])]
+
+    def set_team_env_var(self, team_nickname: str, key: str, value: str, 
+                        description: str = "", category: str = "general", 
+                        is_secure: bool = False, is_editable: bool = True) -> bool:
+        """Set or update an environment variable for a team."""
+        if self.dry_run:
+            url = f"{self.api_base_url}/api/service/teams/{team_nickname}/environment/{key}"
+            data = {
+                "value": value,
+                "description": description,
+                "category": category,
+                "isSecure": is_secure,
+                "isEditable": is_editable
+            }
             print(f"[DRY RUN] Would PUT to {url}")
             print(f"[DRY RUN] Data: {json.dumps(data, indent=2, ensure_ascii=False)}")
             return True
         
         try:
-            response = requests.put(url, headers=headers, json=data)
-            response.raise_for_status()
-            print(f"✅ Set {key}={value} for team {team_nickname}")
+            self.put_team_env_var(team_nickname, key, value, description, category,
+                                  is_secure, is_editable)
+            print(f"✅ Set {key}={'***MASKED***' if is_secure else value} for team {team_nickname}")
             return True
         except requests.exceptions.RequestException as e:
             print(f"❌ Error setting {key} for team {team_nickname}: {e}")
@@ -144,7 +884,7 @@ class TeamEnvAPI:
             return True
         
         try:
-            response = requests.delete(url, headers=headers)
+            response = self.request('env.write', 'DELETE', url, headers=headers)
             response.raise_for_status()
             print(f"✅ Deleted {key} for team {team_nickname}")
             return True
@@ -153,27 +893,576 @@ class TeamEnvAPI:
             return False
 
 
-def load_teams_data(teams_file: str) -> List[Dict]:
-    """Load teams data from JSON file."""
+def load_env_state(state_file: str) -> Optional[Dict]:
+    """Load the local environment state cache, or None if missing or unreadable."""
     try:
-        with open(teams_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            teams = data.get('data', [])
-            
-            # Filter for approved teams only
-            approved_teams = [team for team in teams if team.get('teamStatus') == 'APPROVED']
-            
-            total_teams = len(teams)
-            approved_count = len(approved_teams)
-            rejected_count = total_teams - approved_count
-            
-            print(f"📊 Team Statistics:")
-            print(f"   Total teams: {total_teams}")
-            print(f"   ✅ Approved teams: {approved_count}")
-            print(f"   ❌ Rejected/Other teams: {rejected_count}")
-            print()
-            
-            return approved_teams
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class SnapshotStore:
+    """Content-addressed store of environment snapshots.
+
+    Values are kept once each, gzip-compressed under ``objects/`` and named
+    by their SHA-256, so a value shared by many teams or unchanged between
+    snapshots takes no extra space. A snapshot in ``snapshots/`` is a
+    gzipped manifest referencing values by digest next to the variables'
+    metadata.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+        self._known = set()
+        self.new_objects = 0
+        self.new_bytes = 0
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.gz")
+
+    def put_value(self, value: str) -> str:
+        data = value.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._known:
+            return digest
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed = gzip.compress(data, mtime=0)
+            tmp_file = f"{path}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_file, path)
+            self.new_objects += 1
+            self.new_bytes += len(compressed)
+        self._known.add(digest)
+        return digest
+
+    def get_value(self, digest: str) -> str:
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def save(self, name: str, manifest: Dict) -> str:
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        path = os.path.join(self.snapshots_dir, f"{name}.json.gz")
+        tmp_file = f"{path}.tmp"
+        with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, path)
+        return path
+
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name[:-len('.json.gz')] for name in os.listdir(self.snapshots_dir)
+                      if name.endswith('.json.gz'))
+
+    def load(self, name: str) -> Dict:
+        """Load a snapshot manifest by name; ``latest`` is the newest one."""
+        if name == 'latest':
+            names = self.names()
+            if not names:
+                raise FileNotFoundError(f"no snapshots in {self.snapshots_dir}")
+            name = names[-1]
+        with gzip.open(os.path.join(self.snapshots_dir, f"{name}.json.gz"), 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def take_snapshot(api: TeamEnvAPI, store: SnapshotStore, name: str) -> Optional[Dict]:
+    """Save the hub environment of all teams as a named snapshot.
+
+    The hub is read as a stream, so only digests and metadata are held in
+    memory. Secure values come back masked from the service API; they are
+    stored masked and flagged so restore can skip them.
+    """
+    teams = {}
+    variable_count = 0
+    try:
+        for team in api.iter_environment():
+            environment = {}
+            for var in team['environment']:
+                environment[var['key']] = {
+                    'value': store.put_value(var['value']),
+                    'category': var.get('category') or 'general',
+                    'description': var.get('description') or '',
+                    'isSecure': var['isSecure'],
+                    'isEditable': var.get('isEditable', True)
+                }
+            teams[team['teamSlug']] = {'teamName': team['teamName'], 'environment': environment}
+            variable_count += len(environment)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ Error reading hub environment: {e}")
+        return None
+
+    manifest = {
+        'meta': {
+            'name': name,
+            'created_at': datetime.now().isoformat(),
+            'api_base_url': api.api_base_url,
+            'team_count': len(teams),
+            'variable_count': variable_count
+        },
+        'teams': teams
+    }
+    store.save(name, manifest)
+    return manifest
+
+
+def plan_restore(manifest: Dict, live: Dict[str, Dict[str, Dict]], store: SnapshotStore,
+                 keys: Optional[Set[str]] = None, prune: bool = False) -> Tuple[List, List, List]:
+    """Diff a snapshot against live state.
+
+    Returns (puts, deletes, skipped): puts as (team, key, value, var),
+    deletes as (team, key) for variables absent from the snapshot when
+    ``prune`` is set, and skipped secure (team, key) pairs whose real value
+    the snapshot does not hold.
+    """
+    puts, deletes, skipped = [], [], []
+    for team_slug, team in sorted(manifest['teams'].items()):
+        if team_slug not in live:
+            print(f"⚠️ Team {team_slug} not found on the hub, skipping")
+            continue
+        current_vars = live[team_slug]
+        for key, var in sorted(team['environment'].items()):
+            if keys and key not in keys:
+                continue
+            current = current_vars.get(key)
+            metadata = {'is_secure': var['isSecure'], 'is_editable': var['isEditable'],
+                        'category': var['category'], 'description': var['description']}
+            value = store.get_value(var['value'])
+            # Masking is idempotent, so a stored masked value compares like a real one
+            if not env_var_needs_update(current, value, metadata):
+                continue
+            if var['isSecure']:
+                skipped.append((team_slug, key))
+            else:
+                puts.append((team_slug, key, value, var))
+        if prune:
+            deletes.extend((team_slug, key) for key in sorted(current_vars)
+                           if key not in team['environment'] and (not keys or key in keys))
+    return puts, deletes, skipped
+
+
+def restore_snapshot(api: TeamEnvAPI, store: SnapshotStore, manifest: Dict,
+                     team_nicknames: Optional[Set[str]] = None, keys: Optional[Set[str]] = None,
+                     prune: bool = False, workers: int = 8) -> bool:
+    """Write only the differences between a snapshot and the live hub, concurrently."""
+    if team_nicknames:
+        # Narrow a copy; the caller's manifest stays whole
+        manifest = {**manifest, 'teams': {slug: team for slug, team in manifest['teams'].items()
+                                          if slug in team_nicknames}}
+    print(f"📸 Snapshot {manifest['meta']['name']} from {manifest['meta']['created_at']}: "
+          f"{len(manifest['teams'])} teams")
+
+    try:
+        live = {team['teamSlug']: {var['key']: var for var in team['environment']}
+                for team in api.iter_environment() if team['teamSlug'] in manifest['teams']}
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ Error reading hub environment: {e}")
+        return False
+
+    puts, deletes, skipped = plan_restore(manifest, live, store, keys, prune)
+    print(f"🔍 Diff: {len(puts)} variables to write, {len(deletes)} to delete, "
+          f"{len(skipped)} secure variables skipped")
+    for team_slug, key in skipped:
+        print(f"   🔒 {team_slug}/{key}: snapshot holds only the masked value, set it with its own script")
+
+    team_variables = {}
+    for team_slug, key, value, var in puts:
+        team_variables.setdefault(team_slug, []).append({**var, 'key': key, 'value': value})
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='restore') as pool:
+        put_futures = [pool.submit(api.set_team_env_vars, team_slug, variables)
+                       for team_slug, variables in team_variables.items()]
+        delete_futures = [pool.submit(api.delete_team_env_var, team_slug, key)
+                          for team_slug, key in deletes]
+        failed = (sum(len(future.result()) for future in put_futures)
+                  + sum(1 for future in delete_futures if not future.result()))
+
+    total = len(puts) + len(deletes)
+    print(f"\n📊 Restore summary: {total - failed}/{total} changes applied")
+    return failed == 0
+
+
+def iter_json_array(source: Union[str, TextIO, Iterable[str]], key: str = 'data',
+                    header: Optional[Dict] = None, chunk_size: int = 65536) -> Iterator[Any]:
+    """Stream the items of a top-level JSON array without loading the whole document.
+
+    ``source`` is a file path, a text file object or an iterable of text chunks.
+    Top-level keys preceding the array (e.g. ``exportDate``, ``filters``) are
+    collected into ``header`` when a dict is passed. A document that is itself
+    an array is streamed directly and ``key`` is ignored.
+    """
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f, key, header, chunk_size)
+        return
+
+    if hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunk_size), '')
+    else:
+        chunks = iter(source)
+
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                raise json.JSONDecodeError("Unexpected end of JSON input", buf, pos)
+
+    def take(expected: str) -> str:
+        nonlocal pos
+        char = peek()
+        if char not in expected:
+            raise json.JSONDecodeError(f"Expected one of {expected!r}", buf, pos)
+        pos += 1
+        return char
+
+    def decode_value() -> Any:
+        nonlocal pos
+        while True:
+            peek()
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # A number or literal at the buffer edge may continue in the next chunk
+            if end == len(buf) and not eof and fill():
+                continue
+            pos = end
+            return value
+
+    def items() -> Iterator[Any]:
+        take('[')
+        if peek() == ']':
+            return
+        while True:
+            yield decode_value()
+            if take(',]') == ']':
+                return
+
+    if peek() == '[':
+        yield from items()
+        return
+
+    take('{')
+    if peek() == '}':
+        return
+    while True:
+        name = decode_value()
+        take(':')
+        if name == key:
+            yield from items()
+            return
+        value = decode_value()
+        if header is not None:
+            header[name] = value
+        if take(',}') == '}':
+            return
+
+
+def iter_team_config(config_file: str, meta: Optional[Dict] = None) -> Iterator[Tuple[str, Dict]]:
+    """Yield (team nickname, team config) pairs from a team-env-config file.
+
+    Two layouts are accepted: the JSON document ``{"meta": ..., "teams": {...}}``
+    and NDJSON, a ``{"meta": ...}`` line followed by one ``{"team": ..., ...}``
+    object per line. NDJSON is consumed line by line, so memory stays bounded;
+    ``'-'`` reads from stdin. ``meta`` is filled when a dict is passed.
+    """
+    if config_file == '-':
+        yield from _iter_team_config_lines(sys.stdin, meta)
+        return
+    with open(config_file, 'r', encoding='utf-8') as f:
+        yield from _iter_team_config_lines(f, meta)
+
+
+def _iter_team_config_lines(f: TextIO, meta: Optional[Dict]) -> Iterator[Tuple[str, Dict]]:
+    first_line = f.readline()
+    try:
+        first = json.loads(first_line)
+    except json.JSONDecodeError:
+        first = None
+
+    if not (isinstance(first, dict) and 'meta' in first and 'teams' not in first):
+        # Regular JSON document, pretty-printed or on a single line
+        data = first if first is not None else json.loads(first_line + f.read())
+        if 'teams' not in data:
+            raise ValueError("missing 'teams' section")
+        if meta is not None:
+            meta.update(data.get('meta', {}))
+        yield from data['teams'].items()
+        return
+
+    if meta is not None:
+        meta.update(first['meta'])
+    for line in f:
+        if line.strip():
+            team_config = json.loads(line)
+            yield team_config.pop('team'), team_config
+
+
+class Record:
+    """Compact, immutable record built from one object of a hub export.
+
+    Records use ``__slots__`` and intern enum-like strings (statuses,
+    categories, descriptions), so large exports cost a fraction of the
+    memory of nested dicts. Item access by the export's camelCase keys
+    (``team['teamNickname']``, ``team.get('members', [])``) keeps code written
+    against plain dicts working; keys missing from the export stay missing.
+    """
+    __slots__ = ()
+    FIELDS: Dict[str, str] = {}  # export key -> attribute
+    INTERNED: frozenset = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Record':
+        record = object.__new__(cls)
+        for export_key, attr in cls.FIELDS.items():
+            if export_key in data:
+                object.__setattr__(record, attr, cls._convert(attr, data[export_key]))
+        return record
+
+    @classmethod
+    def _convert(cls, attr: str, value: Any) -> Any:
+        if attr in cls.INTERNED and isinstance(value, str):
+            return sys.intern(value)
+        return value
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key: str) -> Any:
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            raise KeyError(key)
+        try:
+            return getattr(self, attr)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def keys(self) -> List[str]:
+        return [key for key in self.FIELDS if key in self]
+
+    def to_dict(self) -> Dict:
+        """Convert back to the export's dict layout."""
+        def plain(value):
+            if isinstance(value, Record):
+                return value.to_dict()
+            if isinstance(value, tuple):
+                return [plain(item) for item in value]
+            return value
+        return {key: plain(self[key]) for key in self.keys()}
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class EnvVar(Record):
+    __slots__ = ('key', 'value', 'description', 'category', 'is_secure', 'is_editable',
+                 'created_at', 'updated_at')
+    FIELDS = {'key': 'key', 'value': 'value', 'description': 'description',
+              'category': 'category', 'isSecure': 'is_secure', 'isEditable': 'is_editable',
+              'createdAt': 'created_at', 'updatedAt': 'updated_at'}
+    INTERNED = frozenset({'key', 'description', 'category'})
+
+
+class TeamMember(Record):
+    __slots__ = ('name', 'email')
+    FIELDS = {'name': 'name', 'email': 'email'}
+    # Leaders are listed again among the members and in the members export
+    INTERNED = frozenset({'name', 'email'})
+
+
+class Team(Record):
+    """Team from the teams environment export (approved-teams.json)."""
+    __slots__ = ('team_id', 'team_name', 'team_nickname', 'team_status', 'team_level',
+                 'hackathon', 'leader', 'member_count', 'members', 'environment_variables')
+    FIELDS = {'teamId': 'team_id', 'teamName': 'team_name', 'teamNickname': 'team_nickname',
+              'teamStatus': 'team_status', 'teamLevel': 'team_level', 'hackathon': 'hackathon',
+              'leader': 'leader', 'memberCount': 'member_count', 'members': 'members',
+              'environmentVariables': 'environment_variables'}
+    INTERNED = frozenset({'team_status', 'team_level', 'hackathon'})
+
+    @classmethod
+    def _convert(cls, attr: str, value: Any) -> Any:
+        if attr == 'leader' and isinstance(value, dict):
+            return TeamMember.from_dict(value)
+        if attr == 'members' and isinstance(value, list):
+            return tuple(TeamMember.from_dict(member) for member in value)
+        if attr == 'environment_variables' and isinstance(value, list):
+            return tuple(EnvVar.from_dict(var) for var in value)
+        return super()._convert(attr, value)
+
+
+class MemberTeam(Record):
+    """Team summary embedded in every row of the participants export."""
+    __slots__ = ('id', 'name', 'nickname', 'level', 'status', 'tech_stack',
+                 'accepted_languages', 'counts')
+    FIELDS = {'id': 'id', 'name': 'name', 'nickname': 'nickname', 'level': 'level',
+              'status': 'status', 'techStack': 'tech_stack',
+              'acceptedLanguages': 'accepted_languages', '_count': 'counts'}
+    INTERNED = frozenset({'id', 'name', 'nickname', 'level', 'status'})
+
+    @classmethod
+    def _convert(cls, attr: str, value: Any) -> Any:
+        if isinstance(value, list):
+            return tuple(sys.intern(item) if isinstance(item, str) else item for item in value)
+        return super()._convert(attr, value)
+
+
+class Member(Record):
+    """Participant from the participants export (approved-members.json).
+
+    ``technologies``, ``cloudProviders`` and ``cloudServices`` arrive as
+    stringified JSON arrays; they are kept as strings and decoded on first
+    access, since most scripts only need the email and GitHub URL.
+    """
+    __slots__ = ('id', 'name', 'email', 'city', 'company', 'telegram', 'github_url',
+                 'linkedin_url', 'programming_languages', 'databases', '_technologies',
+                 '_cloud_providers', '_cloud_services', 'experience_level', 'description',
+                 'created_at', 'team')
+    FIELDS = {'id': 'id', 'name': 'name', 'email': 'email', 'city': 'city',
+              'company': 'company', 'telegram': 'telegram', 'githubUrl': 'github_url',
+              'linkedinUrl': 'linkedin_url', 'programmingLanguages': 'programming_languages',
+              'databases': 'databases', 'technologies': 'technologies',
+              'cloudProviders': 'cloud_providers', 'cloudServices': 'cloud_services',
+              'experienceLevel': 'experience_level', 'description': 'description',
+              'createdAt': 'created_at', 'team': 'team'}
+    INTERNED = frozenset({'email', 'city', 'company', 'experience_level'})
+    LAZY_JSON = frozenset({'technologies', 'cloud_providers', 'cloud_services'})
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Member':
+        record = object.__new__(cls)
+        for export_key, attr in cls.FIELDS.items():
+            if export_key in data:
+                value = cls._convert(attr, data[export_key])
+                slot = f"_{attr}" if attr in cls.LAZY_JSON else attr
+                object.__setattr__(record, slot, value)
+        return record
+
+    @classmethod
+    def _convert(cls, attr: str, value: Any) -> Any:
+        if attr == 'team' and isinstance(value, dict):
+            return MemberTeam.from_dict(value)
+        if isinstance(value, list):
+            return tuple(sys.intern(item) if isinstance(item, str) else item for item in value)
+        return super()._convert(attr, value)
+
+    def _decode(self, slot: str) -> Any:
+        value = getattr(self, slot)
+        if isinstance(value, str):
+            try:
+                decoded = json.loads(value)
+            except json.JSONDecodeError:
+                decoded = [value]
+            value = tuple(sys.intern(item) if isinstance(item, str) else item
+                          for item in (decoded if isinstance(decoded, list) else [decoded]))
+            object.__setattr__(self, slot, value)
+        return value
+
+    @property
+    def technologies(self) -> Tuple:
+        return self._decode('_technologies')
+
+    @property
+    def cloud_providers(self) -> Tuple:
+        return self._decode('_cloud_providers')
+
+    @property
+    def cloud_services(self) -> Tuple:
+        return self._decode('_cloud_services')
+
+
+def iter_team_records(teams_file: str, status: Optional[str] = 'APPROVED',
+                      counts: Optional[Dict] = None) -> Iterator[Team]:
+    """Stream Team records from a teams export, filtered by status.
+
+    Each export object is converted as soon as it is decoded, so the full
+    dict tree never exists at once. ``counts`` receives ``total`` and
+    ``matched`` when a dict is passed.
+    """
+    if counts is not None:
+        counts.update(total=0, matched=0)
+    for team in iter_json_array(teams_file):
+        if counts is not None:
+            counts['total'] += 1
+        if status is None or team.get('teamStatus') == status:
+            if counts is not None:
+                counts['matched'] += 1
+            yield Team.from_dict(team)
+
+
+def iter_member_records(members_file: str) -> Iterator[Member]:
+    """Stream Member records from a participants export."""
+    for member in iter_json_array(members_file):
+        yield Member.from_dict(member)
+
+
+def load_teams_data(teams_file: str) -> List[Team]:
+    """Load approved teams from the export as Team records."""
+    try:
+        # Filter for approved teams only
+        counts = {}
+        approved_teams = list(iter_team_records(teams_file, 'APPROVED', counts))
+        
+        total_teams = counts['total']
+        approved_count = len(approved_teams)
+        rejected_count = total_teams - approved_count
+        
+        print(f"📊 Team Statistics:")
+        print(f"   Total teams: {total_teams}")
+        print(f"   ✅ Approved teams: {approved_count}")
+        print(f"   ❌ Rejected/Other teams: {rejected_count}")
+        print()
+        
+        return approved_teams
     except FileNotFoundError:
         print(f"❌ Teams file not found: {teams_file}")
         sys.exit(1)
@@ -182,6 +1471,16 @@ def load_teams_data(teams_file: str) -> List[Dict]:
         sys.exit(1)
 
 
+def filter_changed_teams(teams: List[Dict], changeset_file: str) -> List[Dict]:
+    """Keep only teams added or changed in an export-diff changeset."""
+    return load_script_module("export_diff", "export-diff.py").filter_changed_teams(teams, changeset_file)
+
+
+def require_valid_data(**files):
+    """Validate input files up front, printing every problem and exiting on errors."""
+    load_script_module("validate_data", "validate-data.py").require_valid_data(**files)
+
+
 def validate_approved_teams(teams: List[Dict]) -> bool:
     """Validate that we're only processing approved teams."""
     non_approved_teams = [team for team in teams if team.get('teamStatus') != 'APPROVED']
@@ -212,6 +1511,156 @@ def validate_team_exists(team_nickname: str, approved_teams: List[Dict]) -> bool
     return True
 
 
+def _parse_bool(value: Any, default: bool) -> bool:
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def load_operations(ops_file: str) -> List[Dict]:
+    """Read a batch operations file as a list of raw operation dicts.
+
+    The format follows the extension: ``.csv`` (header row), ``.yaml``/``.yml``
+    (a list, or a mapping with an ``operations`` list; needs PyYAML) and
+    NDJSON otherwise, one JSON object per line, ``'-'`` for stdin.
+    """
+    extension = os.path.splitext(ops_file)[1].lower()
+    if extension == '.csv':
+        with open(ops_file, 'r', encoding='utf-8', newline='') as f:
+            return list(csv.DictReader(f))
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is required for YAML operations files (pip install pyyaml)")
+        with open(ops_file, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or []
+        return data.get('operations', []) if isinstance(data, dict) else data
+
+    operations = []
+    f = sys.stdin if ops_file == '-' else open(ops_file, 'r', encoding='utf-8')
+    try:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                operations.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {line_number}: {e}")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return operations
+
+
+def normalize_operation(raw: Dict, number: int) -> Dict:
+    """Validate one raw operation and fill in variable metadata.
+
+    ``op`` is ``set`` or ``delete``; ``key`` may be a glob (``OLD_*``) for
+    deletes. ``team`` selects targets: omitted or ``*`` for all teams, a
+    comma-separated list (or YAML/JSON list) of nicknames, or a glob.
+    Metadata defaults come from CONFIG_VARIABLE_METADATA for known keys.
+    """
+    op = (raw.get('op') or '').strip().lower()
+    key = (raw.get('key') or '').strip()
+    if op not in ('set', 'delete'):
+        raise ValueError(f"operation {number}: op must be 'set' or 'delete', got {raw.get('op')!r}")
+    if not key:
+        raise ValueError(f"operation {number}: key is required")
+
+    team = raw.get('team') or '*'
+    selectors = team if isinstance(team, list) else [part.strip() for part in str(team).split(',')]
+    operation = {'op': op, 'key': key, 'teams': [part for part in selectors if part]}
+    if op == 'delete':
+        return operation
+
+    if any(char in key for char in '*?['):
+        raise ValueError(f"operation {number}: set needs an exact key, got {key!r}")
+    if raw.get('value') in (None, ''):
+        raise ValueError(f"operation {number}: set {key} needs a value")
+    metadata = CONFIG_VARIABLE_METADATA.get(key, {})
+    operation['variable'] = {
+        'key': key,
+        'value': str(raw['value']),
+        'description': raw.get('description') or metadata.get('description', ''),
+        'category': raw.get('category') or metadata.get('category', 'general'),
+        'isSecure': _parse_bool(raw.get('secure'), metadata.get('is_secure', False)),
+        'isEditable': _parse_bool(raw.get('editable'), metadata.get('is_editable', True))
+    }
+    return operation
+
+
+def select_teams(selectors: List[str], team_nicknames: List[str]) -> List[str]:
+    """Resolve team selectors against the approved nicknames; unknown exact names raise."""
+    selected = []
+    for selector in selectors:
+        if any(char in selector for char in '*?['):
+            selected.extend(fnmatch.filter(team_nicknames, selector))
+        elif selector in team_nicknames:
+            selected.append(selector)
+        else:
+            raise ValueError(f"team {selector!r} is not an approved team")
+    return selected
+
+
+def plan_batch(operations: List[Dict], team_nicknames: List[str],
+               live: Optional[Dict[str, Set[str]]] = None) -> Tuple[Dict[str, Dict], int]:
+    """Expand operations to per-team changes, later operations overriding earlier ones.
+
+    Returns ``({team: {'set': {key: variable}, 'delete': set of keys}}, duplicates)``.
+    Glob deletes are expanded against ``live`` keys and keys set earlier in
+    the batch; a set followed by a delete of the same key (or the reverse)
+    leaves only the later one. A key that only an earlier set created is
+    dropped from the batch rather than deleted from the hub.
+    """
+    plan = {}
+    duplicates = 0
+    for operation in operations:
+        for team in select_teams(operation['teams'], team_nicknames):
+            changes = plan.setdefault(team, {'set': {}, 'delete': set()})
+            if operation['op'] == 'set':
+                key = operation['key']
+                if key in changes['set'] or key in changes['delete']:
+                    duplicates += 1
+                changes['delete'].discard(key)
+                changes['set'][key] = operation['variable']
+                continue
+            if any(char in operation['key'] for char in '*?['):
+                live_keys = (live or {}).get(team, set())
+                keys = fnmatch.filter(sorted(set(live_keys) | changes['set'].keys()), operation['key'])
+            else:
+                live_keys = None
+                keys = [operation['key']]
+            for key in keys:
+                if key in changes['set'] or key in changes['delete']:
+                    duplicates += 1
+                changes['set'].pop(key, None)
+                if live_keys is None or key in live_keys:
+                    changes['delete'].add(key)
+    return {team: changes for team, changes in plan.items()
+            if changes['set'] or changes['delete']}, duplicates
+
+
+def run_batch(api: TeamEnvAPI, plan: Dict[str, Dict], workers: int = 8) -> Dict[str, List[str]]:
+    """Apply a batch plan, teams concurrently; returns failed keys per team."""
+
+    def apply_team(team: str, changes: Dict) -> List[str]:
+        failed = []
+        if changes['set']:
+            failed += api.set_team_env_vars(team, list(changes['set'].values()))
+        failed += [key for key in sorted(changes['delete'])
+                   if not api.delete_team_env_var(team, key)]
+        return failed
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as pool:
+        futures = {team: pool.submit(apply_team, team, changes) for team, changes in plan.items()}
+        results = {team: future.result() for team, future in futures.items()}
+    return {team: failed for team, failed in results.items() if failed}
+
+
 def main():
     parser = argparse.ArgumentParser(description='Manage team environment variables')
     parser.add_argument('--teams-file', default='approved-teams.json',
@@ -224,6 +1673,27 @@ def main():
                        help='Service API key')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be done without making changes')
+    parser.add_argument('--only-changed', metavar='CHANGESET',
+                       help='With set/delete on all teams: process only teams added or changed in an export-diff changeset')
+    parser.add_argument('--breaker-failures', type=int, default=5,
+                       help='Consecutive failures that open a circuit (default: 5)')
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                       help='Seconds an open circuit waits before a probe (default: 30)')
+    parser.add_argument('--pending-file', default='pending-teams.json',
+                       help='Where a paused or timed-out run saves its pending teams (default: pending-teams.json)')
+    parser.add_argument('--timeout', type=parse_timeout, default=DEFAULT_TIMEOUT,
+                       metavar='CONNECT,READ',
+                       help='Hub request timeouts in seconds (default: 10,30)')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                       help='Stop set/delete on all teams after this many seconds and save pending teams')
+    parser.add_argument('--hedge-percentile', type=float, metavar='P',
+                       help='Hedge environment reads slower than this latency percentile, e.g. 95')
+    parser.add_argument('--hedge-max-rate', type=float, default=0.1,
+                       help='Maximum fraction of reads that may be hedged (default: 0.1)')
+    parser.add_argument('--page-size', type=int,
+                       help='Read all-teams environment in pages of this many teams')
+    parser.add_argument('--page-workers', type=int, default=4,
+                       help='Pages fetched concurrently with --page-size (default: 4)')
     
     # Action subcommands
     subparsers = parser.add_subparsers(dest='action', help='Available actions')
@@ -241,6 +1711,8 @@ def main():
     # Get variables
     get_parser = subparsers.add_parser('get', help='Get environment variables')
     get_parser.add_argument('--team', help='Team nickname (if not specified, gets all teams)')
+    get_parser.add_argument('--ndjson', action='store_true',
+                           help='For all teams: stream one JSON team record per line')
     
     # Delete variable
     del_parser = subparsers.add_parser('delete', help='Delete environment variable')
@@ -250,13 +1722,54 @@ def main():
     # List teams
     list_parser = subparsers.add_parser('list', help='List approved teams')
     
+    # Batch of set/delete operations
+    batch_parser = subparsers.add_parser('batch', help='Apply set/delete operations from a file in one pass')
+    batch_parser.add_argument('ops_file', help='Operations file: NDJSON, CSV or YAML ("-" for NDJSON on stdin)')
+    batch_parser.add_argument('--workers', type=int, default=8,
+                             help='Teams processed concurrently (default: 8)')
+    
+    # Snapshots
+    snapshot_parser = subparsers.add_parser('snapshot', help='Save all teams environment to the snapshot store')
+    snapshot_parser.add_argument('--store', default='env-snapshots',
+                                help='Snapshot store directory (default: env-snapshots)')
+    snapshot_parser.add_argument('--name', help='Snapshot name (default: current timestamp)')
+    snapshot_parser.add_argument('--list', action='store_true', help='List stored snapshots instead')
+    
+    restore_parser = subparsers.add_parser('restore', help='Restore environment from a snapshot')
+    restore_parser.add_argument('snapshot', help='Snapshot name, or "latest"')
+    restore_parser.add_argument('--store', default='env-snapshots',
+                               help='Snapshot store directory (default: env-snapshots)')
+    restore_parser.add_argument('--team', help='Restore only this team')
+    restore_parser.add_argument('--keys', help='Comma-separated keys to restore (default: all)')
+    restore_parser.add_argument('--prune', action='store_true',
+                               help='Delete variables that are not in the snapshot')
+    restore_parser.add_argument('--workers', type=int, default=8,
+                               help='Concurrent writes (default: 8)')
+    
+    # Incremental state sync
+    state_parser = subparsers.add_parser('sync-state', help='Refresh local cache of all teams environment')
+    state_parser.add_argument('--state-file', default='hub-env-state.json',
+                             help='Local state cache (default: hub-env-state.json)')
+    state_parser.add_argument('--full', action='store_true',
+                             help='Ignore the watermark and fetch the full state')
+    
     args = parser.parse_args()
     
     if not args.api_key:
         print("❌ API key is required. Set SERVICE_API_KEY environment variable or use --api-key")
         sys.exit(1)
     
-    api = TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run)
+    breakers = CircuitBreakers('hub', failure_threshold=args.breaker_failures,
+                               reset_timeout=args.breaker_reset)
+    deadline = Deadline(args.deadline)
+    hedge = None
+    if args.hedge_percentile:
+        hedge = HedgePolicy(args.hedge_percentile, args.hedge_max_rate)
+    api = TeamEnvAPI(args.api_base_url, args.api_key, args.dry_run, breakers,
+                     args.timeout, deadline, hedge, args.page_size, args.page_workers)
+    
+    if args.action in ('list', 'set', 'delete', 'batch') or (args.action == 'get' and args.team):
+        require_valid_data(teams_file=args.teams_file)
     
     if args.action == 'list':
         teams = load_teams_data(args.teams_file)
@@ -273,6 +1786,88 @@ def main():
             print(f"      Status: {status} | Members: {member_count}")
         return
     
+    if args.action == 'batch':
+        approved_teams = load_teams_data(args.teams_file)
+        if not validate_approved_teams(approved_teams):
+            sys.exit(1)
+        if args.only_changed:
+            approved_teams = filter_changed_teams(approved_teams, args.only_changed)
+        team_nicknames = [team['teamNickname'] for team in approved_teams]
+        
+        try:
+            operations = [normalize_operation(raw, number)
+                          for number, raw in enumerate(load_operations(args.ops_file), 1)]
+            live = None
+            if any(op['op'] == 'delete' and any(char in op['key'] for char in '*?[')
+                   for op in operations):
+                # Glob deletes match the keys teams actually have
+                live = {team['teamSlug']: {var['key'] for var in team['environment']}
+                        for team in api.iter_environment()}
+            plan, duplicates = plan_batch(operations, team_nicknames, live)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error reading hub environment: {e}")
+            sys.exit(1)
+        except (OSError, ValueError) as e:
+            print(f"❌ Invalid operations file {args.ops_file}: {e}")
+            sys.exit(1)
+        
+        set_count = sum(len(changes['set']) for changes in plan.values())
+        delete_count = sum(len(changes['delete']) for changes in plan.values())
+        print(f"📋 {len(operations)} operations: {set_count} sets and {delete_count} deletes "
+              f"in {len(plan)} teams ({duplicates} overridden)")
+        print()
+        
+        failed = run_batch(api, plan, args.workers)
+        failed_count = sum(len(keys) for keys in failed.values())
+        print(f"\n📊 Summary: {set_count + delete_count - failed_count}/{set_count + delete_count} "
+              f"changes applied in {len(plan) - len(failed)}/{len(plan)} teams")
+        if failed:
+            for team, keys in sorted(failed.items()):
+                print(f"   ❌ {team}: {', '.join(keys)}")
+            sys.exit(1)
+        print("✅ All teams processed successfully!")
+        return
+    
+    if args.action == 'snapshot':
+        store = SnapshotStore(args.store)
+        if args.list:
+            for name in store.names():
+                print(f"  📸 {name}")
+            return
+        name = args.name or datetime.now().strftime('%Y%m%d-%H%M%S')
+        manifest = take_snapshot(api, store, name)
+        if manifest is None:
+            sys.exit(1)
+        meta = manifest['meta']
+        print(f"✅ Snapshot {name}: {meta['team_count']} teams, {meta['variable_count']} variables")
+        print(f"📦 {store.new_objects} new values stored ({store.new_bytes} bytes compressed), "
+              f"{meta['variable_count'] - store.new_objects} deduplicated")
+        return
+    
+    if args.action == 'restore':
+        store = SnapshotStore(args.store)
+        try:
+            manifest = store.load(args.snapshot)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot load snapshot {args.snapshot}: {e}")
+            sys.exit(1)
+        if not restore_snapshot(api, store, manifest, {args.team} if args.team else None,
+                                set(args.keys.split(',')) if args.keys else None,
+                                args.prune, args.workers):
+            sys.exit(1)
+        return
+    
+    if args.action == 'sync-state':
+        state = api.sync_environment_state(args.state_file, args.full)
+        if state is None:
+            sys.exit(1)
+        
+        variable_count = sum(len(team['environment']) for team in state['teams'])
+        mode = "incremental" if state['incremental'] else "full"
+        print(f"✅ {mode.capitalize()} sync: {state['changed']} changed variables")
+        print(f"📋 Cached {len(state['teams'])} teams, {variable_count} variables in {args.state_file}")
+        return
+    
     if args.action == 'get':
         if args.team:
             # If specific team requested, validate it exists and is approved
@@ -282,10 +1877,17 @@ def main():
             if not validate_team_exists(args.team, approved_teams):
                 sys.exit(1)
             print(f"🎯 Getting variables for specific approved team: {args.team}")
+        elif args.ndjson:
+            # Nothing but the JSON lines goes to stdout
+            if api.print_all_team_env_vars(ndjson=True) is None:
+                sys.exit(1)
+            return
         else:
             print(f"🌐 Getting variables for all teams")
         
         api.get_team_env_vars(args.team)
+        if hedge:
+            print(f"🏁 Hedging: {hedge.summary()}")
         return
     
     if args.action == 'set':
@@ -305,6 +1907,8 @@ def main():
         else:
             # Apply to all approved teams
             teams = approved_teams
+            if args.only_changed:
+                teams = filter_changed_teams(teams, args.only_changed)
             print(f"🌐 Setting variable for all {len(teams)} approved teams")
         
         print(f"📝 Variable: {args.key}={args.value}")
@@ -316,28 +1920,41 @@ def main():
         
         success_count = 0
         total_count = len(teams)
+        failed_teams = []
         
-        for i, team in enumerate(teams, 1):
-            team_nickname = team['teamNickname']
-            team_name = team.get('teamName', 'Unknown')
-            
-            print(f"🔄 Processing team {i}/{total_count}: {team_nickname} ({team_name})")
-            
-            success = api.set_team_env_var(
-                team_nickname, 
-                args.key, 
-                args.value,
-                args.description,
-                args.category,
-                args.secure,
-                not args.readonly  # isEditable is opposite of readonly
-            )
+        try:
+            for i, team in enumerate(teams, 1):
+                team_nickname = team['teamNickname']
+                team_name = team.get('teamName', 'Unknown')
+                
+                if deadline.expired():
+                    stop_at_deadline(deadline, failed_teams + [t['teamNickname'] for t in teams[i - 1:]])
+                if breakers.should_pause(deadline=deadline):
+                    pause_run(breakers, failed_teams + [t['teamNickname'] for t in teams[i - 1:]])
+                
+                print(f"🔄 Processing team {i}/{total_count}: {team_nickname} ({team_name})")
+                
+                success = api.set_team_env_var(
+                    team_nickname, 
+                    args.key, 
+                    args.value,
+                    args.description,
+                    args.category,
+                    args.secure,
+                    not args.readonly  # isEditable is opposite of readonly
+                )
+                
+                if success:
+                    success_count += 1
+                    print(f"   ✅ Success")
+                else:
+                    failed_teams.append(team_nickname)
+                    print(f"   ❌ Failed")
             
-            if success:
-                success_count += 1
-                print(f"   ✅ Success")
-            else:
-                print(f"   ❌ Failed")
+            if failed_teams and deadline.expired():
+                stop_at_deadline(deadline, failed_teams)
+        except RunStopped as stopped:
+            exit_stopped_run(stopped, args.pending_file)
         
         print(f"\n📊 Summary: {success_count}/{total_count} teams processed successfully")
         if success_count < total_count:
@@ -363,6 +1980,8 @@ def main():
         else:
             # Apply to all approved teams
             teams = approved_teams
+            if args.only_changed:
+                teams = filter_changed_teams(teams, args.only_changed)
             print(f"🌐 Deleting variable from all {len(teams)} approved teams")
         
         print(f"🗑️ Variable to delete: {args.key}")
@@ -370,19 +1989,32 @@ def main():
         
         success_count = 0
         total_count = len(teams)
+        failed_teams = []
         
-        for i, team in enumerate(teams, 1):
-            team_nickname = team['teamNickname']
-            team_name = team.get('teamName', 'Unknown')
-            
-            print(f"🔄 Processing team {i}/{total_count}: {team_nickname} ({team_name})")
+        try:
+            for i, team in enumerate(teams, 1):
+                team_nickname = team['teamNickname']
+                team_name = team.get('teamName', 'Unknown')
+                
+                if deadline.expired():
+                    stop_at_deadline(deadline, failed_teams + [t['teamNickname'] for t in teams[i - 1:]])
+                if breakers.should_pause(deadline=deadline):
+                    pause_run(breakers, failed_teams + [t['teamNickname'] for t in teams[i - 1:]])
+                
+                print(f"🔄 Processing team {i}/{total_count}: {team_nickname} ({team_name})")
+                
+                success = api.delete_team_env_var(team_nickname, args.key)
+                if success:
+                    success_count += 1
+                    print(f"   ✅ Success")
+                else:
+                    failed_teams.append(team_nickname)
+                    print(f"   ❌ Failed")
             
-            success = api.delete_team_env_var(team_nickname, args.key)
-            if success:
-                success_count += 1
-                print(f"   ✅ Success")
-            else:
-                print(f"   ❌ Failed")
+            if failed_teams and deadline.expired():
+                stop_at_deadline(deadline, failed_teams)
+        except RunStopped as stopped:
+            exit_stopped_run(stopped, args.pending_file)
         
         print(f"\n📊 Summary: {success_count}/{total_count} teams processed successfully")
         if success_count < total_count:
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Team Roster Builder for HackLoad 2025
+Builds a compact team -> [(name, email, GitHub login)] roster from the team and member exports.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from script_loader import load_script_module
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+github_module = load_script_module("github_repo_manager", "github-repo-manager.py")
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file in chunks so large exports never sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_roster(roster_file: str) -> Optional[Dict]:
+    """Load an existing roster artifact, or None if missing or unreadable."""
+    try:
+        with open(roster_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError as e:
+        print(f"⚠️ Ignoring invalid roster file {roster_file}: {e}")
+        return None
+
+
+def collect_approved_team_members(teams_file: str) -> Dict[str, List[Tuple[str, str]]]:
+    """Stream the teams export and keep (name, email) pairs of approved teams."""
+    team_members = {}
+    for team in team_env_module.iter_json_array(teams_file):
+        if team.get('teamStatus') != 'APPROVED' or not team.get('teamNickname'):
+            continue
+        team_members[team['teamNickname']] = [
+            (member.get('name', 'Unknown'), member.get('email', ''))
+            for member in team.get('members', [])
+        ]
+    return team_members
+
+
+def resolve_github_logins(members_file: str, emails: Set[str]) -> Dict[str, Optional[str]]:
+    """Stream the members export and resolve GitHub logins for the given emails only.
+
+    This is a semi-join: every other participant row is dropped as soon as it
+    is decoded, so memory stays proportional to the approved teams.
+    """
+    logins = {}
+    if not emails:
+        return logins
+    for member in team_env_module.iter_json_array(members_file):
+        email = member.get('email')
+        if email in emails:
+            logins[email] = github_module.extract_github_username(member.get('githubUrl') or '')
+            if len(logins) == len(emails):
+                break
+    return logins
+
+
+def build_roster(teams_file: str, members_file: str, roster_file: str,
+                 force: bool = False) -> Dict:
+    """Build or incrementally refresh the roster artifact and return it.
+
+    Nothing is parsed when neither export changed. When only the teams export
+    changed, logins of already known emails are reused and the members export
+    is streamed only for emails seen for the first time.
+    """
+    teams_hash = file_sha256(teams_file)
+    members_hash = file_sha256(members_file) if os.path.exists(members_file) else None
+
+    existing = None if force else load_roster(roster_file)
+    if existing:
+        meta = existing.get('meta', {})
+        if meta.get('teams_sha256') == teams_hash and meta.get('members_sha256') == members_hash:
+            print(f"✅ Roster is up to date: {roster_file}")
+            return existing
+
+    team_members = collect_approved_team_members(teams_file)
+    needed_emails = {email for members in team_members.values() for _, email in members if email}
+
+    known_logins = {}
+    if existing and existing.get('meta', {}).get('members_sha256') == members_hash:
+        for members in existing.get('teams', {}).values():
+            for _, email, login in members:
+                known_logins[email] = login
+
+    missing_emails = needed_emails - known_logins.keys()
+    if missing_emails and members_hash:
+        print(f"🔍 Resolving {len(missing_emails)} member emails from {members_file}")
+        known_logins.update(resolve_github_logins(members_file, missing_emails))
+    elif not members_hash:
+        print(f"⚠️ Members file not found: {members_file}. Roster will have no GitHub logins.")
+
+    roster = {
+        "meta": {
+            "built_at": datetime.now().isoformat(),
+            "teams_file": teams_file,
+            "teams_sha256": teams_hash,
+            "members_file": members_file,
+            "members_sha256": members_hash
+        },
+        "teams": {
+            nickname: [[name, email, known_logins.get(email)] for name, email in members]
+            for nickname, members in team_members.items()
+        }
+    }
+
+    tmp_file = f"{roster_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(roster, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_file, roster_file)
+
+    print(f"✅ Roster written: {roster_file} ({len(roster['teams'])} teams)")
+    return roster
+
+
+def audit_roster(roster: Dict) -> int:
+    """Print members without a usable GitHub login. Returns the number of gaps."""
+    teams = roster.get('teams', {})
+    member_total = sum(len(members) for members in teams.values())
+    gaps = 0
+
+    print(f"📋 Roster audit for {len(teams)} teams, {member_total} members:")
+    print()
+    for nickname, members in sorted(teams.items()):
+        missing = [(name, email) for name, email, login in members if not login]
+        status_icon = "✅" if not missing else "⚠️"
+        print(f"{status_icon} {nickname:25} | {len(members) - len(missing)}/{len(members)} with GitHub")
+        for name, email in missing:
+            print(f"      - {name} ({email or 'no email'})")
+        gaps += len(missing)
+
+    print()
+    print(f"📊 Members without GitHub login: {gaps}/{member_total}")
+    return gaps
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build the team -> GitHub roster used by repo sync and audits',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Build (or incrementally refresh) team-roster.json
+  ./team-roster.py build
+
+  # Force a full rebuild
+  ./team-roster.py build --force
+
+  # List members that have no GitHub login
+  ./team-roster.py audit
+        """
+    )
+    parser.add_argument('--teams-file', default='approved-teams.json',
+                       help='Path to teams JSON file (default: approved-teams.json)')
+    parser.add_argument('--members-file', default='approved-members.json',
+                       help='Path to members JSON file with GitHub URLs (default: approved-members.json)')
+    parser.add_argument('--roster-file', default='team-roster.json',
+                       help='Path to roster artifact (default: team-roster.json)')
+
+    subparsers = parser.add_subparsers(dest='action', help='Available actions')
+
+    build_parser = subparsers.add_parser('build', help='Build or refresh the roster')
+    build_parser.add_argument('--force', action='store_true',
+                             help='Rebuild even if neither export changed')
+
+    subparsers.add_parser('audit', help='Show members without a GitHub login')
+
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'build':
+            build_roster(args.teams_file, args.members_file, args.roster_file, args.force)
+        elif args.action == 'audit':
+            roster = build_roster(args.teams_file, args.members_file, args.roster_file)
+            print()
+            audit_roster(roster)
+        else:
+            parser.print_help()
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e.filename}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid JSON in export file: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Data Validator for HackLoad 2025
+Checks approved-teams.json, approved-members.json and team-env-config.json up front,
+so malformed data is reported in one pass before any API work starts.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from script_loader import load_script_module
+
+
+# Nicknames become repository names, subdomains and URL path segments
+NICKNAME_PATTERN = re.compile(r'^[A-Za-z0-9._-]+$')
+
+# Validators append "path: message" strings to the problems list
+Validator = Callable[[Any, str, List[str]], None]
+
+
+team_env_module = load_script_module("team_env_api", "team-env-api.py")
+
+
+class Nullable:
+    """Schema wrapper allowing ``null`` in addition to the wrapped schema."""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+
+class Object:
+    """Schema of a JSON object with required and optional keys."""
+
+    def __init__(self, required: Dict = None, optional: Dict = None, values=None):
+        self.required = required or {}
+        self.optional = optional or {}
+        self.values = values  # schema of every value, for objects used as maps
+
+
+class Check:
+    """Schema of values matching ``schema`` that also pass ``predicate``.
+
+    The predicate returns an error message or None.
+    """
+
+    def __init__(self, schema, predicate: Callable[[Any], Optional[str]]):
+        self.schema = schema
+        self.predicate = predicate
+
+
+TYPE_NAMES = {str: 'string', int: 'integer', bool: 'boolean', float: 'number'}
+
+
+def compile_schema(schema) -> Validator:
+    """Turn a schema description into a validator function.
+
+    Schemas are compiled once at import time into nested closures, so each
+    record is checked without re-interpreting the schema.
+    """
+    if isinstance(schema, Nullable):
+        inner = compile_schema(schema.schema)
+
+        def validate_nullable(value, path, problems):
+            if value is not None:
+                inner(value, path, problems)
+        return validate_nullable
+
+    if isinstance(schema, Check):
+        base = compile_schema(schema.schema)
+        predicate = schema.predicate
+
+        def validate_checked(value, path, problems):
+            count = len(problems)
+            base(value, path, problems)
+            if len(problems) == count:
+                error = predicate(value)
+                if error:
+                    problems.append(f"{path}: {error}")
+        return validate_checked
+
+    if isinstance(schema, list):
+        item = compile_schema(schema[0])
+
+        def validate_list(value, path, problems):
+            if not isinstance(value, list):
+                problems.append(f"{path}: expected array, got {json_type(value)}")
+                return
+            for i, element in enumerate(value):
+                item(element, f"{path}[{i}]", problems)
+        return validate_list
+
+    if isinstance(schema, Object):
+        required = [(key, compile_schema(sub)) for key, sub in schema.required.items()]
+        optional = [(key, compile_schema(sub)) for key, sub in schema.optional.items()]
+        values = compile_schema(schema.values) if schema.values is not None else None
+
+        def validate_object(value, path, problems):
+            if not isinstance(value, dict):
+                problems.append(f"{path}: expected object, got {json_type(value)}")
+                return
+            for key, validator in required:
+                if key not in value:
+                    problems.append(f"{path}.{key}: missing")
+                else:
+                    validator(value[key], f"{path}.{key}", problems)
+            for key, validator in optional:
+                if key in value:
+                    validator(value[key], f"{path}.{key}", problems)
+            if values:
+                for key, element in value.items():
+                    values(element, f"{path}.{key}", problems)
+        return validate_object
+
+    if isinstance(schema, type):
+        expected = schema
+        name = TYPE_NAMES.get(expected, expected.__name__)
+
+        def validate_type(value, path, problems):
+            # bool is an int subclass, but true is not a valid member count
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                problems.append(f"{path}: expected {name}, got {json_type(value)}")
+        return validate_type
+
+    raise TypeError(f"Unsupported schema: {schema!r}")
+
+
+def json_type(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, dict):
+        return 'object'
+    if isinstance(value, list):
+        return 'array'
+    return TYPE_NAMES.get(type(value), type(value).__name__)
+
+
+def non_empty(value: str) -> Optional[str]:
+    return None if value.strip() else "must not be empty"
+
+
+def valid_nickname(value: str) -> Optional[str]:
+    if not NICKNAME_PATTERN.match(value):
+        return f"'{value}' is not a valid nickname (letters, digits, '.', '_', '-')"
+    return None
+
+
+def json_array_string(value) -> Optional[str]:
+    """Members export fields holding a stringified JSON array."""
+    if isinstance(value, list):
+        return None
+    if not isinstance(value, str):
+        return f"expected JSON array string, got {json_type(value)}"
+    try:
+        decoded = json.loads(value)
+    except json.JSONDecodeError as e:
+        return f"not a JSON array string ({e.msg})"
+    return None if isinstance(decoded, list) else "not a JSON array string"
+
+
+PERSON = Object(required={'email': str}, optional={'name': Nullable(str)})
+
+ENV_VAR = Object(
+    required={'key': Check(str, non_empty)},
+    optional={
+        'value': Nullable(str),
+        'description': Nullable(str),
+        'category': Nullable(str),
+        'isSecure': bool,
+        'isEditable': bool
+    }
+)
+
+TEAM = Object(
+    required={
+        'teamNickname': Check(str, valid_nickname),
+        'teamName': str,
+        'teamStatus': str
+    },
+    optional={
+        'teamId': str,
+        'teamLevel': Nullable(str),
+        'hackathon': Nullable(str),
+        'leader': Nullable(PERSON),
+        'memberCount': int,
+        'members': [PERSON],
+        'environmentVariables': [ENV_VAR]
+    }
+)
+
+MEMBER = Object(
+    required={'email': str},
+    optional={
+        'name': Nullable(str),
+        'githubUrl': Nullable(str),
+        'programmingLanguages': Nullable([str]),
+        'databases': Nullable([str]),
+        'technologies': Nullable(Check(object, json_array_string)),
+        'cloudProviders': Nullable(Check(object, json_array_string)),
+        'cloudServices': Nullable(Check(object, json_array_string)),
+        'team': Nullable(Object(optional={'nickname': Nullable(str), 'status': Nullable(str)}))
+    }
+)
+
+TEAM_CONFIG = Object(
+    required={'environment_variables': Object(values=Check(str, non_empty))},
+    optional={'team_info': Object(optional={'nickname': str, 'name': str, 'status': str})}
+)
+
+validate_team = compile_schema(TEAM)
+validate_member = compile_schema(MEMBER)
+validate_team_config = compile_schema(TEAM_CONFIG)
+
+
+def validate_teams_file(teams_file: str) -> Tuple[List[str], List[str], Dict]:
+    """Validate a teams export. Returns (errors, warnings, stats)."""
+    errors, warnings = [], []
+    stats = {'teams': 0, 'approved': 0, 'nicknames': set()}
+    seen = {}
+    try:
+        for i, team in enumerate(team_env_module.iter_json_array(teams_file)):
+            label = f"data[{i}]"
+            if isinstance(team, dict) and isinstance(team.get('teamNickname'), str):
+                label += f" ({team['teamNickname']})"
+            stats['teams'] += 1
+            validate_team(team, label, errors)
+            if not isinstance(team, dict):
+                continue
+
+            nickname = team.get('teamNickname')
+            if isinstance(nickname, str):
+                if nickname in seen:
+                    errors.append(f"{label}.teamNickname: duplicate of data[{seen[nickname]}]")
+                else:
+                    seen[nickname] = i
+            if team.get('teamStatus') == 'APPROVED':
+                stats['approved'] += 1
+                if isinstance(nickname, str):
+                    stats['nicknames'].add(nickname)
+                members = team.get('members')
+                if (isinstance(members, list) and isinstance(team.get('memberCount'), int)
+                        and team['memberCount'] != len(members)):
+                    warnings.append(f"{label}: memberCount {team['memberCount']} "
+                                    f"but {len(members)} members listed")
+    except FileNotFoundError:
+        errors.append("file not found")
+    except json.JSONDecodeError as e:
+        errors.append(f"invalid JSON: {e}")
+    if not errors and stats['teams'] and not stats['approved']:
+        warnings.append("no APPROVED teams")
+    return errors, warnings, stats
+
+
+def validate_members_file(members_file: str) -> Tuple[List[str], List[str], Dict]:
+    """Validate a participants export. Returns (errors, warnings, stats)."""
+    errors, warnings = [], []
+    stats = {'members': 0, 'with_github': 0}
+    try:
+        for i, member in enumerate(team_env_module.iter_json_array(members_file)):
+            stats['members'] += 1
+            validate_member(member, f"data[{i}]", errors)
+            if isinstance(member, dict) and member.get('githubUrl'):
+                stats['with_github'] += 1
+    except FileNotFoundError:
+        errors.append("file not found")
+    except json.JSONDecodeError as e:
+        errors.append(f"invalid JSON: {e}")
+    return errors, warnings, stats
+
+
+def validate_config_file(config_file: str,
+                         approved_nicknames: Optional[set] = None) -> Tuple[List[str], List[str], Dict]:
+    """Validate a team-env-config file (JSON or NDJSON). Returns (errors, warnings, stats).
+
+    With ``approved_nicknames`` teams missing from the export are reported.
+    """
+    errors, warnings = [], []
+    stats = {'teams': 0, 'variables': 0}
+    unknown_keys = set()
+    try:
+        for team_nickname, team_config in team_env_module.iter_team_config(config_file):
+            label = f"teams.{team_nickname}"
+            stats['teams'] += 1
+            validate_team_config(team_config, label, errors)
+            if not isinstance(team_config, dict):
+                continue
+
+            info_nickname = (team_config.get('team_info') or {}).get('nickname')
+            if isinstance(info_nickname, str) and info_nickname != team_nickname:
+                errors.append(f"{label}.team_info.nickname: '{info_nickname}' does not match the team key")
+            env_vars = team_config.get('environment_variables')
+            if isinstance(env_vars, dict):
+                stats['variables'] += len(env_vars)
+                unknown_keys.update(key for key in env_vars
+                                    if key not in team_env_module.CONFIG_VARIABLE_METADATA)
+            if approved_nicknames is not None and team_nickname not in approved_nicknames:
+                warnings.append(f"{label}: not an approved team in the export, it will be skipped")
+    except FileNotFoundError:
+        errors.append("file not found")
+    except (json.JSONDecodeError, ValueError, KeyError, AttributeError) as e:
+        errors.append(f"invalid config: {e}")
+    for key in sorted(unknown_keys):
+        warnings.append(f"variable {key} has no metadata and is ignored by the reconcile daemon")
+    return errors, warnings, stats
+
+
+def validate_files(teams_file: str = None, members_file: str = None, config_file: str = None,
+                   optional_members: bool = True) -> Dict[str, Tuple[List[str], List[str], Dict]]:
+    """Validate the given files and return {file: (errors, warnings, stats)}.
+
+    A missing members file is not an error when ``optional_members`` is set,
+    since the scripts treat it as optional. Configs read from stdin ('-')
+    cannot be read twice and are not validated.
+    """
+    results = {}
+    approved_nicknames = None
+    if teams_file:
+        results[teams_file] = validate_teams_file(teams_file)
+        if not results[teams_file][0]:
+            approved_nicknames = results[teams_file][2]['nicknames']
+    if members_file and (os.path.exists(members_file) or not optional_members):
+        results[members_file] = validate_members_file(members_file)
+    if config_file and config_file != '-':
+        results[config_file] = validate_config_file(config_file, approved_nicknames)
+    return results
+
+
+def print_problems(results: Dict[str, Tuple[List[str], List[str], Dict]],
+                   show_warnings: bool = True) -> int:
+    """Print every problem grouped by file and return the error count."""
+    error_count = 0
+    for path, (errors, warnings, _) in results.items():
+        for error in errors:
+            print(f"❌ {path}: {error}")
+        if show_warnings:
+            for warning in warnings:
+                print(f"⚠️ {path}: {warning}")
+        error_count += len(errors)
+    return error_count
+
+
+def require_valid_data(teams_file: str = None, members_file: str = None, config_file: str = None):
+    """Validate input files before a script starts working, exiting on errors.
+
+    Every problem is printed at once, so the data can be fixed in one go
+    instead of discovering issues one by one in the middle of a rollout.
+    """
+    results = validate_files(teams_file, members_file, config_file)
+    error_count = print_problems(results, show_warnings=False)
+    if error_count:
+        print()
+        print(f"❌ Data validation failed with {error_count} errors. Nothing was changed.")
+        print("   Run ./validate-data.py for details.")
+        sys.exit(1)
+    if results:
+        print(f"✅ Data validated: {', '.join(results)}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Validate exports and team configuration before running any script',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Validate the default files in the current directory
+  ./validate-data.py
+
+  # Validate a rehearsal export and its config
+  ./validate-data.py --teams-file rehearsal/approved-teams.json --config-file rehearsal/team-env-config.json
+
+  # Only the config, treating warnings as errors
+  ./validate-data.py --teams-file '' --members-file '' --strict
+
+Files that do not exist are skipped, except the teams file. Pass '' to skip a file.
+        """
+    )
+    parser.add_argument('--teams-file', default='approved-teams.json',
+                       help='Path to teams JSON file (default: approved-teams.json)')
+    parser.add_argument('--members-file', default='approved-members.json',
+                       help='Path to members JSON file (default: approved-members.json)')
+    parser.add_argument('--config-file', default='team-env-config.json',
+                       help='Team config, JSON or NDJSON (default: team-env-config.json)')
+    parser.add_argument('--strict', action='store_true',
+                       help='Fail on warnings too')
+
+    args = parser.parse_args()
+
+    config_file = args.config_file if args.config_file and os.path.exists(args.config_file) else None
+
+    print("============================================================")
+    print("Data Validation for HackLoad 2025")
+    print("============================================================")
+
+    results = validate_files(args.teams_file or None, args.members_file or None, config_file)
+    if not results:
+        print("❌ Nothing to validate")
+        sys.exit(1)
+
+    error_count = print_problems(results)
+    warning_count = sum(len(warnings) for _, warnings, _ in results.values())
+    if error_count or warning_count:
+        print()
+
+    print("=" * 60)
+    print("📊 VALIDATION SUMMARY")
+    print("=" * 60)
+    for path, (errors, warnings, stats) in results.items():
+        status = '❌' if errors else ('⚠️' if warnings else '✅')
+        details = ', '.join(f"{name}: {value}" for name, value in stats.items()
+                            if not isinstance(value, set))
+        print(f"{status} {path} ({details}) - {len(errors)} errors, {len(warnings)} warnings")
+
+    if error_count or (args.strict and warning_count):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
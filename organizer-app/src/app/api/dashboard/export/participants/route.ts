@@ -3,6 +3,7 @@ import { auth } from '@/auth'
 import { db } from '@/lib/db'
 import { isOrganizer } from '@/lib/admin'
 import { logger, LogAction } from '@/lib/logger'
+import { exportJsonResponse } from '@/lib/export-response'
 import { getParticipantsFromLargeTeams, getParticipantsFromLargeTeamsRaw } from '@/lib/query-participants-large-teams'
 
 type ParticipantExportData = {
@@ -157,7 +158,7 @@ export async function GET(request: NextRequest) {
     await logger.logApiSuccess('GET', '/api/dashboard/export/participants', session.user.email)
 
     // Return JSON format
-    return NextResponse.json({
+    return exportJsonResponse(request, {
       exportDate: new Date().toISOString(),
       totalParticipants: participants.length,
       exportType,
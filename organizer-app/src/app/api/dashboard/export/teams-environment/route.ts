@@ -3,6 +3,7 @@ import { auth } from '@/auth'
 import { db } from '@/lib/db'
 import { isOrganizer } from '@/lib/admin'
 import { logger, LogAction } from '@/lib/logger'
+import { exportJsonResponse } from '@/lib/export-response'
 
 export async function GET(request: NextRequest) {
   try {
@@ -191,7 +192,7 @@ export async function GET(request: NextRequest) {
 
     await logger.logApiSuccess('GET', '/api/dashboard/export/teams-environment', session.user.email)
 
-    return NextResponse.json({
+    return exportJsonResponse(request, {
       exportDate: new Date().toISOString(),
       totalTeams: exportData.length,
       totalEnvironmentVariables: exportData.reduce((sum, team) => sum + team.environmentVariables.length, 0),
@@ -11,6 +11,9 @@ import {
 import { notifyTeamEnvironmentUpdate } from '@/lib/journal'
 import { maskSensitiveValue } from '@/lib/service-keys'
 
+const DEFAULT_PAGE_SIZE = 50
+const MAX_PAGE_SIZE = 200
+
 export async function GET(request: NextRequest) {
   let authResult: { keyId: string; permissions: string[] } | null = null
   
@@ -50,8 +53,46 @@ export async function GET(request: NextRequest) {
     const { searchParams } = new URL(request.url)
     const teamSlug = searchParams.get('team')
     const category = searchParams.get('category')
+    const updatedSinceParam = searchParams.get('updatedSince')
+    const updatedSince = updatedSinceParam ? new Date(updatedSinceParam) : null
+    
+    if (updatedSince && isNaN(updatedSince.getTime())) {
+      await logApiKeyUsage({
+        keyId: authResult.keyId,
+        endpoint: '/api/service/teams/environment',
+        method: 'GET',
+        userAgent: request.headers.get('User-Agent') || undefined,
+        ipAddress: getClientIP(request.headers) || undefined,
+        success: false
+      })
+      
+      return NextResponse.json({ error: 'Invalid updatedSince timestamp' }, { status: 400 })
+    }
+
+    // Optional paging of the all-teams read; without `page` all teams are returned
+    const pageParam = searchParams.get('page')
+    const page = pageParam ? Number(pageParam) : null
+    const pageSize = Number(searchParams.get('pageSize') || DEFAULT_PAGE_SIZE)
+
+    if (page !== null && (!Number.isInteger(page) || page < 1 ||
+        !Number.isInteger(pageSize) || pageSize < 1 || pageSize > MAX_PAGE_SIZE)) {
+      await logApiKeyUsage({
+        keyId: authResult.keyId,
+        endpoint: '/api/service/teams/environment',
+        method: 'GET',
+        userAgent: request.headers.get('User-Agent') || undefined,
+        ipAddress: getClientIP(request.headers) || undefined,
+        success: false
+      })
+      
+      return NextResponse.json(
+        { error: `page must be a positive integer and pageSize between 1 and ${MAX_PAGE_SIZE}` },
+        { status: 400 }
+      )
+    }
     
     let teams: Array<{ id: string; nickname: string; name: string }>
+    let pagination: { page: number; pageSize: number; totalTeams: number; totalPages: number } | null = null
     
     if (teamSlug) {
       // Get specific team
@@ -74,6 +115,24 @@ export async function GET(request: NextRequest) {
       }
       
       teams = [team]
+    } else if (page !== null) {
+      // Get one page of teams, ordered by nickname so pages are stable
+      const [pageTeams, totalTeams] = await Promise.all([
+        db.team.findMany({
+          select: { id: true, nickname: true, name: true },
+          orderBy: { nickname: 'asc' },
+          skip: (page - 1) * pageSize,
+          take: pageSize
+        }),
+        db.team.count()
+      ])
+      teams = pageTeams
+      pagination = {
+        page,
+        pageSize,
+        totalTeams,
+        totalPages: Math.max(1, Math.ceil(totalTeams / pageSize))
+      }
     } else {
       // Get all teams
       teams = await db.team.findMany({
@@ -89,7 +148,8 @@ export async function GET(request: NextRequest) {
       const environmentData = await db.teamEnvironmentData.findMany({
         where: {
           teamId: team.id,
-          ...(category && { category })
+          ...(category && { category }),
+          ...(updatedSince && { updatedAt: { gte: updatedSince } })
         },
         orderBy: [
           { category: 'asc' },
@@ -97,6 +157,12 @@ export async function GET(request: NextRequest) {
         ]
       })
 
+      // Incremental reads only return teams with changed variables; a requested
+      // team is always returned (possibly with an empty environment)
+      if (updatedSince && !teamSlug && environmentData.length === 0) {
+        continue
+      }
+
       // Service API always masks sensitive data
       const maskedData = environmentData.map(item => ({
         ...item,
@@ -128,12 +194,17 @@ export async function GET(request: NextRequest) {
         metadata: { 
           teamSlug: teamSlug || 'all',
           category,
+          updatedSince: updatedSinceParam,
+          page: pagination?.page,
           teamsCount: teams.length,
           serviceKeyId: authResult.keyId
         }
       })
 
+    // Metadata precedes `teams` so streaming clients see it before the array
     const response = {
+      ...(updatedSince && { updatedSince: updatedSince.toISOString() }),
+      ...(pagination && { pagination }),
       teams: teamsWithEnvironment,
       ...(teamSlug && { team: teamsWithEnvironment[0] })
     }
@@ -250,7 +321,8 @@ export async function PUT(request: NextRequest) {
               value: update.value,
               description: update.description,
               category: update.category,
-              isSecure: update.isSecure
+              isSecure: update.isSecure,
+              isEditable: update.isEditable
             }
           })
           updatedEntries++
@@ -263,7 +335,8 @@ export async function PUT(request: NextRequest) {
               value: update.value,
               description: update.description,
               category: update.category,
-              isSecure: update.isSecure
+              isSecure: update.isSecure,
+              isEditable: update.isEditable
             }
           })
           createdEntries++
@@ -0,0 +1,48 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { createHash } from 'crypto'
+
+type ExportPayload = { exportDate: string } & Record<string, unknown>
+
+/**
+ * Build a JSON export response with a content ETag and byte-range support.
+ *
+ * The ETag covers everything except `exportDate`, so repeated exports of
+ * unchanged data match: clients get 304 for If-None-Match and can resume an
+ * interrupted download with Range + If-Range. `exportDate` is a fixed-length
+ * ISO string, so byte offsets stay stable between exports of the same data.
+ */
+export function exportJsonResponse(request: NextRequest, payload: ExportPayload): NextResponse {
+  const { exportDate, ...content } = payload
+  const etag = `"${createHash('sha256').update(JSON.stringify(content)).digest('hex').slice(0, 32)}"`
+  const headers: Record<string, string> = {
+    'Content-Type': 'application/json',
+    'ETag': etag,
+    'Accept-Ranges': 'bytes',
+    'Cache-Control': 'private, no-cache'
+  }
+
+  if (request.headers.get('if-none-match') === etag) {
+    return new NextResponse(null, { status: 304, headers })
+  }
+
+  const body = Buffer.from(JSON.stringify({ exportDate, ...content }))
+
+  // Only open-ended ranges are needed for resuming; anything else gets the full body
+  const range = request.headers.get('range')?.match(/^bytes=(\d+)-$/)
+  const ifRange = request.headers.get('if-range')
+  if (range && (!ifRange || ifRange === etag)) {
+    const start = parseInt(range[1], 10)
+    if (start >= body.length) {
+      return new NextResponse(null, {
+        status: 416,
+        headers: { ...headers, 'Content-Range': `bytes */${body.length}` }
+      })
+    }
+    return new NextResponse(body.subarray(start), {
+      status: 206,
+      headers: { ...headers, 'Content-Range': `bytes ${start}-${body.length - 1}/${body.length}` }
+    })
+  }
+
+  return new NextResponse(body, { headers })
+}
@@ -0,0 +1,204 @@
+import { NextRequest } from 'next/server';
+import { GET, PUT } from '@/app/api/service/teams/environment/route';
+import { db } from '@/lib/db';
+import { authenticateServiceAccount, hasPermission } from '@/lib/service-keys';
+
+// Mock dependencies
+jest.mock('@/lib/db', () => ({
+  db: {
+    team: {
+      findUnique: jest.fn(),
+      findMany: jest.fn(),
+      count: jest.fn(),
+    },
+    teamEnvironmentData: {
+      findMany: jest.fn(),
+      findUnique: jest.fn(),
+      update: jest.fn(),
+      create: jest.fn(),
+    },
+  },
+}));
+
+jest.mock('@/lib/service-keys', () => ({
+  authenticateServiceAccount: jest.fn(),
+  logApiKeyUsage: jest.fn().mockResolvedValue(undefined),
+  getClientIP: jest.fn().mockReturnValue('127.0.0.1'),
+  hasPermission: jest.fn(),
+  maskSensitiveValue: jest.fn((value: string, isSecure: boolean) => (isSecure ? '********' : value)),
+}));
+
+jest.mock('@/lib/journal', () => ({
+  notifyTeamEnvironmentUpdate: jest.fn().mockResolvedValue(undefined),
+}));
+
+jest.mock('@/lib/logger', () => ({
+  logger: {
+    info: jest.fn().mockResolvedValue(undefined),
+    error: jest.fn().mockResolvedValue(undefined),
+  },
+  LogAction: {
+    READ: 'READ',
+    UPDATE: 'UPDATE',
+  },
+}));
+
+describe('/api/service/teams/environment', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+    (authenticateServiceAccount as jest.Mock).mockResolvedValue({
+      keyId: 'key1',
+      permissions: ['environment:read', 'environment:write'],
+    });
+    (hasPermission as jest.Mock).mockReturnValue(true);
+  });
+
+  const mockTeams = [
+    { id: 'team1', nickname: 'alpha', name: 'Team Alpha' },
+    { id: 'team2', nickname: 'beta', name: 'Team Beta' },
+  ];
+
+  const mockEnvironment = [
+    {
+      id: 'env1',
+      teamId: 'team1',
+      key: 'ENDPOINT_URL',
+      value: 'https://alpha.hub.hackload.kz',
+      category: 'api',
+      isSecure: false,
+      isEditable: false,
+    },
+  ];
+
+  const makeGetRequest = (query = '') =>
+    new NextRequest(`http://localhost:3000/api/service/teams/environment${query}`, {
+      headers: { 'X-API-Key': 'test-key' },
+    });
+
+  describe('GET', () => {
+    it('should return all teams ordered by nickname without pagination when no page is given', async () => {
+      (db.team.findMany as jest.Mock).mockResolvedValue(mockTeams);
+      (db.teamEnvironmentData.findMany as jest.Mock).mockResolvedValue(mockEnvironment);
+
+      const response = await GET(makeGetRequest());
+      const data = await response.json();
+
+      expect(response.status).toBe(200);
+      expect(data.pagination).toBeUndefined();
+      expect(data.teams.map((team: { teamSlug: string }) => team.teamSlug)).toEqual(['alpha', 'beta']);
+      expect(db.team.findMany).toHaveBeenCalledWith({
+        select: { id: true, nickname: true, name: true },
+        orderBy: { nickname: 'asc' },
+      });
+      expect(db.team.count).not.toHaveBeenCalled();
+    });
+
+    it('should return one page with pagination metadata when page is given', async () => {
+      (db.team.findMany as jest.Mock).mockResolvedValue([mockTeams[1]]);
+      (db.team.count as jest.Mock).mockResolvedValue(3);
+      (db.teamEnvironmentData.findMany as jest.Mock).mockResolvedValue([]);
+
+      const response = await GET(makeGetRequest('?page=2&pageSize=1'));
+      const data = await response.json();
+
+      expect(response.status).toBe(200);
+      expect(data.pagination).toEqual({ page: 2, pageSize: 1, totalTeams: 3, totalPages: 3 });
+      expect(data.teams).toHaveLength(1);
+      expect(data.teams[0].teamSlug).toBe('beta');
+      expect(db.team.findMany).toHaveBeenCalledWith({
+        select: { id: true, nickname: true, name: true },
+        orderBy: { nickname: 'asc' },
+        skip: 1,
+        take: 1,
+      });
+    });
+
+    it('should put pagination before teams in the response body', async () => {
+      (db.team.findMany as jest.Mock).mockResolvedValue(mockTeams);
+      (db.team.count as jest.Mock).mockResolvedValue(2);
+      (db.teamEnvironmentData.findMany as jest.Mock).mockResolvedValue([]);
+
+      const response = await GET(makeGetRequest('?page=1'));
+      const data = await response.json();
+
+      expect(Object.keys(data)).toEqual(['pagination', 'teams']);
+      expect(data.pagination.pageSize).toBe(50);
+    });
+
+    it('should keep the requested team with an empty environment when nothing changed since updatedSince', async () => {
+      (db.team.findUnique as jest.Mock).mockResolvedValue(mockTeams[0]);
+      (db.teamEnvironmentData.findMany as jest.Mock).mockResolvedValue([]);
+
+      const response = await GET(makeGetRequest('?team=alpha&updatedSince=2025-01-01T00:00:00.000Z'));
+      const data = await response.json();
+
+      expect(response.status).toBe(200);
+      expect(data.updatedSince).toBe('2025-01-01T00:00:00.000Z');
+      expect(data.team).toEqual(expect.objectContaining({ teamSlug: 'alpha', environment: [] }));
+      expect(data.teams).toHaveLength(1);
+    });
+
+    it('should skip unchanged teams in an incremental all-teams read', async () => {
+      (db.team.findMany as jest.Mock).mockResolvedValue(mockTeams);
+      (db.teamEnvironmentData.findMany as jest.Mock)
+        .mockResolvedValueOnce(mockEnvironment)
+        .mockResolvedValueOnce([]);
+
+      const response = await GET(makeGetRequest('?updatedSince=2025-01-01T00:00:00.000Z'));
+      const data = await response.json();
+
+      expect(response.status).toBe(200);
+      expect(data.teams.map((team: { teamSlug: string }) => team.teamSlug)).toEqual(['alpha']);
+    });
+
+    it.each([
+      ['?page=0'],
+      ['?page=abc'],
+      ['?page=1.5'],
+      ['?page=1&pageSize=0'],
+      ['?page=1&pageSize=201'],
+    ])('should return 400 for invalid paging %s', async (query) => {
+      const response = await GET(makeGetRequest(query));
+      const data = await response.json();
+
+      expect(response.status).toBe(400);
+      expect(data.error).toMatch(/pageSize between 1 and 200/);
+      expect(db.team.findMany).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('PUT', () => {
+    const makePutRequest = (body: object) =>
+      new NextRequest('http://localhost:3000/api/service/teams/environment', {
+        method: 'PUT',
+        headers: { 'X-API-Key': 'test-key', 'Content-Type': 'application/json' },
+        body: JSON.stringify(body),
+      });
+
+    it('should pass isEditable to both updated and created variables', async () => {
+      (db.team.findUnique as jest.Mock).mockResolvedValue(mockTeams[0]);
+      (db.teamEnvironmentData.findUnique as jest.Mock)
+        .mockResolvedValueOnce(mockEnvironment[0])
+        .mockResolvedValueOnce(null);
+
+      const response = await PUT(makePutRequest({
+        teamSlug: 'alpha',
+        updates: [
+          { key: 'ENDPOINT_URL', value: 'https://alpha.hub.hackload.kz', category: 'api', isEditable: false },
+          { key: 'MERCHANT_ID', value: 'merchant-1', category: 'payment', isEditable: true },
+        ],
+      }));
+      const data = await response.json();
+
+      expect(response.status).toBe(200);
+      expect(data).toEqual({ teamId: 'team1', updatedEntries: 1, createdEntries: 1 });
+      expect(db.teamEnvironmentData.update).toHaveBeenCalledWith({
+        where: { id: 'env1' },
+        data: expect.objectContaining({ value: 'https://alpha.hub.hackload.kz', isEditable: false }),
+      });
+      expect(db.teamEnvironmentData.create).toHaveBeenCalledWith({
+        data: expect.objectContaining({ teamId: 'team1', key: 'MERCHANT_ID', isEditable: true }),
+      });
+    });
+  });
+});